@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+Drawing of the agents on the simulator canvas: a circle for every agent, with up to four value labels.
+Labels are only changed on the canvas when their text changes, updates that arrive before the canvas is idle are
+drawn together, and the canvas items are reused as long as the number of agents stays the same.
+Above DETAIL_LIMIT agents, only a fixed sample of them is drawn that way, and the whole population is shown as a
+density raster (a single image) of two of its fields, e.g. strategy over reputation, so the cost of the view does
+not grow with the number of agents.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+
+DETAIL_LIMIT = 200  # above this number of agents, only SAMPLE_SIZE of them are drawn individually
+SAMPLE_SIZE = 24
+RASTER_SIZE = 330  # width and height of the density raster in pixels, it is drawn inside of the circle of agents
+RASTER_SAMPLE = 65536  # the raster of larger populations is computed from an evenly spaced sample of this size
+DEFAULT_RANGES = {"reputation": (-5.5, 5.5, 11), "deception_probability": (0., 1., 10)}  # (low, high, bins), of
+# the fields of the agent dicts of simulation.py, which has no histogram_ranges
+
+LABEL_COLORS = ["orange", "blue", "brown", "green"]  # for the first four fields of the agents
+LABEL_OFFSETS = [1, 2, -1, -2]  # vertical position of the labels, in multiples of the offset
+DICT_FIELDS = ["value", "reputation", "deception_probability"]  # the fields of the agent dicts of simulation.py
+
+
+def agent_columns(agents):
+    """Returns the values of the (at most four) labelled fields of the agents as an array (agents, fields),
+    and for every field whether it holds integers"""
+    if isinstance(agents, np.ndarray):
+        names = agents.dtype.names[:len(LABEL_COLORS)]
+        return (np.column_stack([agents[name] for name in names]).astype(float),
+                [agents.dtype[name].kind in "iub" for name in names])
+    return (np.array([[agent[name] for name in DICT_FIELDS] for agent in agents], dtype=float).reshape(-1, 3),
+            [False] * len(DICT_FIELDS))
+
+
+def label_text(value, integer):
+    """The text of a label, as str(round(value, 3)) of the original value"""
+    return str(int(value)) if integer else str(round(value, 3))
+
+
+def field_values(agents, name):
+    """Returns the values of a field of all agents as an array"""
+    if isinstance(agents, np.ndarray):
+        return agents[name]
+    return np.array([agent[name] for agent in agents], dtype=float)
+
+
+def bin_indices(values, value_range):
+    """Returns the bin of each value in a (low, high, bins) range, values outside of it go into the outer bins"""
+    low, high, bins = value_range
+    return np.clip(((values - low) * (bins / (high - low))).astype(int), 0, bins - 1)
+
+
+def density_raster(x, y, x_range, y_range, size=RASTER_SIZE):
+    """Returns a binary PPM image of the joint distribution of x (horizontal) and y (vertical, upwards), with
+    (low, high, bins) ranges. Cells are shaded from white (empty) to dark blue (most agents), on a log scale"""
+    columns, rows = x_range[2], y_range[2]
+    counts = np.bincount(bin_indices(y, y_range) * columns + bin_indices(x, x_range),
+                         minlength=rows * columns).reshape(rows, columns)
+    shade = np.log1p(counts[::-1]) / max(np.log1p(counts.max()), 1.)
+    rgb = (255 - shade[..., None] * np.array([225., 190., 90.])).astype(np.uint8)
+    cell = max(1, size // max(counts.shape))
+    rgb = np.repeat(np.repeat(rgb, cell, axis=0), cell, axis=1)
+    return b"P6\n%d %d\n255\n" % (rgb.shape[1], rgb.shape[0]) + rgb.tobytes()
+
+
+class AgentView(object):
+    """Draws agents in a circle on a Tk canvas.
+    ranges: the histogram ranges of the agent fields (see Simulation.histogram_ranges); the raster shows the
+        first field besides reputation over the reputation
+    image_factory: creates the image of the raster, tkinter.PhotoImage by default
+    shown: the indices of the agents that are drawn individually, see position() for their place on the canvas
+    """
+
+    def __init__(self, canvas, origin=(350, 350), radius=300, agent_radius=10, offset=18, ranges=None,
+                 image_factory=None):
+        self.canvas = canvas
+        self.origin = origin
+        self.radius = radius
+        self.agent_radius = agent_radius
+        self.offset = offset
+        ranges = dict(ranges or DEFAULT_RANGES)
+        self.raster_fields = ("reputation", [name for name in ranges if name != "reputation"][0])
+        self.raster_ranges = [ranges[name] for name in self.raster_fields]
+        self.image_factory = image_factory
+        self.image = None
+        self.raster_items = []  # the image and its caption
+        self.number_of_agents = 0
+        self.shown = np.zeros(0, dtype=int)
+        self.ovals = []
+        self.labels = np.zeros((0, len(LABEL_COLORS)), dtype=object)  # canvas item of every label
+        self.drawn = np.zeros((0, len(LABEL_COLORS)))  # the rounded values that are currently shown
+        self.pending = None  # agents that still have to be drawn
+        self.pending_indices = set()  # the agents among them whose labels may have changed, or None for all
+        self.render_scheduled = False
+        self.items_changed = 0  # number of label changes sent to the canvas, for measurements
+
+    def position(self, index):
+        """Returns the center of an agent (or of an array of agents) on the circle"""
+        angle = 2 * np.pi * np.asarray(index) / max(self.number_of_agents, 1)
+        return np.stack([self.radius * np.cos(angle) + self.origin[0],
+                         self.radius * np.sin(angle) + self.origin[1]], axis=-1)
+
+    def is_shown(self, index):
+        """True if the agent is drawn individually, i.e. has a circle on the canvas"""
+        return not self.aggregated or bool(np.isin(index, self.shown))
+
+    @property
+    def aggregated(self):
+        """True if the population is shown as a raster"""
+        return self.number_of_agents > DETAIL_LIMIT
+
+    def layout(self, number_of_agents):
+        """Places the agents on the canvas. The items are only created anew if the number of agents changed,
+        otherwise the labels are cleared"""
+        self.pending, self.pending_indices = None, set()
+        if number_of_agents != self.number_of_agents:
+            for item in self.ovals + self.labels.ravel().tolist():
+                self.canvas.delete(item)
+            for item in self.raster_items:
+                self.canvas.delete(item)
+            self.raster_items = []
+            self.number_of_agents = number_of_agents
+            if self.aggregated:
+                self.shown = np.unique(np.linspace(0, number_of_agents - 1, SAMPLE_SIZE).astype(int))
+                if self.image is None:
+                    if self.image_factory is None:
+                        from tkinter import PhotoImage
+                        self.image_factory = PhotoImage
+                    self.image = self.image_factory(master=self.canvas, width=RASTER_SIZE, height=RASTER_SIZE)
+                self.raster_items = [
+                    self.canvas.create_image(*self.origin, image=self.image),
+                    self.canvas.create_text(self.origin[0], self.origin[1] + RASTER_SIZE // 2 + self.offset,
+                                            text="%s over %s, %d agents (%d shown)" % (
+                                                self.raster_fields[1], self.raster_fields[0], number_of_agents,
+                                                len(self.shown)))]
+            else:
+                self.shown = np.arange(number_of_agents)
+            self.ovals = []
+            self.labels = np.zeros((len(self.shown), len(LABEL_COLORS)), dtype=object)
+            r = self.agent_radius
+            for i, (x, y) in enumerate(self.position(self.shown).tolist()):
+                self.ovals.append(self.canvas.create_oval(x - r, y - r, x + r, y + r,
+                                                          outline="black", fill="lightblue", width=2))
+                for j, (color, offset) in enumerate(zip(LABEL_COLORS, LABEL_OFFSETS)):
+                    self.labels[i, j] = self.canvas.create_text(x, y + offset * self.offset, text="", fill=color)
+            self.drawn = np.full(self.labels.shape, np.nan)
+        else:
+            for item in self.labels[~np.isnan(self.drawn)].tolist():
+                self.canvas.itemconfigure(item, text="")
+            self.drawn[:] = np.nan
+
+    def show(self, agents, indices=None):
+        """Requests to draw the labels of the agents (or only of those at the given indices), and the raster.
+        Drawing happens when the canvas is idle, later requests replace the agents of earlier ones"""
+        self.pending = agents
+        if indices is None or self.pending_indices is None:
+            self.pending_indices = None
+        else:
+            self.pending_indices.update(int(i) for i in indices)
+        if not self.render_scheduled:
+            self.render_scheduled = True
+            self.canvas.after_idle(self.render)
+
+    def render(self):
+        """Draws the raster, and the labels that have changed since they were last drawn"""
+        self.render_scheduled = False
+        if self.pending is None:
+            return
+        agents, indices = self.pending, self.pending_indices
+        self.pending, self.pending_indices = None, set()
+        if self.aggregated:
+            sample = agents[::-(-len(agents) // RASTER_SAMPLE)]
+            x, y = (field_values(sample, name) for name in self.raster_fields)
+            self.image.configure(data=density_raster(x, y, *self.raster_ranges))
+        if indices is None:
+            rows = np.arange(len(self.shown))
+        else:  # the rows of the shown agents among the indices
+            rows = np.flatnonzero(np.isin(self.shown, np.fromiter(indices, dtype=int, count=len(indices))))
+        selected = self.shown[rows]
+        values, integer = agent_columns(agents[selected] if isinstance(agents, np.ndarray)
+                                        else [agents[i] for i in selected.tolist()])
+        values = np.round(values, 3)
+        changed_rows, changed_columns = np.nonzero(values != self.drawn[rows, :values.shape[1]])
+        texts = [label_text(value, integer[column]) for value, column in
+                 zip(values[changed_rows, changed_columns].tolist(), changed_columns.tolist())]
+        for item, text in zip(self.labels[rows[changed_rows], changed_columns].tolist(), texts):
+            self.canvas.itemconfigure(item, text=text)
+        self.drawn[rows[changed_rows], changed_columns] = values[changed_rows, changed_columns]
+        self.items_changed += len(texts)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+Aggregate engine for the games of experiment_1 and experiment_2, whose agents differ only in their strategy at the
+start of a generation: after selection, every agent has a reputation and a value of 0.
+The population is kept as the number of agents with each strategy. A generation draws its interactions between
+agent indices exactly like the per-agent engine, but only the agents that take part in one of them (at most two
+per simulation step) are given a strategy, by drawing them without replacement from the counts, and are simulated
+with the batched kernel of the experiment. All other agents still have reputation and value 0. Selection and
+mutation work on the counts of these groups of identical agents.
+So a generation costs the same for 10^3 or 10^9 agents, and the course of the game has the same distribution as
+with the per-agent engine. Differences: agents of equal fitness are ranked in random order (the per-agent engine
+ranks them by their position), for more than MUTATION_SAMPLE mutations, the number of distinct mutated
+children is drawn from a normal approximation, and populations of HYPERGEOMETRIC_LIMIT agents or more are sampled
+with replacement.
+Only truncation selection is supported.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import math
+
+import numpy as np
+
+from configuration import Config
+from random_streams import RandomStreams
+from summaries import GenerationSummaries
+from selection import allocate, fitness_shares, expected_children
+from simulation_numpy import conflict_free_batches
+import experiment_1
+
+
+STRATEGIES = np.arange(-5, 6)  # the strategies of the initial population
+MUTATED_STRATEGIES = np.arange(-4, 6)  # the strategies of mutated children, see experiment_1.mutate_agents
+MUTATION_SAMPLE = 65536  # up to this many mutations, the mutated children are drawn exactly
+HYPERGEOMETRIC_LIMIT = 10 ** 9  # the largest population numpy draws from without replacement
+
+
+class AggregateSimulation(object):
+    """The game of experiment_1 (or of experiment_2, with its settings), for populations given as counts.
+    counts: the number of agents with each of the STRATEGIES at the start of the current generation
+    touched: the agents that took part in an interaction of the last generation, as an agent array of the rules
+    """
+
+    settings = experiment_1.Settings
+    rules = experiment_1.Simulation  # provides the policies, the interactions and the agent dtype
+
+    def __init__(self, config=None, seed=None):
+        self.config = config if config is not None else Config(self.settings)
+        if self.config.selection != "truncation":
+            raise ValueError("the aggregate engine supports truncation selection only, not %s"
+                             % self.config.selection)
+
+        self.rng = RandomStreams(seed)
+        self.seed = self.rng.seed
+
+        # the interactions of the rules are applied to the touched agents only
+        self.kernel = self.rules.__new__(self.rules)
+        self.kernel.config = self.config
+        self.kernel.rng = self.rng
+
+        self.counts = self.rng.generator.multinomial(self.config.number_of_agents,
+                                                     np.full(len(STRATEGIES), 1. / len(STRATEGIES)))
+        self.touched = np.zeros(0, dtype=self.dtype)
+
+        self.current_simstep = 0
+        self.current_generation = 1
+        self.last_relation = None
+        self.last_agent_0_index = None
+        self.last_agent_1_index = None
+        self.timer = None
+        self.log = None  # there are no agents to log, only the summaries are kept
+
+        self.summaries = GenerationSummaries(self.dtype, self.config.number_of_generations, self.rules.histogram_ranges)
+        self.record_generation(0)
+
+    @property
+    def dtype(self):
+        return np.dtype([("value", float), ("reputation", int), ("strategy", int)])
+
+    def groups(self):
+        """Returns the population as groups of identical agents: an agent array and the number of agents in each
+        group. The touched agents are groups of one"""
+        untouched = self.counts - np.bincount(self.touched["strategy"] - STRATEGIES[0], minlength=len(STRATEGIES))
+        groups = np.zeros(len(STRATEGIES) + len(self.touched), dtype=self.dtype)
+        groups["strategy"][:len(STRATEGIES)] = STRATEGIES
+        groups[len(STRATEGIES):] = self.touched
+        return groups, np.concatenate([untouched, np.ones(len(self.touched), dtype=np.int64)])
+
+    def record_generation(self, generation=None):
+        if generation is None:
+            generation = self.current_generation
+        self.summaries.record(generation, *self.groups())
+
+    def step(self):
+        """Plays all interactions of the current generation (the aggregate engine has no single steps), or starts the
+        next generation if they have been played. Returns False if we are done"""
+        if self.current_simstep < self.config.number_of_simulation_steps_in_a_generation:
+            self.calculate_steps()
+            return True
+        if self.current_generation < self.config.number_of_generations:
+            self.record_generation()
+            self.select_agents()
+            self.current_generation += 1
+            self.current_simstep = 0
+            return True
+        return False
+
+    def calculate_generation(self):
+        """Advances the simulation by a generation"""
+        this_generation = self.current_generation
+        while self.current_generation == this_generation and self.step():
+            pass
+
+    def calculate_steps(self):
+        """Performs the remaining simulation steps of the current generation, on the agents that take part"""
+        steps = self.config.number_of_simulation_steps_in_a_generation - self.current_simstep
+        if steps <= 0:
+            return
+        kinds, first, second, performed = self.kernel.draw_interactions(steps)
+        kinds, first, second = kinds[performed], first[performed], second[performed]
+
+        # the agents that take part, with strategies drawn from the counts
+        indices, local = np.unique(np.concatenate([first, second]), return_inverse=True)
+        drawn = draw_without_replacement(self.counts, len(indices), self.rng)
+        self.touched = np.zeros(len(indices), dtype=self.dtype)
+        self.touched["strategy"] = self.rng.generator.permutation(np.repeat(STRATEGIES, drawn))
+
+        self.kernel.agents = self.touched
+        first, second = local[:len(first)], local[len(first):]
+        for batch in conflict_free_batches(first, second):
+            self.kernel.apply_interactions(kinds[batch], first[batch], second[batch])
+        self.current_simstep += steps
+
+    def select_agents(self):
+        """Truncation selection, survivors and mutation on the counts of the groups (see simulation_numpy)"""
+        groups, counts = self.groups()
+        groups, counts = groups[counts > 0], counts[counts > 0]
+        config = self.config
+        fitness = groups["value"]
+        strategy = groups["strategy"] - STRATEGIES[0]
+
+        # rank the groups by fitness, equal fitness in random order
+        order = self.rng.generator.permutation(len(groups))
+        order = order[np.argsort(-fitness[order], kind="stable")]
+        fitness, strategy, counts = fitness[order], strategy[order], counts[order]
+        cumulative = np.cumsum(counts)
+
+        def fittest(k):
+            """The number of agents of each group among the k fittest"""
+            return np.clip(k - (cumulative - counts), 0, counts)
+
+        number_of_surviving_agents = min(config.number_of_surviving_agents, config.number_of_agents)
+        survivors = fittest(number_of_surviving_agents)
+
+        # every parent gets a share of the children, normalized with the fitness of all agents
+        parents = fittest(config.number_of_parents_in_a_generation)
+        shares = fitness_shares(np.concatenate([fitness, fitness[[0, -1]]])[None, :],
+                                config.influence_of_fitness_to_reproductive_success)[0, :-2] * parents
+        number_of_children = config.number_of_agents - number_of_surviving_agents
+        children = allocate(expected_children(shares[None, :], number_of_children))[0]
+
+        survivors = np.bincount(strategy, weights=survivors, minlength=len(STRATEGIES)).astype(np.int64)
+        children = np.bincount(strategy, weights=children, minlength=len(STRATEGIES)).astype(np.int64)
+        self.counts = survivors + self.mutate_counts(children)
+        self.touched = np.zeros(0, dtype=self.dtype)
+
+    def mutate_counts(self, children):
+        """experiment_1.mutate_agents for children given as counts per strategy: a binomial number of mutations,
+        each one sets a randomly chosen child (with replacement) to a random strategy"""
+        total = int(children.sum())
+        mutations = self.rng.binomial(total, self.config.mutation_rate)
+        if not mutations:
+            return children
+        if mutations <= MUTATION_SAMPLE:
+            mutated = len(np.unique(self.rng.generator.integers(0, total, size=mutations)))
+        else:
+            mutated = distinct_draws(total, mutations, self.rng)
+        removed = draw_without_replacement(children, mutated, self.rng)
+        added = self.rng.generator.multinomial(mutated, np.full(len(MUTATED_STRATEGIES), 1. / len(MUTATED_STRATEGIES)))
+        children = children - removed
+        children[MUTATED_STRATEGIES - STRATEGIES[0]] += added
+        return children
+
+
+def draw_without_replacement(counts, k, rng):
+    """Returns how many of k agents, drawn without replacement from groups with the given counts, are from each
+    group. numpy limits the total to HYPERGEOMETRIC_LIMIT; above it, the agents are drawn with replacement, which
+    overestimates the variance by the fraction of agents drawn"""
+    if counts.sum() < HYPERGEOMETRIC_LIMIT:
+        return rng.generator.multivariate_hypergeometric(counts, k, method="marginals")
+    return rng.generator.multinomial(k, counts / counts.sum())
+
+
+def distinct_draws(n, draws, rng):
+    """Returns the number of distinct values among draws uniform draws from n values, from a normal distribution
+    with the exact mean and variance"""
+    miss = math.exp(draws * math.log1p(-1. / n))  # probability that a value is not drawn
+    miss_two = math.exp(draws * math.log1p(-2. / n)) if n > 1 else 0.  # ... that two given values are not drawn
+    mean = n * (1 - miss)
+    variance = max(n * (n - 1) * miss_two + n * miss - (n * miss) ** 2, 0.)
+    return int(np.clip(round(rng.generator.normal(mean, math.sqrt(variance))), 1, min(n, draws)))
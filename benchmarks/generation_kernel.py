@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares the sequential step() engine of simulation_numpy with the batched generation kernel.
+Run from the repository root: python -m benchmarks.generation_kernel
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import argparse
+import time
+
+from configuration import Settings
+import simulation_numpy
+
+
+def time_steps(simulation, steps):
+    """Returns the time per simulation step when calling step()"""
+    start = time.perf_counter()
+    for i in range(steps):
+        simulation.step()
+    return (time.perf_counter() - start) / steps
+
+
+def time_batched(simulation, steps):
+    """Returns the time per simulation step when using the batched kernel"""
+    start = time.perf_counter()
+    simulation.calculate_steps_batched()
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batched generation kernel against step().")
+    parser.add_argument("--agents", type=int, nargs="+", default=[100, 10000, 1000000])
+    parser.add_argument("--steps", type=int, default=1000, help="simulation steps in a generation")
+    parser.add_argument("--sequential-steps", type=int, default=200, help="steps to time with step()")
+    args = parser.parse_args()
+
+    Settings.number_of_simulation_steps_in_a_generation = args.steps
+    Settings.number_of_generations = 2
+    print("%10s %16s %16s %10s" % ("agents", "step() us/step", "batched us/step", "speedup"))
+    for number_of_agents in args.agents:
+        Settings.number_of_agents = number_of_agents
+        sequential = time_steps(simulation_numpy.Simulation(), min(args.sequential_steps, args.steps))
+        batched = time_batched(simulation_numpy.Simulation(), args.steps)
+        print("%10d %16.2f %16.2f %9.1fx" % (number_of_agents, sequential * 1e6, batched * 1e6, sequential / batched))
+
+
+if __name__ == "__main__":
+    main()
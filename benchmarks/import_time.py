@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures the cold-start import time of the simulation engines and of the GUI, each in a fresh interpreter.
+Run from the repository root: python -m benchmarks.import_time
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+ENGINE_MODULES = ["simulation", "simulation_numpy", "experiment_1", "experiment_2", "experiment_3", "experiment_4",
+                  "ensemble", "sweep"]
+GUI_MODULES = ["widgets"]
+HEAVY_MODULES = ["tkinter", "matplotlib"]  # engines must not pull these in
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def import_time(module, repeat=5):
+    """Returns the median import time of the module in seconds, and the heavy modules that it loaded"""
+    times = []
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(output[0]))
+    return statistics.median(times), [name for name in output[1].split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import times of engines and GUI.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=ENGINE_MODULES + GUI_MODULES)
+    args = parser.parse_args()
+
+    print("%-20s %10s  %s" % ("module", "ms", "heavy modules loaded"))
+    for module in args.modules:
+        seconds, heavy = import_time(module, args.repeat)
+        print("%-20s %10.1f  %s" % (module, seconds * 1000, ", ".join(heavy) or "-"))
+
+
+if __name__ == "__main__":
+    main()
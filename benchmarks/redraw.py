@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures the time to redraw the agent labels after a generation, for the label-by-label update of the original
+GUI and for agent_view.AgentView, which only changes labels whose text changed.
+With a display, a real Tk canvas is used. Without one, the canvas calls are made on a Tcl interpreter instead, which
+has the same call overhead but does not lay out any text, so the times are a lower bound.
+Run from the repository root: python -m benchmarks.redraw
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import argparse
+import time
+import tkinter
+
+from agent_view import AgentView
+from configuration import Config
+import experiment_3
+
+
+class TclCanvas(object):
+    """Stands in for a canvas without a display: every canvas call is sent to a Tcl interpreter"""
+
+    def __init__(self):
+        self.tcl = tkinter.Tcl()
+        self.items = 0
+
+    def _create(self, *args, **options):
+        self.items += 1
+        self.tcl.call("set", "item", self.tcl._options(options))
+        return self.items
+
+    create_oval = create_text = create_line = _create
+
+    def itemconfigure(self, item, **options):
+        self.tcl.call("set", "item%d" % (item % 64), self.tcl._options(options))
+
+    itemconfig = itemconfigure
+
+    def delete(self, *items):
+        pass
+
+    def after_idle(self, function):
+        pass
+
+
+def redraw_all_labels(canvas, labels, agents):
+    """The original update: every label of every agent is configured"""
+    for agent_index, values in enumerate(agents):
+        for index, value in enumerate(values):
+            canvas.itemconfig(labels[agent_index][index], text=str(round(value, 3)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the redraw of the agent labels after a generation.")
+    parser.add_argument("--agents", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--generations", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        root = tkinter.Tk()
+        canvas = tkinter.Canvas(root, width=700, height=700)
+        print("drawing on a Tk canvas")
+    except tkinter.TclError:
+        root, canvas = None, TclCanvas()
+        print("no display, calls go to a Tcl interpreter")
+
+    print("%10s %18s %18s %16s" % ("agents", "all labels ms/gen", "AgentView ms/gen", "labels changed"))
+    for number_of_agents in args.agents:
+        config = Config(experiment_3.Simulation.settings, number_of_agents=number_of_agents,
+                        number_of_parents_in_a_generation=number_of_agents,
+                        number_of_simulation_steps_in_a_generation=number_of_agents, engine="batched",
+                        number_of_generations=args.generations + 2)
+        simulations = [experiment_3.Simulation(config, seed=1), experiment_3.Simulation(config, seed=1)]
+        view = AgentView(canvas)
+        view.layout(number_of_agents)
+        labels = view.labels.tolist()
+        view.show(simulations[1].agents)
+        view.render()
+
+        original = optimized = 0.
+        changed = view.items_changed
+        for generation in range(args.generations):
+            for simulation in simulations:
+                simulation.calculate_generation()
+            start = time.perf_counter()
+            redraw_all_labels(canvas, labels, simulations[0].agents)
+            if root is not None:
+                root.update_idletasks()
+            original += time.perf_counter() - start
+
+            start = time.perf_counter()
+            view.show(simulations[1].agents)
+            view.render()
+            if root is not None:
+                root.update_idletasks()
+            optimized += time.perf_counter() - start
+        changed = (view.items_changed - changed) / args.generations
+        print("%10d %18.2f %18.2f %9d of %d" % (number_of_agents, original / args.generations * 1e3,
+                                                optimized / args.generations * 1e3, changed, view.labels.size))
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
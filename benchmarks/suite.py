@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite for the simulation engines: the agent dicts of simulation.py, the structured arrays of
+simulation_numpy and experiment_1 to experiment_4, each numpy module with the sequential and the batched engine, and
+with the compiled engine if numba is installed (see kernels.py).
+For every case and number of agents it measures
+    steps_per_second        single step() calls
+    generations_per_second  whole generations with calculate_generation(), with the case's engine
+    select_agents_seconds   one call of select_agents()
+    peak_memory_bytes       the peak of memory allocated by python and numpy while creating the simulation and
+                            running a generation (measured in a separate run, as tracing slows the code down)
+    log_bytes               the size of the generation log and the summaries after that generation
+With --compact, every case is also measured with the compact agent types (config.compact_agents), as
+"<case>/compact". benchmarks/compact.json holds such a comparison: with 10^6 agents, compact types need 2.2 to 2.9
+times less peak memory and 2.7 to 4 times less log, and run 12 to 20% more generations per second.
+benchmarks/baseline.json holds the cases of all engines, the compiled one measured with numba 0.68.
+The results are written as json, and may be compared with a stored baseline: throughput that dropped, or time and
+memory that rose, by more than the tolerance are reported as regressions, and the exit status is 1.
+With --storage, calibrate() measures instead how many steps per agent a generation needs for the dicts storage to
+be faster than the array (see storage.DICTS_STEPS_PER_AGENT).
+Run from the repository root, e.g.
+    python -m benchmarks.suite --agents 20 100 1000 --output results.json --baseline benchmarks/baseline.json
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from configuration import Config
+import kernels
+import storage
+
+
+MODULES = ["simulation", "simulation_numpy", "experiment_1", "experiment_2", "experiment_3", "experiment_4"]
+AGENTS = [20, 100, 1000, 10000, 100000]
+HIGHER_IS_BETTER = {"steps_per_second": True, "generations_per_second": True, "select_agents_seconds": False,
+                    "peak_memory_bytes": False, "log_bytes": False}
+
+
+def cases(modules=MODULES):
+    """Returns the (name, module, engine) of every benchmark case"""
+    result = []
+    for name in modules:
+        module = importlib.import_module(name)
+        engines = ["sequential", "batched"] if hasattr(module.Simulation, "calculate_steps_batched") else [None]
+        if kernels.AVAILABLE and hasattr(module.Simulation, "calculate_steps_compiled"):
+            engines.append("compiled")
+        for engine in engines:
+            result.append((name if engine is None else "%s/%s" % (name, engine), module, engine))
+    return result
+
+
+def create(module, engine, number_of_agents, generations, compact=False):
+    """Returns a simulation of the module, with the module's default settings"""
+    changes = dict(number_of_agents=number_of_agents, number_of_generations=generations + 3)
+    if engine is not None:
+        changes["engine"] = engine
+    if compact:
+        changes["compact_agents"] = True
+    return module.Simulation(Config(module.Simulation.settings, **changes))
+
+
+def array_bytes(value):
+    """Returns the size of all arrays referenced by an object, its attributes and containers"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(array_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return array_bytes(vars(value))
+    return 0
+
+
+def timed(function, minimum_time):
+    """Calls function until minimum_time has passed, returns the number of calls and the seconds they took"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= minimum_time:
+            return calls, elapsed
+
+
+def measure(module, engine, number_of_agents, generations=2, minimum_time=0.5, compact=False):
+    """Returns the measurements of one case as a dict"""
+    simulation = create(module, engine, number_of_agents, generations, compact)
+    steps_in_a_generation = simulation.config.number_of_simulation_steps_in_a_generation
+
+    def step():
+        if simulation.current_simstep >= steps_in_a_generation:  # stay within the generation
+            simulation.current_simstep = 0
+        simulation.step()
+
+    calls, elapsed = timed(step, minimum_time)
+    steps_per_second = calls / elapsed
+
+    simulation = create(module, engine, number_of_agents, generations, compact)
+    simulation.calculate_generation()  # not timed, the first generation also warms up caches and allocations
+    start = time.perf_counter()
+    for generation in range(generations):
+        simulation.calculate_generation()
+    generations_per_second = generations / (time.perf_counter() - start)
+
+    calls, elapsed = timed(simulation.select_agents, minimum_time / 5)
+    select_agents_seconds = elapsed / calls
+
+    tracemalloc.start()
+    try:
+        simulation = create(module, engine, number_of_agents, generations, compact)
+        simulation.calculate_generation()
+        peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    log_bytes = array_bytes(simulation.log) + array_bytes(getattr(simulation, "summaries", None))
+
+    return {"steps_per_second": steps_per_second, "generations_per_second": generations_per_second,
+            "select_agents_seconds": select_agents_seconds, "peak_memory_bytes": peak_memory_bytes,
+            "log_bytes": log_bytes}
+
+
+def calibrate(simulation_class, number_of_agents=100, steps=2000, compact_agents=False):
+    """Measures the seconds per step of simulation_class with either storage, and the seconds to convert an agent to
+    a dict and back. Returns {"array": .., "dicts": .., "conversion": .., "break_even": ..}, where break_even is the
+    number of steps per agent from which the dicts are faster in a generation"""
+    result = {}
+    for agent_storage in storage.STORAGES:
+        config = Config(simulation_class.settings, number_of_agents=number_of_agents, log_interval=0,
+                        number_of_simulation_steps_in_a_generation=steps, engine="sequential",
+                        agent_storage=agent_storage, compact_agents=compact_agents)
+        simulation = simulation_class(config, seed=0)
+        simulation.step()  # the first step converts the agents
+        start = time.perf_counter()
+        for step in range(steps - 1):
+            simulation.step()
+        result[agent_storage] = (time.perf_counter() - start) / (steps - 1)
+    agents = simulation.agents
+    start = time.perf_counter()
+    storage.write_rows(agents, storage.read_rows(agents))
+    result["conversion"] = (time.perf_counter() - start) / number_of_agents
+    result["break_even"] = result["conversion"] / (result["array"] - result["dicts"])
+    return result
+
+
+def run(modules=MODULES, agents=AGENTS, generations=2, minimum_time=0.5, report=None, compact=False):
+    """Measures all cases, and returns the results as a json-serializable dict.
+    report: called with every result as it is measured
+    compact: also measure every case with compact agent types (the dicts of simulation.py have none)"""
+    results = []
+    for name, module, engine in cases(modules):
+        for compact_agents in [False, True] if compact and engine is not None else [False]:
+            for number_of_agents in agents:
+                result = dict(case=name + "/compact" if compact_agents else name, agents=number_of_agents,
+                              **measure(module, engine, number_of_agents, generations, minimum_time, compact_agents))
+                results.append(result)
+                if report is not None:
+                    report(result)
+    return {"python": sys.version.split()[0], "numpy": np.__version__,
+            "numba": kernels.numba.__version__ if kernels.AVAILABLE else None, "machine": platform.machine(),
+            "processor": platform.processor(), "generations": generations, "results": results}
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Returns the regressions of results against a baseline (both as returned by run()) as a list of
+    (case, agents, metric, baseline value, new value). Cases missing from either side are ignored"""
+    reference = {(result["case"], result["agents"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        old = reference.get((result["case"], result["agents"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            if metric not in old:
+                continue
+            if (result[metric] < old[metric] * (1 - tolerance) if higher_is_better
+                    else result[metric] > old[metric] * (1 + tolerance)):
+                regressions.append((result["case"], result["agents"], metric, old[metric], result[metric]))
+    return regressions
+
+
+def print_result(result):
+    print("%-34s %8d %12.0f %10.2f %12.3f %10.1f %10.1f" % (
+        result["case"], result["agents"], result["steps_per_second"], result["generations_per_second"],
+        result["select_agents_seconds"] * 1e3, result["peak_memory_bytes"] / 2 ** 20, result["log_bytes"] / 2 ** 20))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark both engines and all experiments.")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--agents", type=int, nargs="+", default=AGENTS)
+    parser.add_argument("--generations", type=int, default=2, help="generations to time calculate_generation()")
+    parser.add_argument("--minimum-time", type=float, default=0.5, help="seconds to time step() for")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare the results with this json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change that counts as regression")
+    parser.add_argument("--compact", action="store_true", help="also measure with compact agent types")
+    parser.add_argument("--storage", action="store_true", help="calibrate the choice of the agent storage instead")
+    args = parser.parse_args()
+
+    if args.storage:
+        print("%-34s %8s %12s %12s %12s %10s" % ("case", "agents", "array us", "dicts us", "convert us",
+                                                 "break even"))
+        for name, module, engine in cases(args.modules):
+            for compact_agents in [False, True] if engine == "sequential" else []:
+                for number_of_agents in args.agents:
+                    seconds = calibrate(module.Simulation, number_of_agents, compact_agents=compact_agents)
+                    print("%-34s %8d %12.2f %12.2f %12.2f %10.2f" % (
+                        name + "/compact" if compact_agents else name, number_of_agents, seconds["array"] * 1e6,
+                        seconds["dicts"] * 1e6, seconds["conversion"] * 1e6, seconds["break_even"]))
+        return
+
+    print("%-34s %8s %12s %10s %12s %10s %10s" % ("case", "agents", "steps/s", "gens/s", "select ms", "peak MB",
+                                                  "log MB"))
+    results = run(args.modules, args.agents, args.generations, args.minimum_time, report=print_result,
+                  compact=args.compact)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for case, agents, metric, old, new in regressions:
+            print("regression: %s with %d agents, %s %.4g -> %.4g" % (case, agents, metric, old, new))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against %s" % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
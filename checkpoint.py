@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checkpoint files: a json header and a set of arrays, which are mapped (not read) when the checkpoint is loaded.
+See Simulation.save_checkpoint and Simulation.load_checkpoint for what is stored.
+
+File layout, like a generation log (see generation_log.py):
+    8 bytes   magic
+    8 bytes   length of the json header (little endian)
+    8 bytes   number of arrays
+    json      {"header": ..., "arrays": ...}; arrays inside of the header are stored as references
+              {"array": name}, the table "arrays" gives dtype, shape and offset of every array
+    data      the arrays, each one starting at a multiple of 64 bytes
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from generation_log import PREFIX, ALIGNMENT
+
+
+MAGIC = b"RGCKPT\x00\x01"
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _encode(value, arrays):
+    """Replaces the arrays inside of a header value by references, and collects them in the arrays dict"""
+    if isinstance(value, np.ndarray):
+        name = "header %d" % len(arrays)
+        arrays[name] = value
+        return {"array": name}
+    if isinstance(value, dict):
+        return {key: _encode(item, arrays) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, arrays) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value, arrays):
+    """Inverse of _encode"""
+    if isinstance(value, dict):
+        if set(value) == {"array"}:
+            return arrays[value["array"]]
+        return {key: _decode(item, arrays) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item, arrays) for item in value]
+    return value
+
+
+def write_checkpoint(path, header, arrays):
+    """Writes the header (a json-serializable dict, which may contain arrays) and the named arrays to path.
+    The file is written under a temporary name and then renamed, so an existing checkpoint is only replaced by a
+    complete one."""
+    arrays = dict(arrays)
+    header = _encode(header, arrays)
+
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": np.lib.format.dtype_to_descr(array.dtype), "shape": array.shape, "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    encoded = json.dumps({"header": header, "arrays": table}, default=str).encode("utf-8")
+    data_offset = _aligned(PREFIX.size + len(encoded))
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, len(encoded), len(arrays)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_offset + table[name]["offset"])
+            f.write(memoryview(np.ascontiguousarray(array).reshape(-1).view(np.uint8)))
+        f.truncate(data_offset + offset)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path):
+    """Returns the header and the arrays of a checkpoint. The arrays are copy-on-write views of the file: they are
+    not read until they are used, and changing them does not change the file"""
+    with open(path, "rb") as f:
+        magic, header_length, number_of_arrays = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError("%s is not a checkpoint" % path)
+        content = json.loads(f.read(header_length).decode("utf-8"))
+        data_offset = _aligned(PREFIX.size + header_length)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    arrays = {}
+    for name, entry in content["arrays"].items():
+        descr = entry["dtype"]
+        dtype = np.lib.format.descr_to_dtype([tuple(field) for field in descr] if isinstance(descr, list) else descr)
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_offset + entry["offset"]).reshape(shape)
+    return _decode(content["header"], arrays), arrays
+
+
+class CheckpointWriter(object):
+    """Writes checkpoints in a background thread, so the simulation does not wait for the disk.
+    If a checkpoint is submitted while another one is still waiting to be written, the waiting one is dropped."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = None  # (path, header, arrays) of the next checkpoint
+        self.busy = False
+        self.written = 0  # number of checkpoints written so far
+        self.error = None  # the exception of the last failed write
+        self.thread = None
+
+    def submit(self, path, header, arrays):
+        """Schedules a checkpoint; the arrays must not be changed afterwards"""
+        with self.condition:
+            self.pending = (path, header, arrays)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="checkpoint writer", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def flush(self):
+        """Waits until all submitted checkpoints are written"""
+        with self.condition:
+            while self.pending is not None or self.busy:
+                self.condition.wait()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                checkpoint, self.pending, self.busy = self.pending, None, True
+            try:
+                write_checkpoint(*checkpoint)
+                error = None
+            except Exception as exception:
+                error = exception
+            with self.condition:
+                self.busy = False
+                self.error = error
+                self.written += error is None
+                self.condition.notify_all()
@@ -20,4 +20,62 @@ class Settings():
     number_of_parents_in_a_generation= 5
     influence_of_fitness_to_reproductive_success= 0.0
     mutation_rate= 0.2
+    selection = "truncation"  # how parents are chosen: truncation, proportional, tournament or rank, see selection.py
+    # (truncation allocates the children exactly since selection.py, so seeded runs differ from earlier versions)
+    tournament_size = 2
     update_rate_during_calculate_all = 1  # update gui display every n cycles during fast computation
+    frames_per_second = 25  # maximum rate of display updates while the simulation runs in the background
+    engine = "sequential"  # "sequential" calls step() for every interaction, "batched" vectorizes whole generations,
+    # "compiled" plays them in a loop compiled with numba if it is installed, and is "batched" otherwise (kernels.py)
+    agent_storage = "auto"  # "array" or "dicts": how the sequential engine of simulation_numpy accesses the agents
+    # during a generation, "auto" chooses the faster one, see storage.py
+    log_file = ""  # if set, the generation log is written to this memory-mapped file instead of kept in memory
+    log_interval = 1  # keep a full snapshot of the agents every n generations, 0 keeps only the summaries
+    log_steps = 0  # if set, simulation.py logs the agents every n steps instead of every log_interval generations
+    checkpoint_file = ""  # if set, a checkpoint is written to this file every checkpoint_interval generations
+    checkpoint_interval = 0  # checkpoints are written in the background, 0 writes none
+    timing = False  # record the time spent in every phase of the simulation, see timing.py
+    compact_agents = False  # store the agent fields in narrow types (int8 reputation, float32 value...), in memory
+    # and in the log, see compact_types in simulation_numpy
+
+
+class Config(object):
+    """An immutable, hashable set of simulation parameters.
+    The values are read from a settings class (Settings by default) or from another Config, and may be overridden
+    by keyword arguments, e.g. Config(Settings, mutation_rate=0.1). Values are plain attributes of the instance.
+    """
+
+    def __init__(self, settings=Settings, **overrides):
+        if isinstance(settings, Config):
+            values = dict(settings.items())
+        else:
+            values = {key: getattr(settings, key) for key in dir(settings) if not key.startswith('_')}
+        unknown = set(overrides) - set(values)
+        if unknown:
+            raise KeyError("unknown settings: %s" % ", ".join(sorted(unknown)))
+        values.update(overrides)
+        self.__dict__.update(values)
+        self.__dict__["_items"] = tuple(sorted(values.items()))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Config is immutable, use replace() to obtain a changed copy")
+
+    def __delattr__(self, key):
+        raise AttributeError("Config is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, Config) and self._items == other._items
+
+    def __hash__(self):
+        return hash(self._items)
+
+    def __repr__(self):
+        return "Config(%s)" % ", ".join("%s=%r" % item for item in self._items)
+
+    def items(self):
+        """Returns the (name, value) pairs of all parameters, sorted by name"""
+        return self._items
+
+    def replace(self, **changes):
+        """Returns a copy with some values changed"""
+        return Config(self, **changes)
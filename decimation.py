@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Decimation of long series for plotting.
+A line of n values on an axes that is w pixels wide can show at most about 2 * w distinct values: the lowest and
+the highest one of the values that fall onto each pixel column. MinMaxPyramid keeps, for every power of two, the
+positions of the minimum and the maximum of each bucket of that many values, and updates them as values are
+appended. points() returns the positions of the values to draw for any range of the series, from the level whose
+buckets are about one pixel wide, so the cost of drawing depends on the width of the plot, not on the length of
+the series. Extremes are always kept, a single outlier generation stays visible at every zoom level.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+
+class MinMaxPyramid(object):
+    """A growing series of values, with the positions of the minimum and maximum of every bucket of 2**k values,
+    for all levels k >= 1"""
+
+    def __init__(self, capacity=1024):
+        self.values = np.zeros(capacity)
+        self.length = 0
+        self.minima = [None]  # minima[k][i]: position of the minimum of the values i * 2**k to (i + 1) * 2**k - 1
+        self.maxima = [None]
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def levels(self):
+        return len(self.minima) - 1
+
+    def append(self, values):
+        """Adds values at the end of the series, and updates the buckets that contain them"""
+        values = np.asarray(values, dtype=float).ravel()
+        if not len(values):
+            return
+        start, length = self.length, self.length + len(values)
+        if length > len(self.values):
+            grown = np.zeros(max(length, 2 * len(self.values)))
+            grown[:start] = self.values[:start]
+            self.values = grown
+        self.values[start:length] = values
+        self.length = length
+
+        level = 1
+        while (length - 1) >> (level - 1):  # the level below has more than one bucket
+            if level > self.levels:
+                self.minima.append(np.zeros(0, dtype=np.int64))
+                self.maxima.append(np.zeros(0, dtype=np.int64))
+            first, count = start >> level, ((length - 1) >> level) + 1  # the buckets that changed
+            lower = (first << 1), min(count << 1, -(-length >> (level - 1)))  # their buckets in the level below
+            if level == 1:
+                low = high = np.arange(*lower)
+            else:
+                low, high = self.minima[level - 1][slice(*lower)], self.maxima[level - 1][slice(*lower)]
+            minima, maxima = self._combine(low, high)
+            self.minima[level] = self._store(self.minima[level], first, count, minima)
+            self.maxima[level] = self._store(self.maxima[level], first, count, maxima)
+            level += 1
+
+    def _combine(self, low, high):
+        """Merges pairs of buckets, given as positions of their minima and maxima; an odd last bucket stays alone"""
+        if len(low) % 2:
+            low, high = np.append(low, low[-1]), np.append(high, high[-1])
+        low, high = low.reshape(-1, 2), high.reshape(-1, 2)
+        rows = np.arange(len(low))
+        # on ties, the earlier position is kept
+        minima = low[rows, (self.values[low[:, 1]] < self.values[low[:, 0]]).astype(int)]
+        maxima = high[rows, (self.values[high[:, 1]] > self.values[high[:, 0]]).astype(int)]
+        return minima, maxima
+
+    @staticmethod
+    def _store(level, first, count, positions):
+        """Writes the positions of the buckets first to count - 1 into a level, and grows it if needed"""
+        if count > len(level):
+            grown = np.zeros(max(count, 2 * len(level)), dtype=np.int64)
+            grown[:first] = level[:first]
+            level = grown
+        level[first:count] = positions
+        return level
+
+    def level_for(self, start, stop, width):
+        """Returns 0 if the values start to stop - 1 fit on width pixel columns as they are (two per column), and
+        otherwise the lowest level that shows them in at most width buckets"""
+        if stop - start <= 2 * width:
+            return 0
+        level = 1
+        while stop - start > (width << level) and level < self.levels:
+            level += 1
+        return level
+
+    def points(self, start=0, stop=None, width=1000):
+        """Returns the positions of the values to draw for the range start to stop - 1 on width pixel columns:
+        all of them if they fit, and otherwise the minimum and the maximum of every bucket, in order. Buckets that
+        overlap the range are included completely, so the line continues to the edges of the view"""
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(0, start)
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64)
+        level = self.level_for(start, stop, width)
+        if level == 0:
+            return np.arange(start, stop)
+        buckets = slice(start >> level, ((stop - 1) >> level) + 1)
+        minima, maxima = self.minima[level][buckets], self.maxima[level][buckets]
+        return np.column_stack([np.minimum(minima, maxima), np.maximum(minima, maxima)]).ravel()
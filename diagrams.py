@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+Diagram definitions, independent of the GUI toolkit.
+The simulation modules subclass Diagram to describe their plots; the GUI hosts them in a
+helper_widgets.DiagramWindow, which provides the matplotlib subplot to draw on.
+SeriesDiagram and HistogramDiagram keep their artists between updates and only change them, and DiagramRenderer
+redraws just these artists when the axes stay the same. Long series are decimated to the width of the axes.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from decimation import MinMaxPyramid
+
+
+class Diagram(object):
+    """An updateable diagram.
+    simulation: where we get our values from
+    subplot: the matplotlib axes to draw on
+    key: the key of the diagram, must be unique
+    window_title: optional window title
+    """
+
+    window_title = "Diagram"
+    key = "diagram"
+
+    def __init__(self, simulation, subplot):
+        self.simulation = simulation
+        self.subplot = subplot
+
+    def plot(self):
+        """overwrite this method to produce a different diagram type.
+        Diagrams that keep their artists return False if nothing changed, and "artists" if only their artists
+        (listed in self.artists) changed; any other result makes the whole diagram redraw"""
+        data = self.simulation.log["value"]
+        if len(data):
+            values = [step[0] for step in data]
+            self.subplot.plot(values, color="orange", linewidth=1.0)
+
+
+class SeriesDiagram(Diagram):
+    """A line of a per-generation statistic of an agent field (see summaries.GenerationSummaries).
+    The diagram subscribes to the summaries and appends only the generations that are new since its last update
+    to a decimation.MinMaxPyramid. The line only gets the points that can be told apart at the width of the axes,
+    the minimum and maximum of each pixel column in the visible range, so an update costs the same regardless of the
+    length of the run. Zooming into the axes shows the finer levels, down to the single generations. The axes are
+    only rescaled when the data leaves them, and not while the view is zoomed into earlier generations.
+    field: the agent field, by default the key of the diagram
+    statistic: "mean", "variance", "std", "minimum" or "maximum"
+    minimum_length: the number of generations that are needed before anything is drawn
+    """
+
+    field = None
+    statistic = "mean"
+    color = "orange"
+    minimum_length = 1
+
+    def __init__(self, simulation, subplot):
+        Diagram.__init__(self, simulation, subplot)
+        self.line = None
+        self.artists = []
+        self.series = MinMaxPyramid()
+        self.low, self.high = np.inf, -np.inf  # of all values so far
+        self.cursor = None
+
+    @property
+    def length(self):
+        """The number of values in the series"""
+        return len(self.series)
+
+    def new_values(self):
+        """Returns the values of the generations that were added since the last call"""
+        if self.cursor is None:
+            self.cursor = self.simulation.summaries.subscribe()
+        return self.cursor.read_series(self.statistic, self.field or self.key)
+
+    def append(self, values):
+        """Adds values at the end of the series"""
+        self.series.append(values)
+        self.low, self.high = min(self.low, values.min()), max(self.high, values.max())
+
+    def update_line(self, subplot=None):
+        """Sets the points of the line for the visible range of generations; called again whenever it changes"""
+        low, high = self.subplot.get_xlim()
+        width = max(1, int(self.subplot.bbox.width))
+        positions = self.series.points(int(np.floor(low)), int(np.ceil(high)) + 1, width)
+        self.line.set_data(positions, self.series.values[positions])
+
+    def plot(self):
+        """Updates the line. Returns False if nothing changed, "artists" if only the line changed, and "axes" if the
+        axes had to be rescaled"""
+        values = self.new_values()
+        previous_length = self.length
+        if len(values):
+            self.append(values)
+        if self.length < self.minimum_length or not len(values):
+            return False
+        rescale = self.line is None
+        if rescale:
+            self.line, = self.subplot.plot([], [], color=self.color, linewidth=1.0)
+            self.artists = [self.line]
+            self.subplot.callbacks.connect("xlim_changed", self.update_line)
+
+        high = self.subplot.get_xlim()[1]
+        if rescale or previous_length - 1 <= high < self.length - 1:  # the view follows the end of the series
+            self.subplot.set_xlim(0, max(10, 2 * (self.length - 1)))
+            rescale = True
+        low, high = self.subplot.get_ylim()
+        if rescale or values.min() < low or values.max() > high:
+            margin = 0.1 * (self.high - self.low) or 0.5
+            self.subplot.set_ylim(self.low - margin, self.high + margin)
+            rescale = True
+        self.update_line()
+        return "axes" if rescale else "artists"
+
+
+class HistogramDiagram(Diagram):
+    """The histogram of an agent field in the last recorded generation (see summaries.GenerationSummaries).
+    The bars are created once, later generations only change their heights (and their positions, for fields
+    without a fixed histogram range). The axes are only rescaled when the bars leave them.
+    field: the agent field
+    xlim, xticks: fixed limits and ticks of the horizontal axis, if given
+    """
+
+    field = "value"
+    color = "blue"
+    xlim = None
+    xticks = None
+
+    def __init__(self, simulation, subplot):
+        Diagram.__init__(self, simulation, subplot)
+        self.bars = None
+        self.plotted = None  # the generation that is shown
+        self.artists = []
+
+    def plot(self):
+        """Updates the bars. Returns False if nothing changed, "artists" if only the bars changed, and "axes" if the
+        axes had to be rescaled"""
+        generation, counts, edges = self.simulation.summaries.last_histogram(self.field)
+        if generation < 0 or generation == self.plotted:
+            return False
+        rescale = self.bars is None
+        if rescale:
+            self.bars = self.subplot.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=self.color)
+            self.artists = list(self.bars)
+            if self.xticks is not None:
+                self.subplot.set_xticks(self.xticks)
+        else:
+            for bar, x, width, height in zip(self.bars, edges[:-1].tolist(), np.diff(edges).tolist(),
+                                             counts.tolist()):
+                bar.set_x(x)
+                bar.set_width(width)
+                bar.set_height(height)
+
+        low, high = self.subplot.get_xlim()
+        if rescale or (self.xlim is None and (edges[0] < low or edges[-1] > high)):
+            self.subplot.set_xlim(self.xlim or (edges[0], edges[-1]))
+            rescale = True
+        if rescale or counts.max() > self.subplot.get_ylim()[1]:
+            self.subplot.set_ylim(0, max(1, 1.1 * counts.max()))
+            rescale = True
+        self.plotted = generation
+        return "axes" if rescale else "artists"
+
+
+class DiagramRenderer(object):
+    """Draws a diagram on a matplotlib canvas.
+    If the diagram only changed its artists, and the canvas supports it, only these are drawn again onto the
+    saved background of the axes (blitting). Everything else leads to a full redraw of the figure."""
+
+    def __init__(self, diagram, canvas):
+        self.diagram = diagram
+        self.canvas = canvas
+        self.blit = getattr(canvas, "supports_blit", False)
+        self.background = None
+        self.full_draws = 0
+        self.blits = 0
+        if self.blit:
+            canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event=None):
+        """After a full draw (also after resizing), saves the background and draws the animated artists on top"""
+        subplot = self.diagram.subplot
+        self.background = self.canvas.copy_from_bbox(subplot.bbox)
+        for artist in getattr(self.diagram, "artists", []):
+            subplot.draw_artist(artist)
+
+    def update(self):
+        """Updates the diagram from the simulation, and draws what has changed"""
+        result = self.diagram.plot()
+        if result is False:
+            return
+        artists = getattr(self.diagram, "artists", [])
+        if result == "artists" and self.blit and self.background is not None:
+            subplot = self.diagram.subplot
+            self.canvas.restore_region(self.background)
+            for artist in artists:
+                subplot.draw_artist(artist)
+            self.canvas.blit(subplot.bbox)
+            self.blits += 1
+        else:
+            for artist in artists:
+                artist.set_animated(self.blit)
+            self.canvas.draw()
+            self.full_draws += 1
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lockstep ensembles: many independent replicas of a simulation, stored as one (replicas, agents) array
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+import simulation_numpy
+
+
+CONFIDENCE_Z = 1.96  # the confidence bands cover 95% under a normal approximation
+
+
+def lockstep_levels(first, second, performed, number_of_agents):
+    """Assigns every interaction of every replica to a batch, so that no agent appears twice in a batch, and the
+    order of interactions for each agent is kept (see simulation_numpy.conflict_free_batches).
+    All arrays have the shape (replicas, interactions), the replicas are processed together.
+    Returns the batch number of every interaction, or -1 for those that do not take place"""
+    rows = np.arange(len(first))
+    last_level = np.full((len(first), number_of_agents), -1)
+    levels = np.full(first.shape, -1)
+    for i in range(first.shape[1]):
+        a, b = first[:, i], second[:, i]
+        level = np.maximum(last_level[rows, a], last_level[rows, b]) + 1
+        level = np.where(performed[:, i], level, -1)
+        last_level[rows, a] = np.maximum(last_level[rows, a], level)
+        last_level[rows, b] = np.maximum(last_level[rows, b], level)
+        levels[:, i] = level
+    return levels
+
+
+class Ensemble(object):
+    """Runs replicas independent copies of a simulation class side by side.
+    The agents of all replicas live in self.agents, an array of shape (replicas, agents). Interactions, selection
+    and mutation are performed for all replicas at once, using the vectorized methods of the simulation class.
+    self.log has the shape (generations, replicas, agents) (see Simulation.create_log); self.mean and self.band hold the mean of every agent
+    field over the replicas for each generation, and the half width of its confidence band.
+    """
+
+    def __init__(self, simulation_class=simulation_numpy.Simulation, replicas=50, config=None, seed=None):
+        self.replicas = replicas
+        self.simulation = simulation_class(config, seed)  # provides rules and random stream for all replicas
+        self.config = self.simulation.config
+        self.seed = self.simulation.seed
+
+        populations = []
+        for replica in range(replicas):
+            self.simulation.init_agents()
+            populations.append(self.simulation.agents)
+        self.agents = np.stack(populations)
+        self.simulation.agents = self.agents.reshape(-1)  # a flat view, as used by the batched interactions
+
+        self.current_generation = 1
+
+        self.log = self.simulation.create_log(self.agents.shape)
+        statistics = [(name, float) for name in self.agents.dtype.names]
+        self.mean = np.zeros(self.config.number_of_generations, dtype=statistics)
+        self.band = np.zeros(self.config.number_of_generations, dtype=statistics)
+        self.record(0)  # the initial populations
+
+    def record(self, generation):
+        """Logs the agents of all replicas, and updates mean and confidence band of the generation"""
+        interval = self.config.log_interval
+        if interval and generation % interval == 0:
+            self.log[generation // interval] = self.agents
+        for name in self.agents.dtype.names:
+            replica_means = self.agents[name].mean(axis=1)
+            self.mean[name][generation] = replica_means.mean()
+            if self.replicas > 1:
+                self.band[name][generation] = CONFIDENCE_Z * replica_means.std(ddof=1) / np.sqrt(self.replicas)
+
+    def calculate_generation(self):
+        """Advances all replicas by a generation. Returns False if we are done"""
+        if self.current_generation >= self.config.number_of_generations:
+            return False
+        number_of_agents = self.agents.shape[1]
+        kinds, first, second, performed = self.simulation.draw_interactions(
+            self.config.number_of_simulation_steps_in_a_generation, self.replicas)
+        levels = lockstep_levels(first, second, performed, number_of_agents)
+
+        # agent indices into the flattened (replicas, agents) array
+        offsets = number_of_agents * np.arange(self.replicas)[:, None]
+        kinds, first, second = kinds[performed], (first + offsets)[performed], (second + offsets)[performed]
+        levels = levels[performed]
+        order = np.argsort(levels, kind="stable")
+        for batch in np.split(order, np.flatnonzero(np.diff(levels[order])) + 1):
+            self.simulation.apply_interactions(kinds[batch], first[batch], second[batch])
+
+        self.record(self.current_generation)
+        self.simulation.select_population(self.agents)
+        self.current_generation += 1
+        return True
+
+    def calculate_all(self):
+        """Advances all replicas until the last generation"""
+        while self.calculate_generation():
+            pass
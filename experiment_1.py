@@ -7,49 +7,68 @@ Definition of agents and simulation function
 __author__ = 'joscha'
 __date__ = '20.06.14'
 
-from random import randint, random
+from random import random
 
-from widgets import Settings
-from helper_widgets import Diagram
+import configuration
+from diagrams import SeriesDiagram, HistogramDiagram
 import numpy as np
 
 import simulation_numpy as simulation
+from policies import Policy
+import kernels
 
 
-Settings.number_of_agents = 100
-Settings.number_of_parents_in_a_generation = 100
-Settings.number_of_surviving_agents = 0
-Settings.number_of_simulation_steps_in_a_generation = 125
-Settings.number_of_generations = 150
-Settings.influence_of_fitness_to_reproductive_success = 1.0
-Settings.mutation_rate = 0.0
+class Settings(configuration.Settings):
+    number_of_agents = 100
+    number_of_parents_in_a_generation = 100
+    number_of_surviving_agents = 0
+    number_of_simulation_steps_in_a_generation = 125
+    number_of_generations = 150
+    influence_of_fitness_to_reproductive_success = 1.0
+    mutation_rate = 0.0
 
 
-def cooperation_policy(agent, other_agent):
+def cooperation_policy(agent, other_agent, random=random):
     """Return true to cooperate, false to defect"""
     return agent["strategy"] <= other_agent["reputation"]
 
 
+def cooperation_policy_batch(agents, a, b, rng):
+    """Vectorized cooperation_policy for the agents at the index arrays a and b"""
+    return agents["strategy"][a] <= agents["reputation"][b]
+
+
+@kernels.jit
+def cooperation_policy_kernel(value, reputation, strategy, noise, deception, a, b, random):
+    return strategy[a] <= reputation[b]
+
+
 class Simulation(simulation.Simulation):
+    settings = Settings
+    histogram_ranges = {"reputation": (-5.5, 5.5, 11), "strategy": (-5.5, 5.5, 11)}  # (low, high, bins)
+    policies = {"cooperation": Policy(cooperation_policy, cooperation_policy_batch,
+                                      cooperation_policy_kernel)}  # there is no deception here
+    payoffs = (0., 1.0, 0.1)  # cooperation costs nothing, defection pays a little
 
     def init_agents(self):
-        self.agents = np.zeros(Settings.number_of_agents,
-                               dtype=[("value", float), ("reputation", int), ("strategy", int)])
-        self.agents["strategy"] = np.random.randint(-5, 6, size=len(self.agents))
+        self.agents = np.zeros(self.config.number_of_agents,
+                               dtype=self.agent_dtype([("value", float), ("reputation", int), ("strategy", int)]))
+        self.agents["strategy"] = self.rng.generator.integers(-5, 6, size=len(self.agents))
 
 
     def step(self):
         """Advances the simulation by a single step. Returns False if we are done"""
-        if self.current_simstep < Settings.number_of_simulation_steps_in_a_generation:
+        if self.current_simstep < self.config.number_of_simulation_steps_in_a_generation:
             self.cooperation_step()
             self.current_simstep += 1
             return True
         else:
-            if self.current_generation < Settings.number_of_generations:
-                self.log[self.current_generation] = self.agents
+            if self.current_generation < self.config.number_of_generations:
+                self.record_generation()
                 self.select_agents()
                 self.current_generation += 1
                 self.current_simstep = 0
+                self.checkpoint_if_due()
                 return True
         return False
 
@@ -64,9 +83,9 @@ class Simulation(simulation.Simulation):
         #agents[selector] = np.random.randint(-4, 6, size = len(selector))
 
         # if the mutation rate is low, it should be faster to select the mutated children directly
-        number_of_mutations = np.random.binomial(Settings.number_of_agents, Settings.mutation_rate)
-        agents[np.random.randint(0, len(agents),
-                                 size=number_of_mutations)] = np.random.randint(-4, 6, size = number_of_mutations)
+        number_of_mutations = self.rng.binomial(len(agents), self.config.mutation_rate)
+        agents[self.rng.generator.integers(0, len(agents), size=number_of_mutations)] = \
+            self.rng.generator.integers(-4, 6, size=number_of_mutations)
 
 
 
@@ -75,25 +94,11 @@ class Simulation(simulation.Simulation):
         agents["value"] = 0
         agents["reputation"] = 0
 
-    def cooperation_step(self, display_steps = True):
-        a, b = self._get_two_agents()
-
-        min_reputation = -5
-        max_reputation = 5
-
-        cooperation = cooperation_policy(a, b)
-        if cooperation:  # agent cooperates
-            #a["value"] -= 0.1
-            b["value"] += 1.0
-            a["reputation"] = min(a["reputation"] + 1, max_reputation)
-
-            self.last_relation = "cooperate"  # store for GUI
-
-        else:  # agent defects
-            a["value"] += 0.1
-            a["reputation"] = max(a["reputation"] -1, min_reputation)
-
-            self.last_relation = "defect"  # store for GUI
+    def draw_interactions(self, steps, replicas=1):
+        """Only cooperation steps are performed in this game"""
+        first, second = self.rng.pairs(self.config.number_of_agents, (replicas, steps))
+        return (np.full((replicas, steps), simulation.COOPERATION), first, second,
+                np.ones((replicas, steps), dtype=bool))
 
     def _update_log(self, generation = False):
         """adds the current values and reputations to the log"""
@@ -104,18 +109,14 @@ class Simulation(simulation.Simulation):
 
 from simulation_numpy import ValuePlot, ReputationPlot
 
-class StrategyHistogram(Diagram):
+class StrategyHistogram(HistogramDiagram):
     """A modified PlotWindow to display an updateable histogram"""
     key = "strategy distribution"
     window_title = "Distribution of Strategies"
-
-    def plot(self):
-        data = self.simulation.log[self.simulation.current_generation - 1]["strategy"]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.axis(xmin=-6, xmax=7)
-            self.subplot.hist(data, range(-6, 8), color="green", align="left")
-            self.subplot.set_xticks(range(-5, 7))
+    field = "strategy"
+    color = "green"
+    xlim = (-6, 7)
+    xticks = range(-5, 7)
 
 diagrams = [ ValuePlot, ReputationPlot, StrategyHistogram ]
 
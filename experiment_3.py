@@ -12,42 +12,58 @@ import experiment_1
 from experiment_1 import *
 
 
-Settings.number_of_agents = 100
-Settings.number_of_simulation_steps_in_a_generation = 300
-Settings.number_of_generations = 2000
-Settings.influence_of_fitness_to_reproductive_success = 0.99
-Settings.number_of_parents_in_a_generation = 50
-Settings.mutation_rate = 0.1
+class Settings(experiment_1.Settings):
+    number_of_agents = 100
+    number_of_simulation_steps_in_a_generation = 300
+    number_of_generations = 2000
+    influence_of_fitness_to_reproductive_success = 0.99
+    number_of_parents_in_a_generation = 50
+    mutation_rate = 0.1
+    noise = 0.5
 
-Settings.noise = 0.5
 
 # todo: 2d-strategy, and stochastic choice
 
-def cooperation_policy(agent, other_agent):
+def cooperation_policy(agent, other_agent, random=random):
     """Return true to cooperate, false to defect"""
     return agent["strategy"] + (random() - 0.5) * agent["noise"] <= other_agent["reputation"]
 
 
+def cooperation_policy_batch(agents, a, b, rng):
+    """Vectorized cooperation_policy for the agents at the index arrays a and b"""
+    return agents["strategy"][a] + (rng.uniforms(len(a)) - 0.5) * agents["noise"][a] <= agents["reputation"][b]
+
+
+@kernels.jit
+def cooperation_policy_kernel(value, reputation, strategy, noise, deception, a, b, random):
+    return strategy[a] + (random - 0.5) * noise[a] <= reputation[b]
+
+
 class Simulation(experiment_1.Simulation):
+    settings = Settings
+    histogram_ranges = dict(experiment_1.Simulation.histogram_ranges, noise=(0., 5., 10))
+    policies = dict(experiment_1.Simulation.policies,
+                    cooperation=Policy(cooperation_policy, cooperation_policy_batch, cooperation_policy_kernel))
+
     def init_agents(self):
-        self.agents = np.zeros(Settings.number_of_agents,
-                               dtype=[("value", float), ("reputation", int), ("strategy", int), ("noise", float)])
-        self.agents["strategy"] = np.random.randint(-5, 6, size=len(self.agents))
-        self.agents["noise"] = Settings.noise
+        self.agents = np.zeros(self.config.number_of_agents, dtype=self.agent_dtype(
+            [("value", float), ("reputation", int), ("strategy", int), ("noise", float)]))
+        self.agents["strategy"] = self.rng.generator.integers(-5, 6, size=len(self.agents))
+        self.agents["noise"] = self.config.noise
 
 
     def mutate_agents(self, agents):
         """called for the array of children of a new generation"""
 
         strategy = agents["strategy"]
-        number_of_mutations = np.random.binomial(Settings.number_of_agents, Settings.mutation_rate)
-        strategy[np.random.randint(0, len(strategy),
-                                   size=number_of_mutations)] = np.random.randint(-4, 6, size=number_of_mutations)
+        number_of_mutations = self.rng.binomial(len(agents), self.config.mutation_rate)
+        strategy[self.rng.generator.integers(0, len(strategy), size=number_of_mutations)] = \
+            self.rng.generator.integers(-4, 6, size=number_of_mutations)
 
         noise = agents["noise"]
-        number_of_mutations = np.random.binomial(Settings.number_of_agents, Settings.mutation_rate)
-        noise[np.random.randint(0, len(noise),
-                                size=number_of_mutations)] += (np.random.random(size=number_of_mutations) - 0.5)
+        number_of_mutations = self.rng.binomial(len(agents), self.config.mutation_rate)
+        noise[self.rng.generator.integers(0, len(noise), size=number_of_mutations)] += \
+            self.rng.uniforms(number_of_mutations) - 0.5
         np.clip(noise, 0., 5., out=noise)
 
 
@@ -63,15 +79,10 @@ class Simulation(experiment_1.Simulation):
             for key in self.log:
                 self.log[key].append([agent[key] for agent in self.agents])
 
-class NoisePlot(Diagram):
+class NoisePlot(SeriesDiagram):
     key = "noise"
     window_title = "Average level of noise"
-
-    def plot(self):
-        data = self.simulation.log[:self.simulation.current_generation]["noise"]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.plot(data.mean(axis=1), color="grey", linewidth=1.0)
+    color = "grey"
 
 from experiment_2 import StrategyPlot
 
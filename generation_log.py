@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generation logs: one snapshot of the agent array per generation.
+GenerationLog keeps the snapshots in memory, MemoryMappedLog appends them to a memory-mapped file, which other
+processes (and the diagrams) can read while the simulation is running. ColumnLog stores the agents of the
+dict-based engine (simulation.py) in one preallocated column per agent field.
+
+File layout of a MemoryMappedLog:
+    8 bytes   magic
+    8 bytes   length of the json header (little endian)
+    8 bytes   number of generations written so far (updated after each snapshot)
+    json      dtype, shape of a snapshot, configuration and seed of the simulation
+    padding   to a multiple of 64 bytes
+    data      the snapshots, in generation order
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import json
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b"RGLOG\x00\x01\x00"
+PREFIX = struct.Struct("<8sQQ")  # magic, header length, generations written
+ALIGNMENT = 64
+
+
+class GenerationLog(object):
+    """An in-memory log that holds a snapshot of shape `shape` for every generation.
+    Index it like an array of shape (generations, ) + shape. Writing beyond the end makes it grow."""
+
+    def __init__(self, dtype, shape, generations):
+        self.dtype = np.dtype(dtype)
+        self.snapshot_shape = tuple(shape)
+        self.data = np.zeros((generations, ) + self.snapshot_shape, dtype=self.dtype)
+        self.written = 0  # number of generations up to the last one recorded
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __setitem__(self, generation, snapshot):
+        if generation >= len(self.data):
+            self.grow(generation + 1)
+        self.data[generation] = snapshot
+        self.written = max(self.written, generation + 1)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def grow(self, generations):
+        """Makes room for at least the given number of generations"""
+        data = np.zeros((max(generations, 2 * len(self.data)), ) + self.snapshot_shape, dtype=self.dtype)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def close(self):
+        pass
+
+
+class MemoryMappedLog(GenerationLog):
+    """A generation log in a memory-mapped file that grows in chunks of `chunk` generations.
+    header: a json-serializable dict that is stored with the log (e.g. configuration and seed).
+    Use MemoryMappedLog.open(path) to read a log, also while it is being written by another process."""
+
+    def __init__(self, path, dtype, shape, header=None, chunk=64):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.snapshot_shape = tuple(shape)
+        self.chunk = chunk
+        self.header = dict(header or {}, dtype=np.lib.format.dtype_to_descr(self.dtype), shape=self.snapshot_shape)
+        self.written = 0
+        self.readonly = False
+
+        encoded = json.dumps(self.header, default=str).encode("utf-8")
+        self.offset = -(-(PREFIX.size + len(encoded)) // ALIGNMENT) * ALIGNMENT
+        with open(path, "wb") as f:
+            f.write(PREFIX.pack(MAGIC, len(encoded), 0))
+            f.write(encoded)
+            f.truncate(self.offset)
+        self._file = open(path, "r+b")
+        self.data = None
+        self.grow(chunk)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        """Opens an existing log for reading, without copying its data.
+        A writable log continues the file (e.g. when a simulation is resumed from a checkpoint)"""
+        log = cls.__new__(cls)
+        log.path = path
+        log.readonly = not writable
+        with open(path, "rb") as f:
+            magic, header_length, log.written = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError("%s is not a generation log" % path)
+            log.header = json.loads(f.read(header_length).decode("utf-8"))
+        descr = log.header["dtype"]
+        log.dtype = np.lib.format.descr_to_dtype([tuple(field) for field in descr] if isinstance(descr, list)
+                                                 else descr)
+        log.snapshot_shape = tuple(log.header["shape"])
+        log.offset = -(-(PREFIX.size + header_length) // ALIGNMENT) * ALIGNMENT
+        log._file = None
+        log.data = None
+        log.refresh()
+        if writable:
+            log.chunk = 64
+            log._file = open(path, "r+b")
+            generations, log.data = len(log.data), None
+            log.grow(max(generations, 1))
+        return log
+
+    def refresh(self):
+        """Re-reads the number of written generations, and maps the data that has been added to the file since"""
+        with open(self.path, "rb") as f:
+            self.written = PREFIX.unpack(f.read(PREFIX.size))[2]
+        generations = (os.path.getsize(self.path) - self.offset) // self._record_size()
+        if self.data is None or len(self.data) != generations:
+            self.data = np.memmap(self.path, dtype=self.dtype, mode="r", offset=self.offset,
+                                  shape=(generations, ) + self.snapshot_shape)
+
+    def _record_size(self):
+        return self.dtype.itemsize * int(np.prod(self.snapshot_shape, dtype=np.int64))
+
+    def grow(self, generations):
+        """Extends the file by whole chunks, so that it holds at least the given number of generations"""
+        generations = -(-generations // self.chunk) * self.chunk
+        if self.data is not None:
+            self.data.flush()
+        self._file.truncate(self.offset + generations * self._record_size())
+        self.data = np.memmap(self._file, dtype=self.dtype, mode="r+", offset=self.offset,
+                              shape=(generations, ) + self.snapshot_shape)
+
+    def __setitem__(self, generation, snapshot):
+        if self.readonly:
+            raise ValueError("the log is opened for reading only")
+        GenerationLog.__setitem__(self, generation, snapshot)
+        # the snapshot is in the shared mapping already, now tell the readers about it
+        os.pwrite(self._file.fileno(), struct.pack("<Q", self.written), PREFIX.size - 8)
+
+    def close(self):
+        if self.data is not None and not self.readonly:
+            self.data.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ColumnLog(object):
+    """An in-memory log of agents given as dicts (see simulation.py), with a column for every field.
+    log[name] is an array of shape (samples, agents) with the values of that field in every sample so far;
+    log.generations holds the generation and log.simsteps the step of each sample. Appending beyond the
+    preallocated number of samples makes the log grow."""
+
+    def __init__(self, names, number_of_agents, samples, dtype=float):
+        self.names = tuple(names)
+        self.number_of_agents = number_of_agents
+        self.dtype = np.dtype(dtype)
+        self.columns = {name: np.zeros((samples, number_of_agents), dtype=self.dtype) for name in self.names}
+        self.generations = np.zeros(samples, dtype=np.int64)
+        self.simsteps = np.zeros(samples, dtype=np.int64)
+        self.written = 0  # number of samples so far
+
+    def __len__(self):
+        return len(self.generations)
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.written]
+
+    def append(self, agents, generation=0, simstep=0):
+        """Adds a sample of the agents (a list of dicts) taken at the given generation and step"""
+        if self.written >= len(self):
+            self.grow(self.written + 1)
+        for name, column in self.columns.items():
+            column[self.written] = [agent[name] for agent in agents]
+        self.generations[self.written] = generation
+        self.simsteps[self.written] = simstep
+        self.written += 1
+
+    def grow(self, samples):
+        """Makes room for at least the given number of samples"""
+        added = max(samples, 2 * len(self)) - len(self)
+        for name, column in self.columns.items():
+            self.columns[name] = np.concatenate([column, np.zeros((added, self.number_of_agents), dtype=self.dtype)])
+        self.generations = np.concatenate([self.generations, np.zeros(added, dtype=np.int64)])
+        self.simsteps = np.concatenate([self.simsteps, np.zeros(added, dtype=np.int64)])
+
+    def close(self):
+        pass
@@ -9,9 +9,9 @@ __date__ = '08.07.14'
 
 from tkinter import *
 from tkinter import ttk
-from configuration import Settings
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from diagrams import DiagramRenderer
 
 
 class SimFrame(Frame):
@@ -117,10 +117,9 @@ class ConfigDialog(Toplevel):
 
         self.configvalues = {}
 
-        config = [key for key in dir(Settings) if not key.startswith('_')]
+        config = parent.simulation.config.items()
 
-        for index, key in enumerate(config):
-            value = getattr(Settings, key)
+        for index, (key, value) in enumerate(config):
             if isinstance(value, int):
                 self.configvalues[key] = IntVar()
             elif isinstance(value, float):
@@ -140,11 +139,10 @@ class ConfigDialog(Toplevel):
                    command=self.apply_values).grid(row=0, column=1, sticky=E)
 
     def apply_values(self):
-        """Close config window, update game settings, and start the simulator"""
+        """Close config window, and start the simulator with the new settings"""
         self.destroy()
-        for key, value in self.configvalues.items():
-            setattr(Settings, key, self.configvalues[key].get())
-        self.parent.reset_simulation()
+        values = {key: variable.get() for key, variable in self.configvalues.items()}
+        self.parent.reset_simulation(self.parent.simulation.config.replace(**values))
 
 
 class ScrollableCanvas(Canvas):
@@ -246,51 +244,39 @@ class MainMenu(Menu):
         menu_help.add_command(label='Contact', command=app.show_contact)
 
 
-class Diagram(Toplevel):
+class DiagramWindow(Toplevel):
     """A matplotlib window that displays an updateable diagram.
     parent: root window
-    data: where we get our values from
-    key: the key of the plot window, must be unique
-    title: optional window title
+    diagram_class: the diagrams.Diagram subclass that is drawn
+    simulation: where the diagram gets its values from
     """
 
-    window_title = "Diagram"
-    key = "diagram"
-
-    def __init__(self, parent, simulation, *args, **kwargs):
+    def __init__(self, parent, diagram_class, simulation, *args, **kwargs):
         Toplevel.__init__(self, parent, *args, **kwargs)
 
         self.parent = parent
-        self.title(self.window_title)
+        self.key = diagram_class.key
+        self.title(diagram_class.window_title)
         self.bind("<Destroy>", self.destroy)
 
-        self.simulation = simulation
-
         figure = plt.Figure(figsize=(5, 4), dpi=100)
         self.subplot = figure.add_subplot(111)
+        self.diagram = diagram_class(simulation, self.subplot)
 
         plt.ion()
 
         self.canvas = FigureCanvasTkAgg(figure, master=self)
-        self.canvas.show()
+        self.renderer = DiagramRenderer(self.diagram, self.canvas)
+        self.canvas.draw()
         self.canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=1)
 
         self.update_diagram()
 
 
     def update_diagram(self):
-        """re-reads the datasource and redraws the diagram accordingly"""
-        self.plot()
-        self.canvas.draw()
-
-    def plot(self):
-        """overwrite this method to produce a different diagram type"""
-        data = self.simulation.log["value"]
-        if len(data):
-            values = [step[0] for step in data]
-            self.subplot.plot(values, color="orange", linewidth=1.0)
+        """re-reads the datasource and redraws what has changed"""
+        self.renderer.update()
 
-    def destroy(self):
+    def destroy(self, event=None):
         self.parent.open_diagrams.pop(self.key, None)  # remove from index of open plot windows
         Toplevel.destroy(self)
-
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compiled simulation steps, for games in which the interactions of a generation depend on each other too much to be
+batched well (see simulation_numpy.conflict_free_batches).
+numba is optional: if it is installed, the functions decorated with jit are compiled with numba.njit, and the
+"compiled" engine plays the interactions of a whole generation in a single call of play(). Otherwise they stay plain
+python functions (they are still used to check the kernels), and the engine falls back to the batched numpy engine.
+The kernels work on plain column arrays of the agent fields, in the order of COLUMNS; a game without one of the
+fields passes an array of zeros. Policies take part in their kernel form (see policies.py):
+    kernel(value, reputation, strategy, noise, deception, a, b, random) -> bool
+decides for the agents at the indices a and b, random is a uniform float drawn for this decision.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+AVAILABLE = numba is not None  # whether the kernels are compiled
+COLUMNS = ["value", "reputation", "strategy", "noise", "deception probability"]
+COOPERATION, DECEPTION = 0, 1  # the interaction kinds of simulation_numpy
+
+
+def jit(function):
+    """Compiles function with numba, if it is installed"""
+    if numba is None:
+        return function
+    return numba.njit(function)
+
+
+def columns(agents):
+    """Returns the COLUMNS of an agent array as arrays that share the memory of the agents, or zeros for fields the
+    agents do not have"""
+    return tuple(agents[name] if name in agents.dtype.names else np.zeros(len(agents)) for name in COLUMNS)
+
+
+@jit
+def no_policy(value, reputation, strategy, noise, deception, a, b, random):
+    """The kernel policy of a decision that a game does not make"""
+    return False
+
+
+@jit
+def play(kinds, first, second, random, value, reputation, strategy, noise, deception,
+         cooperation_policy, reputation_policy, payoffs, repercussion):
+    """Plays the interactions kinds[i] between the agents first[i] and second[i], in order, like cooperation_step and
+    deception_step of simulation_numpy.
+    random: uniform floats of shape (interactions, 2), for the decision and the repercussion of every interaction
+    payoffs: the change of value of a cooperating agent, of the agent it cooperates with, and of a defecting agent
+    repercussion: the probability of repercussion for reputation diminishment"""
+    for i in range(len(kinds)):
+        a, b = first[i], second[i]
+        if kinds[i] == COOPERATION:
+            if cooperation_policy(value, reputation, strategy, noise, deception, a, b, random[i, 0]):
+                value[a] += payoffs[0]
+                value[b] += payoffs[1]
+                reputation[a] = min(reputation[a] + 1, 5)
+            else:
+                value[a] += payoffs[2]
+                reputation[a] = max(reputation[a] - 1, -5)
+        elif reputation_policy(value, reputation, strategy, noise, deception, a, b, random[i, 0]):
+            reputation[b] = max(reputation[b] - 1, -5)
+            if random[i, 1] < repercussion:
+                reputation[a] = max(reputation[a] - 1, -5)
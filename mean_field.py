@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deterministic mean-field approximation of the games of simulation_numpy (the deception game) and of experiment_1 to
+experiment_4, for populations so large that only the expected course of the game matters.
+The population is a distribution over types (the inherited fields of the agents, continuous ones on a grid of
+levels). During a generation, the state is the fraction of agents of every type with every reputation (-5 to 5),
+and the value they have gained, and it follows the expected change that cooperation_step and deception_step make
+in a simulation step: every agent is the first agent of an interaction with probability 1 / number_of_agents, and
+its partner is drawn from the whole population. With the reputations of the partners fixed, a step is a linear map
+of the state of every type (see MeanField.transition), and many steps are its matrix power, which takes a matrix
+product for every binary digit of the number of steps (see advance). A generation is split into a fixed number of
+segments, and every segment applies the power of the step at the reputations expected half way through it.
+The decisions and payoffs are those of the agent-based simulation (the rules of a model): the probability of every
+decision is computed from the batch form of the policy that the simulation class registers under its name (see
+decision_probability), and the payoffs are the payoffs of the class, so a changed policy changes the model as well.
+The value is kept for every type and reputation, and its second moment for every type. At the end of a generation,
+the values of the agents of a type are taken to be normally distributed, and the population of the next generation
+is the expected result of the selection operator (config.selection) on these distributions, binned into VALUE_BINS
+values between the lowest and the highest value expected among number_of_agents agents, and of the mutation of the
+children. The summaries show the mean value of the agents of every type and reputation, so the spread of the
+value within them is missing there.
+Agent-based runs are only needed to check the approximation at a few points, see validate().
+The cost of a generation does not depend on the number of agents, and grows with the number of types, but hardly
+with the number of steps: 1000 times more steps take ten more matrix products per segment. With the default
+settings of the games, a generation takes about
+    simulation_numpy    6 ms (101 types), 12 s for 2000 generations
+    experiment_1        1.6 ms (11 types), 3 s
+    experiment_2        1.7 ms (11 types), 3.5 s
+    experiment_3        23 ms (561 types), 46 s
+    experiment_4        3.4 ms (51 types), 7 s
+and a hundred times more steps in a generation cost about half as much again. In the first generations, the mean
+value and reputation differ by less than 0.05 from applying the expected change one step at a time.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from configuration import Config
+from summaries import GenerationSummaries
+from selection import fitness_shares, operator
+import simulation_numpy
+import experiment_1
+import experiment_2
+import experiment_3
+import experiment_4
+
+
+REPUTATIONS = np.arange(-5, 6)
+STRATEGIES = np.arange(-5, 6)
+MUTATED_STRATEGIES = np.arange(-4, 6)  # the strategies of mutated children, see experiment_1.mutate_agents
+DECEPTION_LEVELS = np.linspace(0., 1., 101)  # the grid of deception probabilities
+NOISE_LEVELS = np.linspace(0., 5., 51)  # the grid of noise levels
+VALUE_BINS = 200  # the resolution of the value distribution in selection
+DECISION_SAMPLES = 200  # the random numbers at which the policies are evaluated, see decision_probability()
+
+
+def matvec(matrices, vectors):
+    """Multiplies a stack of matrices with a stack of vectors"""
+    return (matrices @ vectors[..., None])[..., 0]
+
+
+def column_sums(matrices):
+    return np.ones(matrices.shape[-2]) @ matrices
+
+
+def compose(later, earlier):
+    """Returns the transition (see MeanField.transition) that applies earlier and then later"""
+    P, Q, r = later
+    P0, Q0, r0 = earlier
+    return P @ P0, Q @ P0 + P @ Q0, matvec(P0.swapaxes(1, 2), r) + 2 * matvec(Q0.swapaxes(1, 2), column_sums(Q)) + r0
+
+
+def advance(transition, steps, occupation, value, square):
+    """Applies a transition the given number of times to the occupation, value and square of every type, and returns
+    them. The transition is squared for every binary digit of steps, and applied for the digits that are set"""
+    while steps:
+        if steps & 1:
+            P, Q, r = transition
+            square = square + (r * occupation).sum(axis=1) + 2 * (column_sums(Q) * value).sum(axis=1)
+            occupation, value = matvec(P, occupation), matvec(Q, occupation) + matvec(P, value)
+        steps >>= 1
+        if steps:
+            transition = compose(transition, transition)
+    return occupation, value, square
+
+
+def fittest(fitness, mass, fraction):
+    """The mass of every cell that belongs to the given fraction of fittest agents"""
+    order = np.argsort(-fitness, kind="stable")
+    before = np.cumsum(mass[order]) - mass[order]
+    result = np.empty_like(mass)
+    result[order] = np.clip(fraction - before, 0., mass[order])
+    return result
+
+
+def below(fitness, mass):
+    """The fraction of agents that are less fit than the agents of every cell, and the fraction up to and including
+    them (ties are ordered arbitrarily)"""
+    order = np.argsort(fitness, kind="stable")
+    lower = np.empty_like(mass)
+    lower[order] = np.cumsum(mass[order]) - mass[order]
+    return lower, lower + mass
+
+
+def truncation(fitness, mass, config):
+    """The fittest agents are the parents, fitter parents get more children (see selection.truncation)"""
+    parents = fittest(fitness, mass, config.number_of_parents_in_a_generation / config.number_of_agents)
+    return parents * fitness_shares(fitness[None, :], config.influence_of_fitness_to_reproductive_success)[0]
+
+
+def proportional(fitness, mass, config):
+    return mass * fitness_shares(fitness[None, :], config.influence_of_fitness_to_reproductive_success)[0]
+
+
+def tournament(fitness, mass, config):
+    """A cell wins a tournament if its best contestant is at least as fit as all others"""
+    lower, upper = below(fitness, mass)
+    return upper ** config.tournament_size - lower ** config.tournament_size
+
+
+def rank(fitness, mass, config):
+    lower, upper = below(fitness, mass)
+    influence = config.influence_of_fitness_to_reproductive_success
+    return mass * (1 - influence + influence * (lower + upper))
+
+
+OPERATORS = {"truncation": truncation, "proportional": proportional, "tournament": tournament, "rank": rank}
+# the operators return the expected share of the children of every cell (not normalized)
+
+
+def uniform_kernel(levels, width):
+    """Returns the matrix of probabilities that a value at levels[i], plus a uniform random number in (-width, width)
+    and clipped to the range of the levels, is closest to levels[j]"""
+    if width <= 0:
+        return np.eye(len(levels))
+    edges = np.concatenate([[-np.inf], (levels[1:] + levels[:-1]) / 2, [np.inf]])
+    cdf = np.clip((edges[None, :] - levels[:, None] + width) / (2 * width), 0., 1.)
+    return np.diff(cdf, axis=1)
+
+
+def normal_cdf(x):
+    """The standard normal distribution function, with an absolute error below 1e-7 (Abramowitz and Stegun 7.1.26)"""
+    z = np.abs(x) / np.sqrt(2.)
+    t = 1. / (1. + 0.3275911 * z)
+    polynomial = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1. - polynomial * np.exp(-z * z)
+    return 0.5 * (1. + np.sign(x) * erf)
+
+
+def nearest(levels, value):
+    return int(np.abs(levels - value).argmin())
+
+
+class QuadratureStream(object):
+    """Takes the place of the RandomStreams of a batch policy: the uniform floats are DECISION_SAMPLES evenly spaced
+    points in (0, 1), repeated, so the mean of the decisions over one round of them is the probability of the
+    decision"""
+
+    def uniforms(self, size):
+        return np.resize((np.arange(DECISION_SAMPLES) + 0.5) / DECISION_SAMPLES, size)
+
+
+class MeanField(object):
+    """The deception game of simulation_numpy as a mean-field model.
+    types: the inherited fields of every type, as an agent array
+    mass: the fraction of agents of every type at the start of the current generation
+    occupation, value: arrays of shape (types, reputations), the fraction of agents of every type with every
+        reputation, and the sum of the values they have gained in the current generation
+    square: the sum of the squares of the values of the agents of every type
+    """
+
+    settings = simulation_numpy.Settings
+    rules = simulation_numpy.Simulation  # the agent-based simulation: its policies and payoffs, see validate()
+    segments = 8  # the parts of a generation in which the step is the same, see calculate_steps()
+    early = 1.  # in interactions of an agent, see calculate_steps()
+
+    def __init__(self, config=None, seed=None):
+        self.config = config if config is not None else Config(self.settings)
+        operator(self.config.selection)  # fails early for an unknown operator
+        self.seed = seed  # the model is deterministic, the seed is only kept for the interface of the simulations
+        self.types, self.mass = self.init_types()
+        self.mass = self.mass / self.mass.sum()
+        self.cooperation = self.decision_probability("cooperation")  # of every type with every partner reputation
+        self.deception = self.decision_probability("reputation") if "reputation" in self.rules.policies else None
+        number_of_surviving_agents = min(self.config.number_of_surviving_agents, self.config.number_of_agents)
+        self.mutation = self.mutation_matrix(self.config.number_of_agents - number_of_surviving_agents)
+        self.state = np.zeros((2, len(self.types), len(REPUTATIONS)))
+        self.occupation, self.value = self.state  # views, so both can be updated at once
+        self.square = np.zeros(len(self.types))
+        self.reset_reputations()
+
+        self.current_simstep = 0
+        self.current_generation = 1
+        self.last_relation = None
+        self.last_agent_0_index = None
+        self.last_agent_1_index = None
+        self.timer = None
+        self.log = None  # there are no agents to log, only the summaries are kept
+
+        self.summaries = GenerationSummaries(self.dtype, self.config.number_of_generations, self.rules.histogram_ranges)
+        self.record_generation(0)
+
+    def init_types(self):
+        """Returns the types and the initial fraction of agents of every type: all have deception probability 0.5"""
+        types = np.zeros(len(DECEPTION_LEVELS), dtype=[("deception probability", float)])
+        types["deception probability"] = DECEPTION_LEVELS
+        mass = np.zeros(len(types))
+        mass[nearest(DECEPTION_LEVELS, 0.5)] = 1.
+        return types, mass
+
+    def decision_probability(self, name):
+        """Returns the probability that an agent of every type decides for the policy of the given name of the rules,
+        about an agent of every reputation, shape (types, reputations). The batch form of the policy is evaluated
+        at DECISION_SAMPLES random numbers for every pair; it may depend on the inherited fields of the agent and on
+        the reputation of the other one"""
+        types, reputations = len(self.types), len(REPUTATIONS)
+        agents = np.zeros(types + reputations, dtype=self.dtype)  # the types, followed by the partners
+        for field in self.types.dtype.names:
+            agents[field][:types] = self.types[field]
+        agents["reputation"][types:] = REPUTATIONS
+        a = np.repeat(np.arange(types), reputations * DECISION_SAMPLES)
+        b = types + np.tile(np.repeat(np.arange(reputations), DECISION_SAMPLES), types)
+        decisions = self.rules.policies[name].batch(agents, a, b, QuadratureStream())
+        return decisions.reshape(types, reputations, DECISION_SAMPLES).mean(axis=2)
+
+    def mutation_matrix(self, number_of_children):
+        """Returns the probability that a child of a parent of type i has type j, if there are number_of_children
+        children in a generation"""
+        return uniform_kernel(DECEPTION_LEVELS, self.config.mutation_rate)
+
+    @property
+    def dtype(self):
+        return np.dtype([("value", float), ("reputation", int)] + self.types.dtype.descr)
+
+    def reset_reputations(self):
+        """Starts a generation: every agent has reputation 0 and value 0"""
+        self.state[:] = 0
+        self.square[:] = 0
+        self.occupation[:, nearest(REPUTATIONS, 0)] = self.mass
+        # the probability that an agent of every reputation is cooperated with, and that it is badmouthed, when it
+        # is the second agent of an interaction; it does not change during a generation
+        self.cooperated_with = self.mass @ self.cooperation
+        self.deceived = self.mass @ self.deception if self.deception is not None else None
+
+    def cells(self):
+        """Returns the population as an agent array of shape (types, reputations), with the mean value of the agents
+        of every type and reputation, and the fraction of agents in each"""
+        cells = np.zeros(self.occupation.shape, dtype=self.dtype)
+        cells["value"] = np.divide(self.value, self.occupation, out=np.zeros_like(self.value),
+                                   where=self.occupation > 0)
+        cells["reputation"] = REPUTATIONS
+        for name in self.types.dtype.names:
+            cells[name] = self.types[name][:, None]
+        return cells, self.occupation
+
+    def record_generation(self, generation=None):
+        if generation is None:
+            generation = self.current_generation
+        cells, occupation = self.cells()
+        self.summaries.record(generation, cells, occupation * self.config.number_of_agents)
+
+    def step(self):
+        """Plays the current generation (the model has no single steps), or starts the next generation if it has
+        been played. Returns False if we are done"""
+        if self.current_simstep < self.config.number_of_simulation_steps_in_a_generation:
+            self.calculate_steps()
+            return True
+        if self.current_generation < self.config.number_of_generations:
+            self.record_generation()
+            self.select_agents()
+            self.current_generation += 1
+            self.current_simstep = 0
+            return True
+        return False
+
+    def calculate_generation(self):
+        """Advances the simulation by a generation"""
+        this_generation = self.current_generation
+        while self.current_generation == this_generation and self.step():
+            pass
+
+    def calculate_steps(self):
+        """Applies the remaining simulation steps of the current generation in self.segments updates. The reputations
+        change fastest at the start of a generation, so the segments are evenly spaced in the logarithm of early plus
+        the interactions of an agent so far: they are about even in short generations, and grow geometrically in long
+        ones"""
+        steps = self.config.number_of_simulation_steps_in_a_generation - self.current_simstep
+        interactions = steps / self.config.number_of_agents  # of every agent, as first agent of an interaction
+        growth = (1 + interactions / self.early) ** (np.arange(self.segments + 1) / self.segments) - 1
+        for length in np.diff(np.round(steps * growth / growth[-1]).astype(int)):
+            if length:
+                self.update(length)
+        self.current_simstep += steps
+
+    def update(self, steps):
+        """Applies the expected change of the given number of simulation steps. The steps are taken at the
+        reputations half way through, which are predicted with the steps at the current reputations"""
+        P, Q, r = self.transition(self.occupation.sum(axis=0))
+        half = matvec(np.linalg.matrix_power(P, steps // 2), self.occupation)
+        self.occupation[:], self.value[:], self.square[:] = advance(self.transition(half.sum(axis=0)), steps,
+                                                                    self.occupation, self.value, self.square)
+
+    def transition(self, reputation):
+        """Returns the expected change of a simulation step in which the partners have the given distribution of
+        reputations, as (P, Q, r): the occupation of a type becomes P @ occupation, the value Q @ occupation +
+        P @ value, and r @ occupation + 2 * Q.sum(axis=0) @ value is added to the square (with a matrix of shape
+        (reputations, reputations) and a vector for every type)"""
+        config = self.config
+        cost, benefit, defection = self.rules.payoffs
+        rate = 1 / config.number_of_agents  # the probability that an agent is first agent of the interaction
+        types, reputations = self.occupation.shape
+
+        cooperating = self.cooperation @ reputation  # the probability that an agent of a type cooperates
+        up = rate * cooperating
+        down = np.repeat((rate * (1 - cooperating))[:, None], reputations, axis=1)
+        gain = (rate * (cooperating * cost + (1 - cooperating) * defection))[:, None] \
+            + rate * benefit * self.cooperated_with[None, :]
+        gain_squared = (rate * (cooperating * cost ** 2 + (1 - cooperating) * defection ** 2))[:, None] \
+            + rate * benefit ** 2 * self.cooperated_with[None, :]
+        if self.deception is not None:
+            rate *= 1 - config.probability_of_a_reputation_exchange
+            down += rate * (config.probability_of_repercussion_for_reputation_diminishment
+                            * (self.deception @ reputation)[:, None] + self.deceived[None, :])
+
+        # the agents move with their value, and stay at the highest and lowest reputation
+        lower, higher, every = np.arange(reputations - 1), np.arange(1, reputations), np.arange(reputations)
+        P = np.zeros((types, reputations, reputations))
+        P[:, higher, lower] = up[:, None]
+        P[:, lower, higher] = down[:, 1:]
+        P[:, every, every] = 1 - up[:, None] - down
+        P[:, -1, -1] += up
+        P[:, 0, 0] += down[:, 0]
+        Q = np.zeros_like(P)
+        Q[:, every, every] = gain
+        return P, Q, gain_squared
+
+    def select_agents(self):
+        """The expected population of the next generation: the fittest agents survive, and the children of the parents
+        chosen by the selection operator are mutated (see simulation_numpy.select_population)"""
+        config = self.config
+        distribution, fitness = self.value_distribution()
+        mass = distribution.sum(axis=0)
+        present = mass > 0
+        distribution, fitness, mass = distribution[:, present], fitness[present], mass[present]
+
+        # all agents in a bin have the same fitness, so they get the same share of survivors and children
+        number_of_surviving_agents = min(config.number_of_surviving_agents, config.number_of_agents)
+        survivors = fittest(fitness, mass, number_of_surviving_agents / config.number_of_agents)
+        children = OPERATORS[config.selection](fitness, mass, config)
+        children *= (1 - number_of_surviving_agents / config.number_of_agents) / children.sum()
+
+        survivors = distribution @ (survivors / mass)
+        children = (distribution @ (children / mass)) @ self.mutation
+        self.mass = survivors + children
+        self.mass /= self.mass.sum()
+        self.reset_reputations()
+
+    def value_distribution(self):
+        """Returns the fraction of agents of every type in every bin of value, shape (types, VALUE_BINS), and the
+        value of every bin. The values of a type are normally distributed, the bins reach from the lowest to the
+        highest value expected among number_of_agents agents, and the agents beyond fall into the outer bins"""
+        mass = self.occupation.sum(axis=1)
+        present = mass > 0
+        mean = np.divide(self.value.sum(axis=1), mass, out=np.zeros_like(mass), where=present)
+        variance = np.divide(self.square, mass, out=np.zeros_like(mass), where=present) - mean ** 2
+        deviation = np.sqrt(np.maximum(variance, 0.))
+        low = (mean - 6 * deviation)[present].min()
+        high = (mean + 6 * deviation)[present].max()
+        if high - low < 1e-9:
+            low, high = low - 0.5, high + 0.5
+        deviation = np.maximum(deviation, (high - low) * 1e-6)[:, None]
+
+        def distribution_function(edges):
+            return normal_cdf((edges[None, :] - mean[:, None]) / deviation)
+
+        # the expected extremes of number_of_agents values are about at these quantiles
+        extreme = 0.5 / self.config.number_of_agents
+        edges = np.linspace(low, high, VALUE_BINS // 4 + 1)  # a coarse grid, to find them
+        cumulative = mass @ distribution_function(edges)
+        first = max(np.searchsorted(cumulative, extreme) - 1, 0)
+        last = min(max(np.searchsorted(cumulative, cumulative[-1] - extreme), first + 1), len(edges) - 1)
+        edges = np.linspace(edges[first], edges[last], VALUE_BINS + 1)
+        cdf = distribution_function(edges)
+        cdf[:, 0], cdf[:, -1] = 0., 1.
+        return mass[:, None] * np.diff(cdf, axis=1), (edges[1:] + edges[:-1]) / 2
+
+
+class Experiment1(MeanField):
+    """experiment_1: the agents cooperate if their strategy is at most the reputation of the other agent"""
+
+    settings = experiment_1.Settings
+    rules = experiment_1.Simulation
+
+    def init_types(self):
+        types = np.zeros(len(STRATEGIES), dtype=[("strategy", int)])
+        types["strategy"] = STRATEGIES
+        return types, np.ones(len(types))
+
+    def mutated(self, number_of_children):
+        """The probability that a child is mutated: the number of mutations is binomial, and every mutation picks a
+        child at random"""
+        if number_of_children <= 0:
+            return 0.
+        return 1 - (1 - self.config.mutation_rate / number_of_children) ** number_of_children
+
+    def strategy_mutation(self, number_of_children):
+        mutated = self.mutated(number_of_children)
+        matrix = (1 - mutated) * np.eye(len(STRATEGIES))
+        matrix[:, np.isin(STRATEGIES, MUTATED_STRATEGIES)] += mutated / len(MUTATED_STRATEGIES)
+        return matrix
+
+    def mutation_matrix(self, number_of_children):
+        return self.strategy_mutation(number_of_children)
+
+
+class Experiment2(Experiment1):
+    settings = experiment_2.Settings
+    rules = experiment_2.Simulation
+
+
+class Experiment3(Experiment1):
+    """experiment_3: the agents cooperate if their strategy, plus noise, is at most the reputation of the other
+    agent; strategy and noise mutate"""
+
+    settings = experiment_3.Settings
+    rules = experiment_3.Simulation
+
+    def init_types(self):
+        types = np.zeros((len(STRATEGIES), len(NOISE_LEVELS)), dtype=[("strategy", int), ("noise", float)])
+        types["strategy"] = STRATEGIES[:, None]
+        types["noise"] = NOISE_LEVELS[None, :]
+        mass = np.zeros(types.shape)
+        mass[:, nearest(NOISE_LEVELS, self.config.noise)] = 1.
+        return types.ravel(), mass.ravel()
+
+    def noise_mutation(self, number_of_children):
+        mutated = self.mutated(number_of_children)
+        return (1 - mutated) * np.eye(len(NOISE_LEVELS)) + mutated * uniform_kernel(NOISE_LEVELS, 0.5)
+
+    def mutation_matrix(self, number_of_children):
+        return np.kron(self.strategy_mutation(number_of_children), self.noise_mutation(number_of_children))
+
+
+class Experiment4(Experiment3):
+    """experiment_4: all agents have the same strategy, only the noise mutates"""
+
+    settings = experiment_4.Settings
+    rules = experiment_4.Simulation
+
+    def init_types(self):
+        types = np.zeros(len(NOISE_LEVELS), dtype=[("strategy", int), ("noise", float)])
+        types["strategy"] = self.config.strategy
+        types["noise"] = NOISE_LEVELS
+        mass = np.zeros(len(types))
+        mass[nearest(NOISE_LEVELS, self.config.noise)] = 1.
+        return types, mass
+
+    def mutation_matrix(self, number_of_children):
+        return self.noise_mutation(number_of_children)
+
+
+MODELS = {"simulation_numpy": MeanField, "experiment_1": Experiment1, "experiment_2": Experiment2,
+          "experiment_3": Experiment3, "experiment_4": Experiment4}
+
+
+def validate(model, config, generations, runs=10, fields=("value", "reputation")):
+    """Runs the agent-based simulation of a model class for the given number of seeds, and returns, for every field,
+    the mean of the field at the given generations in the model, and the mean and the standard error over the
+    runs, as arrays: {field: (model, runs mean, runs standard error)}"""
+    generations = np.asarray(generations)
+    last = generations.max() + 1
+    config = config.replace(number_of_generations=max(config.number_of_generations, last + 1))
+    approximation = model(config)
+    while approximation.current_generation <= last:
+        approximation.calculate_generation()
+    samples = []
+    for seed in range(runs):
+        simulation = model.rules(config.replace(engine="batched", log_interval=0), seed=seed)
+        while simulation.current_generation <= last:
+            simulation.calculate_generation()
+        samples.append(simulation.summaries.mean[generations])
+    samples = np.array(samples)
+    return {name: (approximation.summaries.mean[name][generations], samples[name].mean(axis=0),
+                   samples[name].std(axis=0, ddof=1) / np.sqrt(runs)) for name in fields}
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+"""
+Decision policies of the agents.
+Each simulation class has a registry `policies` that maps the name of a decision ("cooperation", "reputation") to a
+Policy. The steps of the simulation look their policies up in the registry of the simulation's class, so a subclass
+changes a decision by registering another Policy under the same name, e.g.
+    policies = dict(experiment_1.Simulation.policies, cooperation=Policy(cooperation_policy, cooperation_policy_batch))
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+from collections import namedtuple
+
+
+Policy = namedtuple("Policy", ["scalar", "batch", "kernel"], defaults=[None])
+Policy.__doc__ = """A decision of an agent about another one, in forms that must agree in distribution.
+scalar(agent, other_agent, random): decides for a single pair of agents, random() returns a uniform float
+batch(agents, a, b, rng): decides for all pairs of agents at the index arrays a and b at once, using the field
+    arrays of agents and the RandomStreams rng; returns a boolean array. None if there is no vectorized form
+kernel(value, reputation, strategy, noise, deception, a, b, random): decides for the agents at the indices a and b,
+    from the column arrays of the agents and a uniform float; compiled with kernels.jit. None if there is no
+    kernel form, then the game cannot use the compiled engine"""
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Random number streams for the simulations.
+All random draws of a simulation come from a single numpy Generator, so one seed determines a whole run.
+Scalar draws are handed out from pre-generated blocks, which are refilled in bulk when they run out.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+
+class RandomStreams(object):
+    """Block-drawn random numbers from one seeded numpy.random.Generator.
+    seed: an integer seed, or None to draw a fresh one (it is kept in self.seed, so the run can be repeated)
+    """
+
+    block_size = 4096  # number of values drawn at once when a block runs out
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+
+        # blocks are python lists, values are popped from the end
+        self._uniforms = []
+        self._pairs = {}  # number of agents -> block of index pairs
+        self._binomials = {}  # (n, p) -> block of binomial samples
+
+    def random(self):
+        """Returns a uniform float in [0, 1)"""
+        try:
+            return self._uniforms.pop()
+        except IndexError:
+            self._uniforms = self.generator.random(self.block_size).tolist()
+            return self._uniforms.pop()
+
+    def pair(self, number_of_agents):
+        """Returns two different agent indices, in O(1) regardless of the number of agents"""
+        try:
+            return self._pairs[number_of_agents].pop()
+        except (KeyError, IndexError):
+            self._pairs[number_of_agents] = list(zip(*(indices.tolist() for indices in
+                                                       self.pairs(number_of_agents, self.block_size))))
+            return self._pairs[number_of_agents].pop()
+
+    def binomial(self, n, p):
+        """Returns a binomially distributed integer"""
+        try:
+            return self._binomials[n, p].pop()
+        except (KeyError, IndexError):
+            self._binomials[n, p] = self.generator.binomial(n, p, size=self.block_size).tolist()
+            return self._binomials[n, p].pop()
+
+    def uniforms(self, size):
+        """Returns an array of uniform floats in [0, 1)"""
+        return self.generator.random(size)
+
+    def pairs(self, number_of_agents, size):
+        """Returns two index arrays, so that first[i] and second[i] are two different agents"""
+        first = self.generator.integers(0, number_of_agents, size=size)
+        second = self.generator.integers(0, number_of_agents - 1, size=size)
+        second += second >= first  # make sure that we do not choose the same agent twice
+        return first, second
+
+    def get_state(self):
+        """Returns the complete state of the streams: the seed, the state of the generator, and the values that
+        are left in the blocks (as arrays). A copy of the streams continues exactly like the original"""
+        return {"seed": self.seed,
+                "generator": self.generator.bit_generator.state,
+                "uniforms": np.array(self._uniforms, dtype=float),
+                "pairs": [[number_of_agents, np.array(block, dtype=np.int64).reshape(-1, 2)]
+                          for number_of_agents, block in self._pairs.items()],
+                "binomials": [[n, p, np.array(block, dtype=np.int64)] for (n, p), block in self._binomials.items()]}
+
+    def set_state(self, state):
+        """Restores a state returned by get_state"""
+        self.seed = state["seed"]
+        self.generator = np.random.Generator(getattr(np.random, state["generator"]["bit_generator"])())
+        self.generator.bit_generator.state = state["generator"]
+        self._uniforms = state["uniforms"].tolist()
+        self._pairs = {number_of_agents: [tuple(pair) for pair in block.tolist()]
+                       for number_of_agents, block in state["pairs"]}
+        self._binomials = {(n, p): block.tolist() for n, p, block in state["binomials"]}
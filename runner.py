@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Runs a simulation in a background thread, and publishes snapshots of it for the GUI.
+The GUI never calls into the simulation while it runs: it polls SimulationRunner.latest() at its own frame rate,
+and snapshots that were not picked up in time are dropped, so the speed of the simulation does not depend on the
+cost of drawing.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import copy
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+Snapshot = namedtuple("Snapshot", ["agents", "current_simstep", "current_generation", "last_relation",
+                                   "last_agent_0_index", "last_agent_1_index", "finished"])
+Snapshot.__doc__ = """The state of a simulation at one point in time. agents is a read-only copy"""
+
+
+def take_snapshot(simulation, finished=False):
+    """Returns an immutable Snapshot of the simulation"""
+    if isinstance(simulation.agents, np.ndarray):
+        agents = simulation.agents.copy()
+        agents.flags.writeable = False
+    else:  # the agent dicts of simulation.py
+        agents = tuple(copy.deepcopy(simulation.agents))
+    return Snapshot(agents, simulation.current_simstep, simulation.current_generation, simulation.last_relation,
+                    simulation.last_agent_0_index, simulation.last_agent_1_index, finished)
+
+
+class SimulationRunner(object):
+    """Advances a simulation in a worker thread.
+    frames_per_second: at most this many snapshots are published per second
+    queue_size: the number of snapshots that are kept until they are read; older ones are dropped
+    """
+
+    def __init__(self, simulation, frames_per_second=25, queue_size=2):
+        self.simulation = simulation
+        self.frame_interval = 1.0 / frames_per_second
+        self.snapshots = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.dropped = 0  # number of snapshots that were never read
+        self.error = None  # the exception that stopped the worker, if any
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, generations=False):
+        """Starts advancing the simulation in steps, or in whole generations if generations is True,
+        until it is finished or stopped"""
+        self.stop()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(generations, ), name="simulation", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the worker after its current step (or generation) and waits for it, so the simulation may be used
+        by the caller afterwards. The last state is published."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def publish(self, finished=False):
+        """Offers a snapshot of the current state, replacing the oldest one if the queue is full"""
+        snapshot = take_snapshot(self.simulation, finished)
+        while True:
+            try:
+                self.snapshots.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.snapshots.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def latest(self):
+        """Returns the most recent published snapshot, or None if there is no new one; older ones are discarded"""
+        snapshot = None
+        while True:
+            try:
+                newer = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+            if snapshot is not None:
+                self.dropped += 1
+            snapshot = newer
+
+    def _run(self, generations):
+        simulation = self.simulation
+        update_rate = max(1, simulation.config.update_rate_during_calculate_all)
+        next_frame = time.perf_counter()
+        active = True
+        try:
+            while active and not self.stop_event.is_set():
+                if generations:
+                    active = simulation.current_generation < simulation.config.number_of_generations
+                    if active:
+                        simulation.calculate_generation()
+                        due = simulation.current_generation % update_rate == 0
+                else:
+                    active = simulation.step()
+                    due = True
+                if active and due and time.perf_counter() >= next_frame:
+                    self.publish()
+                    next_frame = time.perf_counter() + self.frame_interval
+        except Exception as error:
+            self.error = error
+        self.publish(finished=not active)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Selection operators: choose the parents of the next generation from the fitness of the current one.
+All operators work on fitness arrays of shape (replicas, agents), every row an independent population, and return
+the parent of each child as an index array of shape (replicas, children). They are selected with config.selection:
+    truncation      the number_of_parents_in_a_generation fittest agents are parents, their shares of children
+                    grow with their fitness as far as influence_of_fitness_to_reproductive_success says
+    proportional    every agent is a parent with a share like the above, sampled with stochastic universal sampling
+    tournament      every child has the fittest of tournament_size random agents as parent
+    rank            linear ranking: the share grows with the rank of the agent, the best one gets 1 + influence
+                    times the average number of children, the worst one 1 - influence times
+Expected numbers of children are turned into whole numbers with allocate(): every parent gets the expected number
+rounded up or down, and there are exactly as many children as requested.
+Except for rank selection, which sorts, the operators take time linear in the number of agents.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+
+def fittest(fitness, k):
+    """Returns the indices of the k fittest agents of every row (in no particular order), shape (replicas, k),
+    by partial partitioning in linear time"""
+    replicas, agents = fitness.shape
+    if k >= agents:
+        return np.broadcast_to(np.arange(agents), (replicas, agents)).copy()
+    if k <= 0:
+        return np.zeros((replicas, 0), dtype=np.intp)
+    return np.argpartition(fitness, agents - k, axis=1)[:, agents - k:]
+
+
+def allocate(expected, offsets=0.5):
+    """Turns the expected numbers of children of every parent, shape (replicas, parents), into whole numbers with
+    the same sum in every row. Each count is the expected one rounded up or down. offsets (one per row, in [0, 1))
+    decides which parents are rounded up: 0.5 rounds the running total (deterministic), a uniform random offset is
+    stochastic universal sampling"""
+    offsets = np.broadcast_to(np.reshape(offsets, (-1, 1)), (len(expected), 1))
+    cumulative = np.cumsum(expected, axis=1)
+    cumulative[:, -1] = np.round(cumulative[:, -1])  # the total is a whole number, without rounding errors
+    bounds = np.floor(cumulative + offsets)
+    return np.diff(bounds, axis=1, prepend=np.floor(offsets)).astype(np.int64)
+
+
+def children_of(parents, counts, number_of_children):
+    """Returns the parent of every child, shape (replicas, number_of_children), if parents[r, i] gets counts[r, i]
+    children; every row of counts must sum to number_of_children"""
+    return np.repeat(parents.ravel(), counts.ravel()).reshape(len(parents), number_of_children)
+
+
+def fitness_shares(fitness, influence):
+    """The share of children of agents with the given fitness, between 1 - influence for the least fit agent of the
+    row and 1 for the fittest one. Rows without any share get equal shares"""
+    low, high = fitness.min(axis=1, keepdims=True), fitness.max(axis=1, keepdims=True)
+    spread = high - low
+    normalized = np.divide(fitness - low, spread, out=np.zeros_like(fitness, dtype=float), where=spread > 0)
+    shares = (1 - influence) + normalized * influence
+    shares[shares.sum(axis=1) == 0] = 1
+    return shares
+
+
+def expected_children(shares, number_of_children):
+    return shares * (number_of_children / shares.sum(axis=1, keepdims=True))
+
+
+def truncation(fitness, number_of_children, config, rng):
+    """The fittest agents are the parents, fitter parents get more children"""
+    parents = fittest(fitness, config.number_of_parents_in_a_generation)
+    rows = np.arange(len(fitness))[:, None]
+    low, high = fitness.min(axis=1, keepdims=True), fitness.max(axis=1, keepdims=True)
+    # shares are normalized with the fitness of all agents, not only of the parents
+    shares = fitness_shares(np.concatenate([fitness[rows, parents], low, high], axis=1),
+                            config.influence_of_fitness_to_reproductive_success)[:, :-2]
+    counts = allocate(expected_children(shares, number_of_children))
+    return children_of(parents, counts, number_of_children)
+
+
+def proportional(fitness, number_of_children, config, rng):
+    """Stochastic universal sampling over all agents"""
+    shares = fitness_shares(fitness, config.influence_of_fitness_to_reproductive_success)
+    counts = allocate(expected_children(shares, number_of_children), rng.uniforms(len(fitness)))
+    parents = np.broadcast_to(np.arange(fitness.shape[1]), fitness.shape)
+    return children_of(parents, counts, number_of_children)
+
+
+def tournament(fitness, number_of_children, config, rng):
+    """Every child gets the fittest of config.tournament_size randomly drawn agents as parent"""
+    replicas, agents = fitness.shape
+    contestants = rng.generator.integers(0, agents, size=(replicas, number_of_children, config.tournament_size))
+    rows = np.arange(replicas)[:, None, None]
+    winners = fitness[rows, contestants].argmax(axis=2)
+    return np.take_along_axis(contestants, winners[..., None], axis=2)[..., 0]
+
+
+def rank(fitness, number_of_children, config, rng):
+    """Linear ranking selection, sampled with stochastic universal sampling"""
+    replicas, agents = fitness.shape
+    ranking = fitness.argsort(axis=1)
+    ranks = np.empty_like(ranking)
+    np.put_along_axis(ranks, ranking, np.arange(agents), axis=1)
+    influence = config.influence_of_fitness_to_reproductive_success
+    shares = 1 - influence + 2 * influence * ranks / max(agents - 1, 1)
+    counts = allocate(expected_children(shares, number_of_children), rng.uniforms(replicas))
+    return children_of(np.broadcast_to(np.arange(agents), fitness.shape), counts, number_of_children)
+
+
+OPERATORS = {"truncation": truncation, "proportional": proportional, "tournament": tournament, "rank": rank}
+
+
+def operator(name):
+    """Returns the operator of the given name (config.selection), raises ValueError for unknown ones"""
+    if name not in OPERATORS:
+        raise ValueError("unknown selection %r, choose one of %s" % (name, ", ".join(OPERATORS)))
+    return OPERATORS[name]
@@ -10,10 +10,11 @@ __date__ = '20.06.14'
 from random import randint, random
 import math
 
-from widgets import Settings
-from helper_widgets import Diagram
-
-ereiam
+from configuration import Settings, Config
+from diagrams import Diagram, SeriesDiagram
+from generation_log import ColumnLog
+from timing import PhaseTimer
+from policies import Policy
 
 
 def cooperation_policy(agent, other_agent):
@@ -30,9 +31,17 @@ fitness = lambda agent: agent["value"]  # fitness function used in selecting age
 
 
 class Simulation(object):
-    def __init__(self):
+    settings = Settings  # provides the default values of the configuration
+    timed_phases = ["step", "calculate_generation", "cooperation_step", "deception_step", "_get_two_agent_indices",
+                    "select_agents", "mutate", "reset", "_update_log"]  # see enable_timing
+    policies = {"cooperation": Policy(cooperation_policy, None),
+                "reputation": Policy(reputation_policy, None)}  # see policies.py; the policies take no random
+
+    def __init__(self, config=None):
 
-        self.agents = [self.create_agent() for x in range(0, Settings.number_of_agents)]
+        self.config = config if config is not None else Config(self.settings)
+
+        self.agents = [self.create_agent() for x in range(0, self.config.number_of_agents)]
 
 
         self.current_simstep = 0
@@ -42,7 +51,37 @@ class Simulation(object):
         self.last_agent_0_index = None
         self.last_agent_1_index = None
 
-        self.log = {key: [] for key in self.create_agent()}  # initialize an array for each agent property
+        self.log = self.create_log()
+
+        self.timer = None
+        if self.config.timing:
+            self.enable_timing()
+
+    def enable_timing(self, timer=None):
+        """Records the time spent in each of the timed_phases in self.timer, a timing.PhaseTimer.
+        Without timing, the methods are not wrapped at all"""
+        self.timer = timer if timer is not None else PhaseTimer()
+        self.timer.instrument(self, self.timed_phases)
+        return self.timer
+
+    def disable_timing(self):
+        """Stops recording the phases, and returns the timer with the times so far"""
+        timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.release(self)
+        return timer
+
+    def create_log(self):
+        """A column for each agent property, preallocated for the samples of all generations
+        (every config.log_steps steps, or at the end of every config.log_interval-th generation)"""
+        if self.config.log_steps:
+            samples = self.config.number_of_generations * \
+                (self.config.number_of_simulation_steps_in_a_generation // self.config.log_steps)
+        elif self.config.log_interval:
+            samples = -(-self.config.number_of_generations // self.config.log_interval)
+        else:
+            samples = 0
+        return ColumnLog(self.create_agent(), self.config.number_of_agents, samples)
 
     def create_agent(self):
         return {"value": 0,
@@ -51,15 +90,18 @@ class Simulation(object):
 
     def step(self):
         """Advances the simulation by a single step. Returns False if we are done"""
-        if self.current_simstep < Settings.number_of_simulation_steps_in_a_generation:
+        if self.current_simstep < self.config.number_of_simulation_steps_in_a_generation:
             self.cooperation_step()
             self.deception_step()
             self.current_simstep += 1
-            self._update_log()
+            if self.config.log_steps and self.current_simstep % self.config.log_steps == 0:
+                self._update_log()
             return True
         else:
-            if self.current_generation < Settings.number_of_generations:
-                self._update_log(generation = True)
+            if self.current_generation < self.config.number_of_generations:
+                if not self.config.log_steps and self.config.log_interval and \
+                        self.current_generation % self.config.log_interval == 0:
+                    self._update_log()
                 self.last_relation = None
                 self.select_agents()
                 self.current_generation += 1
@@ -71,7 +113,7 @@ class Simulation(object):
     def calculate_generation(self):
         """Advances the simulation by a generation"""
         this_generation = self.current_generation
-        if this_generation <= Settings.number_of_generations:
+        if this_generation <= self.config.number_of_generations:
             while self.current_generation == this_generation and self.step():
                 pass
 
@@ -88,7 +130,7 @@ class Simulation(object):
         self.agents.sort(key=fitness, reverse=True)
 
         # identify future parents (the currently fittest agents)
-        parents = self.agents[:Settings.number_of_parents_in_a_generation]
+        parents = self.agents[:self.config.number_of_parents_in_a_generation]
 
         # normalize fitness values between 1 and 0:
         # we assume that the worst agent of the current generation has a fitness of 0, and the best of 1
@@ -104,13 +146,13 @@ class Simulation(object):
         sum_of_shares = 0
         for agent in parents:
             normalized_fitness = norm_factor * (fitness(agent) - min_fitness)
-            share = (1 - Settings.influence_of_fitness_to_reproductive_success) + \
-                    normalized_fitness * Settings.influence_of_fitness_to_reproductive_success
+            share = (1 - self.config.influence_of_fitness_to_reproductive_success) + \
+                    normalized_fitness * self.config.influence_of_fitness_to_reproductive_success
             sum_of_shares += share
             shares.append(share)
 
         # carry over survivors
-        new_agents = self.agents[:Settings.number_of_surviving_agents]
+        new_agents = self.agents[:self.config.number_of_surviving_agents]
         for agent in new_agents:  # reset agent's successes
             self.reset(agent)
 
@@ -128,7 +170,7 @@ class Simulation(object):
 
     def mutate(self, agent):
         """called for each new agent that is born into a new generation"""
-        agent["deception_probability"] = min(1.0, max(0.0, (Settings.mutation_rate * (2 * random() - 1) +
+        agent["deception_probability"] = min(1.0, max(0.0, (self.config.mutation_rate * (2 * random() - 1) +
                                                             agent["deception_probability"])))
 
     def reset(self, agent):
@@ -140,7 +182,7 @@ class Simulation(object):
         self.last_agent_0_index, self.last_agent_1_index = self._get_two_agent_indices()
         a, b = self.agents[self.last_agent_0_index], self.agents[self.last_agent_1_index]
 
-        cooperation = cooperation_policy(a, b)
+        cooperation = self.policies["cooperation"].scalar(a, b)
         if cooperation:  # agent cooperates
             a["value"] -= 0.5
             b["value"] += 1.0
@@ -155,17 +197,17 @@ class Simulation(object):
 
 
     def deception_step(self, display_steps=True):
-        if random() < Settings.probability_of_a_reputation_exchange:
+        if random() < self.config.probability_of_a_reputation_exchange:
             return
 
         self.last_agent_0_index, self.last_agent_1_index = self._get_two_agent_indices()
         a, b = self.agents[self.last_agent_0_index], self.agents[self.last_agent_1_index]
 
-        reputation_diminishment = reputation_policy(a, b)
+        reputation_diminishment = self.policies["reputation"].scalar(a, b)
         if reputation_diminishment:  # agent badmouths the other agent
             b["reputation"] = max(b["reputation"] - 1.0, -5)
 
-            if random() < Settings.probability_of_repercussion_for_reputation_diminishment:
+            if random() < self.config.probability_of_repercussion_for_reputation_diminishment:
                 a["reputation"] = max(a["reputation"] - 1.0, -5)
 
             self.last_relation = "deception"
@@ -178,38 +220,43 @@ class Simulation(object):
             b += 1
         return a, b
 
-    def _update_log(self, generation = False):
-        """adds the current values and reputations to the log.
-        The generation parameter should be true if the call happens after a generation start"""
-        for key in self.log:
-            self.log[key].append([agent[key] for agent in self.agents])
+    def _update_log(self):
+        """adds the current values, reputations and deception probabilities to the log"""
+        self.log.append(self.agents, self.current_generation, self.current_simstep)
+
+
+class LogPlot(SeriesDiagram):
+    """The mean of a column of the log over the agents, for every sample"""
+
+    def __init__(self, simulation, subplot):
+        SeriesDiagram.__init__(self, simulation, subplot)
+        self.samples_read = 0
+
+    def new_values(self):
+        data = self.simulation.log[self.field][self.samples_read:]
+        self.samples_read += len(data)
+        return data.mean(axis=1)
 
 
-class ValuePlot(Diagram):
+class ValuePlot(LogPlot):
     key = "value"
     window_title = "Values"
+    field = "value"
+    color = "orange"
 
 
-class ReputationPlot(Diagram):
+class ReputationPlot(LogPlot):
     key = "reputation"
     window_title = "Reputation"
+    field = "reputation"
+    color = "blue"
 
-    def plot(self):
-        data = self.simulation.log["reputation"]
-        if len(data):
-            values = [step[0] for step in data]
-            self.subplot.plot(values, color="blue", linewidth=1.0)
 
-
-class DeceptionPlot(Diagram):
+class DeceptionPlot(LogPlot):
     key = "deception probability"
     window_title = "Probability of Deception"
-
-    def plot(self):
-        data = self.simulation.log["deception probability"]
-        if len(data):
-            values = [step[0] for step in data]
-            self.subplot.plot(values, color="brown", linewidth=1.0)
+    field = "deception_probability"
+    color = "brown"
 
 
 class ValueHistogram(Diagram):
@@ -221,8 +268,7 @@ class ValueHistogram(Diagram):
         data = self.simulation.log["value"]
         self.subplot.cla()
         if len(data):
-            values = [entry for entry in data[-1]]
-            self.subplot.hist(values, bins=10, color="blue")
+            self.subplot.hist(data[-1], bins=10, color="blue")
 
 
 class DeceptionHistogram(Diagram):
@@ -235,10 +281,7 @@ class DeceptionHistogram(Diagram):
         self.subplot.cla()
         if len(data):
             self.subplot.axis(xmin=-6, xmax=7)
-            values = [entry for entry in data[-1]]
-            self.subplot.hist(values, bins=10, color="brown")
+            self.subplot.hist(data[-1], bins=10, color="brown")
 
 
 diagrams = [ValuePlot, ReputationPlot, DeceptionPlot, ValueHistogram, DeceptionHistogram]
-
-
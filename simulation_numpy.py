@@ -7,19 +7,28 @@ Definition of agents and simulation function
 __author__ = 'joscha'
 __date__ = '20.06.14'
 
-from random import randint, random
+from random import random
 import numpy as np
 
-from widgets import Settings
-from helper_widgets import Diagram
+from configuration import Settings, Config
+from diagrams import SeriesDiagram, HistogramDiagram
+from random_streams import RandomStreams
+from generation_log import GenerationLog, MemoryMappedLog
+from summaries import GenerationSummaries
+from checkpoint import write_checkpoint, read_checkpoint, CheckpointWriter
+from timing import PhaseTimer
+from policies import Policy
+import selection
+import kernels
+import storage
 
 
-def cooperation_policy(agent, other_agent):
+def cooperation_policy(agent, other_agent, random=random):
     """Return true to cooperate, false to defect"""
     return other_agent["reputation"] >= 0
 
 
-def reputation_policy(agent, other_agent):
+def reputation_policy(agent, other_agent, random=random):
     """Return true to diminish reputation, false otherwise"""
     return random() < agent["deception probability"]
 
@@ -29,12 +38,88 @@ def reputation_policy(agent, other_agent):
 
 FITNESS = "value"  # should be a column in the agent's dtype
 
-#AGENT = [("value", float), ("reputation", int), ("deception probability", float)]
+AGENT = [("value", float), ("reputation", int), ("deception probability", float)]
+
+# the narrow types of the agent fields with config.compact_agents: reputations and strategies lie in -5..5, and the
+# values of a generation stay far below the range in which float32 loses whole numbers. Sums over agents (in the
+# summaries and in selection) are accumulated in float64, but the value of every agent is still accumulated in
+# float32, one payoff at a time: payoffs that are not binary fractions (0.1 in the experiments) are rounded at every
+# interaction, by up to half a float32 step of the value (3e-5 at a value of 1000)
+COMPACT_TYPES = {"value": np.float32, "reputation": np.int8, "strategy": np.int8,
+                 "deception probability": np.float32, "noise": np.float32}
+
+COOPERATION, DECEPTION = 0, 1  # interaction kinds, as used by the batched engine
+
+
+def cooperation_policy_batch(agents, a, b, rng):
+    """Vectorized cooperation_policy for the agents at the index arrays a and b"""
+    return agents["reputation"][b] >= 0
+
+
+def reputation_policy_batch(agents, a, b, rng):
+    """Vectorized reputation_policy for the agents at the index arrays a and b"""
+    return rng.uniforms(len(a)) < agents["deception probability"][a]
+
+
+@kernels.jit
+def cooperation_policy_kernel(value, reputation, strategy, noise, deception, a, b, random):
+    return reputation[b] >= 0
+
+
+@kernels.jit
+def reputation_policy_kernel(value, reputation, strategy, noise, deception, a, b, random):
+    return random < deception[a]
+
+
+def gather(population, indices):
+    """Returns population[r, indices[r, i]] for an array of agents of shape (replicas, agents).
+    np.take copies whole records, which is several times faster than fancy indexing of a structured array"""
+    offsets = population.shape[1] * np.arange(len(population))[:, None]
+    return np.take(population.reshape(-1), indices + offsets)
+
+
+def conflict_free_batches(first, second):
+    """Partitions a sequence of interactions between the agents first[i] and second[i] into batches in which
+    no agent appears twice. Each interaction goes into the batch after the last one that touched either of its
+    agents, so applying the batches in order keeps the order of interactions for every agent.
+    Returns a list of index arrays into the interaction sequence."""
+    levels = []
+    last_level = {}
+    for a, b in zip(first.tolist(), second.tolist()):
+        level = max(last_level.get(a, -1), last_level.get(b, -1)) + 1
+        last_level[a] = last_level[b] = level
+        levels.append(level)
+    levels = np.array(levels, dtype=int)
+    order = np.argsort(levels, kind="stable")
+    return np.split(order, np.flatnonzero(np.diff(levels[order])) + 1)
+
 
 class Simulation(object):
-    def __init__(self):
+    settings = Settings  # provides the default values of the configuration
+    histogram_ranges = {"reputation": (-5.5, 5.5, 11), "deception probability": (0., 1., 10)}  # (low, high, bins)
+    timed_phases = ["step", "calculate_generation", "calculate_steps_batched", "calculate_steps_compiled",
+                    "draw_interactions",
+                    "apply_interactions", "cooperation_step", "deception_step", "_get_two_agents", "select_agents",
+                    "select_population", "mutate_agents", "record_generation", "checkpoint_if_due"]  # see enable_timing
+    policies = {"cooperation": Policy(cooperation_policy, cooperation_policy_batch, cooperation_policy_kernel),
+                "reputation": Policy(reputation_policy, reputation_policy_batch,
+                                     reputation_policy_kernel)}  # see policies.py
+    payoffs = (-0.5, 1.0, 0.)  # the change of value of a cooperating agent, its partner and a defecting agent, in
+    # every engine (cooperation_step, cooperation_batch, kernels.play) and in the mean-field model
+    agent_storage = "array"  # how the steps access the agents, see storage.py
+    compact_types = COMPACT_TYPES  # the types of the agent fields if config.compact_agents is set
+    _rows = None  # the agents as dicts, while they are accessed that way
+
+    def __init__(self, config=None, seed=None):
+
+        self.config = config if config is not None else Config(self.settings)
+        selection.operator(self.config.selection)  # fails early for an unknown operator
+
+        self.rng = RandomStreams(seed)  # the source of every random draw in the simulation
+        self.seed = self.rng.seed
 
         self.init_agents()
+        self.agent_storage = storage.choose(self.config)
 
         self.current_simstep = 0
         self.current_generation = 1
@@ -42,28 +127,180 @@ class Simulation(object):
         self.last_relation = None
         self.last_agent_0_index = None
         self.last_agent_1_index = None
-
-        self.log = np.zeros((Settings.number_of_generations+1, Settings.number_of_agents), dtype = self.agents.dtype)
-        self.log[self.current_generation] = self.agents
+        self.checkpoint_writer = None  # created with the first background checkpoint
+        self.timer = None
+        if self.config.timing:
+            self.enable_timing()
+
+        self.summaries = GenerationSummaries(self.agents.dtype, self.config.number_of_generations,
+                                             self.histogram_ranges)
+        self.log = self.create_log(self.agents.shape)
+        self.record_generation(0)  # the initial population
+
+    def create_log(self, shape):
+        """Returns the generation log for snapshots of the given shape, kept in memory or in config.log_file.
+        Row i of the log holds generation i * config.log_interval; if the interval is 0, there is no log"""
+        interval = self.config.log_interval
+        if not interval:
+            return None
+        if self.config.log_file:
+            return MemoryMappedLog(self.config.log_file, self.agents.dtype, shape,
+                                   header={"config": dict(self.config.items()), "seed": self.seed})
+        return GenerationLog(self.agents.dtype, shape, -(-self.config.number_of_generations // interval))
+
+    def record_generation(self, generation=None):
+        """Summarizes the agents at the end of a generation, and logs them if the generation is due"""
+        if generation is None:
+            generation = self.current_generation
+        self.summaries.record(generation, self.agents)
+        interval = self.config.log_interval
+        if interval and generation % interval == 0:
+            self.log[generation // interval] = self.agents
+
+    def checkpoint_state(self):
+        """Returns everything that is needed to continue the run, as a json-serializable header and a dict of arrays.
+        Only the agents and the random streams are copied: rows of the log and the summaries are not changed after
+        their generation, so the written ones are passed as they are"""
+        header = {"simulation": "%s.%s" % (type(self).__module__, type(self).__name__),
+                  "config": dict(self.config.items()),
+                  "current_simstep": self.current_simstep,
+                  "current_generation": self.current_generation,
+                  "last_relation": self.last_relation,
+                  "last_agent_0_index": self.last_agent_0_index,
+                  "last_agent_1_index": self.last_agent_1_index,
+                  "rng": self.rng.get_state(),
+                  "summaries_written": self.summaries.written,
+                  "log_written": self.log.written if self.log is not None else 0,
+                  "log_file": self.log.path if isinstance(self.log, MemoryMappedLog) else ""}
+        arrays = {"agents": self.agents.copy()}
+        for name, array in self.summaries.arrays().items():
+            arrays["summaries " + name] = array[:self.summaries.written]
+        if self.log is not None and not header["log_file"]:
+            arrays["log"] = self.log[:self.log.written]
+        return header, arrays
+
+    def save_checkpoint(self, path):
+        """Writes a checkpoint, from which load_checkpoint continues the run exactly as this simulation would"""
+        write_checkpoint(path, *self.checkpoint_state())
+
+    def save_checkpoint_in_background(self, path):
+        """Like save_checkpoint, but the file is written by a background thread"""
+        if self.checkpoint_writer is None:
+            self.checkpoint_writer = CheckpointWriter()
+        self.checkpoint_writer.submit(path, *self.checkpoint_state())
+
+    def checkpoint_if_due(self):
+        """Called at the start of a generation, writes a checkpoint every config.checkpoint_interval generations"""
+        interval = self.config.checkpoint_interval
+        if interval and self.config.checkpoint_file and self.current_generation % interval == 0:
+            self.save_checkpoint_in_background(self.config.checkpoint_file)
+
+    @classmethod
+    def load_checkpoint(cls, path, **changes):
+        """Restores a simulation from a checkpoint. The agents and the log are mapped from the file, not read.
+        changes: settings that differ from the checkpointed configuration, e.g. to branch off with another
+        mutation rate (the log interval should stay the same). The log is continued in config.log_file; if
+        that is a different file than before, the logged generations are copied into it."""
+        header, arrays = read_checkpoint(path)
+        simulation = cls.__new__(cls)
+        simulation.config = Config(cls.settings, **header["config"]).replace(**changes)
+        selection.operator(simulation.config.selection)
+        simulation.rng = RandomStreams(header["rng"]["seed"])
+        simulation.rng.set_state(header["rng"])
+        simulation.seed = simulation.rng.seed
+        simulation.agents = arrays["agents"]
+        simulation.agent_storage = storage.choose(simulation.config)
+        for key in ["current_simstep", "current_generation", "last_relation", "last_agent_0_index",
+                    "last_agent_1_index"]:
+            setattr(simulation, key, header[key])
+        simulation.checkpoint_writer = None
+        simulation.timer = None
+        if simulation.config.timing:
+            simulation.enable_timing()
+
+        written = header["summaries_written"]
+        simulation.summaries = GenerationSummaries(simulation.agents.dtype,
+                                                   max(simulation.config.number_of_generations, written),
+                                                   cls.histogram_ranges)
+        for name, array in simulation.summaries.arrays().items():
+            array[:written] = arrays["summaries " + name]
+        simulation.summaries.written = written
+
+        written = header["log_written"]
+        if not simulation.config.log_interval:
+            simulation.log = None
+        elif header["log_file"] and header["log_file"] == simulation.config.log_file:
+            simulation.log = MemoryMappedLog.open(header["log_file"], writable=True)
+            simulation.log.written = written
+        elif not simulation.config.log_file and "log" in arrays:
+            simulation.log = GenerationLog(simulation.agents.dtype, simulation.agents.shape, 0)
+            simulation.log.data, simulation.log.written = arrays["log"], written
+        else:
+            simulation.log = simulation.create_log(simulation.agents.shape)
+            rows = arrays["log"] if "log" in arrays else MemoryMappedLog.open(header["log_file"])[:written]
+            for generation, row in enumerate(rows):
+                simulation.log[generation] = row
+        return simulation
+
+    def enable_timing(self, timer=None):
+        """Records the time spent in each of the timed_phases in self.timer, a timing.PhaseTimer.
+        Without timing, the methods are not wrapped at all"""
+        self.timer = timer if timer is not None else PhaseTimer()
+        self.timer.instrument(self, self.timed_phases)
+        return self.timer
+
+    def disable_timing(self):
+        """Stops recording the phases, and returns the timer with the times so far"""
+        timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.release(self)
+        return timer
+
+    @property
+    def agents(self):
+        """The agents, as a structured array. If the steps access them as dicts, these are written back first"""
+        if self._rows is not None:
+            storage.write_rows(self._agents, self._rows)
+            self._rows = None
+        return self._agents
+
+    @agents.setter
+    def agents(self, agents):
+        self._agents = agents
+        self._rows = None
+
+    def rows(self):
+        """The agents as a list of dicts, read from the array at the first call after the array was used"""
+        if self._rows is None:
+            self._rows = storage.read_rows(self._agents)
+        return self._rows
+
+    def agent_dtype(self, fields):
+        """Returns the dtype of agents with the given (name, type) fields, in their compact_types if
+        config.compact_agents is set"""
+        if self.config.compact_agents:
+            fields = [(name, self.compact_types.get(name, kind)) for name, kind in fields]
+        return np.dtype(fields)
 
     def init_agents(self):
-        self.agents = np.zeros(Settings.number_of_agents, dtype = [("value", float), ("reputation", int), ("deception probability", float)])
+        self.agents = np.zeros(self.config.number_of_agents, dtype=self.agent_dtype(AGENT))
         self.agents["deception probability"] = 0.5
 
 
     def step(self):
         """Advances the simulation by a single step. Returns False if we are done"""
-        if self.current_simstep < Settings.number_of_simulation_steps_in_a_generation:
+        if self.current_simstep < self.config.number_of_simulation_steps_in_a_generation:
             self.cooperation_step()
             self.deception_step()
             self.current_simstep += 1
             return True
         else:
-            if self.current_generation < Settings.number_of_generations:
-                self.log[self.current_generation] = self.agents
+            if self.current_generation < self.config.number_of_generations:
+                self.record_generation()
                 self.select_agents()
                 self.current_generation += 1
                 self.current_simstep = 0
+                self.checkpoint_if_due()
                 return True
         return False
 
@@ -71,11 +308,70 @@ class Simulation(object):
     def calculate_generation(self):
         """Advances the simulation by a generation"""
         this_generation = self.current_generation
-        if this_generation <= Settings.number_of_generations:
+        if this_generation <= self.config.number_of_generations:
+            if self.config.engine == "batched":
+                self.calculate_steps_batched()
+            elif self.config.engine == "compiled":
+                self.calculate_steps_compiled()
             while self.current_generation == this_generation and self.step():
                 pass
 
 
+    def calculate_steps_batched(self):
+        """Performs the remaining simulation steps of the current generation at once.
+        The interactions are drawn in advance and applied in conflict-free batches with vectorized updates,
+        which gives the same results as calling step() for each of them."""
+        steps = self.config.number_of_simulation_steps_in_a_generation - self.current_simstep
+        if steps <= 0:
+            return
+        kinds, first, second, performed = self.draw_interactions(steps)
+        kinds, first, second = kinds[performed], first[performed], second[performed]
+        for batch in conflict_free_batches(first, second):
+            self.apply_interactions(kinds[batch], first[batch], second[batch])
+        self.current_simstep += steps
+        if len(kinds):
+            self.last_agent_0_index, self.last_agent_1_index = first[-1], second[-1]
+        self.last_relation = None
+
+    def calculate_steps_compiled(self):
+        """Performs the remaining simulation steps of the current generation in a single call of the compiled
+        kernels.play, with the kernel forms of the policies. Falls back to calculate_steps_batched if numba is not
+        installed, or a policy has no kernel form"""
+        policies = [self.policies[name].kernel if name in self.policies else kernels.no_policy
+                    for name in ("cooperation", "reputation")]
+        if not kernels.AVAILABLE or None in policies:
+            return self.calculate_steps_batched()
+        steps = self.config.number_of_simulation_steps_in_a_generation - self.current_simstep
+        if steps <= 0:
+            return
+        kinds, first, second, performed = self.draw_interactions(steps)
+        kinds, first, second = kinds[performed], first[performed], second[performed]
+        kernels.play(kinds, first, second, self.rng.uniforms((len(kinds), 2)), *kernels.columns(self.agents),
+                     *policies, np.array(self.payoffs, dtype=float),
+                     self.config.probability_of_repercussion_for_reputation_diminishment)
+        self.current_simstep += steps
+        if len(kinds):
+            self.last_agent_0_index, self.last_agent_1_index = first[-1], second[-1]
+        self.last_relation = None
+
+    def draw_interactions(self, steps, replicas=1):
+        """Draws the interactions of the given number of simulation steps for every replica, in the order in which
+        step() would perform them. Returns arrays of shape (replicas, interactions) with the interaction kinds,
+        the indices of the two agents involved, and whether the interaction takes place at all"""
+        first, second = self.rng.pairs(self.config.number_of_agents, (replicas, 2 * steps))
+        kinds = np.tile([COOPERATION, DECEPTION], (replicas, steps))
+        performed = np.ones((replicas, 2 * steps), dtype=bool)
+        performed[:, 1::2] = self.rng.uniforms((replicas, steps)) >= self.config.probability_of_a_reputation_exchange
+        return kinds, first, second, performed
+
+    def apply_interactions(self, kinds, a, b):
+        """Applies a batch of interactions, no agent may appear twice in a batch"""
+        cooperation = kinds == COOPERATION
+        if cooperation.any():
+            self.cooperation_batch(a[cooperation], b[cooperation])
+        if not cooperation.all():
+            self.deception_batch(a[~cooperation], b[~cooperation])
+
     def select_agents(self):
         """At the end of every generation, the game goes into a new round.
         Some of the most successful agents may be allowed to carry on (with values and reputations being reset).
@@ -83,47 +379,30 @@ class Simulation(object):
         The next generation's decision parameter is mutated by mutation_rate * random().
         The idea is that over time, the simulation may approach an optimal decision parameter.
         """
+        self.select_population(self.agents.reshape(1, -1))
 
-        # sort agents by fitness
-
-        #self.agents.sort(key=fitness, reverse=True)
+    def select_population(self, population):
+        """select_agents for an array of shape (replicas, agents), in which every row is an independent population"""
+        number_of_surviving_agents = self.config.number_of_surviving_agents
+        fitness = population[FITNESS].astype(float)  # compact values are summed up in float64
 
-        agents = self.agents[self.agents[FITNESS].argsort()][::-1]
-
-        # identify future parents (the currently fittest agents)
-        parents = agents[:Settings.number_of_parents_in_a_generation]
-
-        # normalize fitness values between 1 and 0:
-        # we assume that the worst agent of the current generation has a fitness of 0, and the best of 1
-        min_fitness, max_fitness = agents[FITNESS][[-1, 0]]
-        if (max_fitness > min_fitness):
-            norm_factor = 1 / (max_fitness - min_fitness)
-        else:
-            norm_factor = 0
+        # choose the parent of every child, see selection.py
+        number_of_children = population.shape[1] - number_of_surviving_agents
+        parent_of_child = selection.operator(self.config.selection)(fitness, number_of_children, self.config,
+                                                                    self.rng)
+        children = gather(population, parent_of_child)
+        self.mutate_agents(children.reshape(-1))
 
-        # determine ratios of children among parents
-        normalized_fitness = norm_factor * (parents[FITNESS] - min_fitness)
-        shares = (1- Settings.influence_of_fitness_to_reproductive_success) + \
-                 normalized_fitness * Settings.influence_of_fitness_to_reproductive_success
-
-        # carry over survivors, these won't be mutated (but the relevant value is copied)
-        self.agents[:Settings.number_of_surviving_agents] = agents[:Settings.number_of_surviving_agents]
-
-
-        # create children
-        number_of_children = Settings.number_of_agents-Settings.number_of_surviving_agents
-        m = number_of_children/np.sum(shares)
-        number_of_children_of_agent = np.ceil(m * shares).astype(int)
-        self.agents[Settings.number_of_surviving_agents:] = np.repeat(parents,
-                                                                      number_of_children_of_agent)[:number_of_children]
-        self.mutate_agents(self.agents[Settings.number_of_surviving_agents:])
-
-        self.reset_agents(self.agents)
+        # carry over the fittest agents, these won't be mutated (but the relevant value is copied)
+        population[:, :number_of_surviving_agents] = gather(population,
+                                                            selection.fittest(fitness, number_of_surviving_agents))
+        population[:, number_of_surviving_agents:] = children
 
+        self.reset_agents(population)
 
     def mutate_agents(self, agents):
         """called for the array of children of a new generation"""
-        np.clip(np.random.uniform(-Settings.mutation_rate, Settings.mutation_rate, size=len(agents)) +
+        np.clip(self.rng.generator.uniform(-self.config.mutation_rate, self.config.mutation_rate, size=len(agents)) +
                 agents["deception probability"], 0.0, 1.0, out=agents["deception probability"])
 
     def reset_agents(self, agents):
@@ -136,99 +415,99 @@ class Simulation(object):
 
         a, b = self._get_two_agents()
 
-        cooperation = cooperation_policy(a, b)
+        cooperation = self.policies["cooperation"].scalar(a, b, self.rng.random)
         if cooperation:  # agent cooperates
-            a["value"] -= 0.5
-            b["value"] += 1.0
+            a["value"] += self.payoffs[0]
+            b["value"] += self.payoffs[1]
             a["reputation"] = min(a["reputation"] + 1, 5)
 
             self.last_relation = "cooperate"  # store for GUI
 
         else:  # agent defects
+            a["value"] += self.payoffs[2]
             a["reputation"] = max(a["reputation"] - 1, -5)
 
             self.last_relation = "defect"  # store for GUI
 
 
     def deception_step(self, display_steps=True):
-        if random() < Settings.probability_of_a_reputation_exchange:
+        if self.rng.random() < self.config.probability_of_a_reputation_exchange:
             return
 
         a, b = self._get_two_agents()
 
-        reputation_diminishment = reputation_policy(a, b)
+        reputation_diminishment = self.policies["reputation"].scalar(a, b, self.rng.random)
         if reputation_diminishment:  # agent badmouths the other agent
             b["reputation"] = max(b["reputation"] - 1.0, -5)
-            if random() < Settings.probability_of_repercussion_for_reputation_diminishment:
+            if self.rng.random() < self.config.probability_of_repercussion_for_reputation_diminishment:
                 a["reputation"] = max(a["reputation"] - 1.0, -5)
                 self.last_relation = "deception"  # store for GUI
 
 
+    def cooperation_batch(self, a, b):
+        """Vectorized cooperation_step for the agents at the index arrays a and b"""
+        value, reputation = self.agents["value"], self.agents["reputation"]
+
+        cooperation = self.policies["cooperation"].batch(self.agents, a, b, self.rng)
+        cooperating, defecting = a[cooperation], a[~cooperation]
+        value[cooperating] += self.payoffs[0]
+        value[b[cooperation]] += self.payoffs[1]
+        value[defecting] += self.payoffs[2]
+        reputation[cooperating] = np.minimum(reputation[cooperating] + 1, 5)
+        reputation[defecting] = np.maximum(reputation[defecting] - 1, -5)
+
+    def deception_batch(self, a, b):
+        """Vectorized deception_step for the agents at the index arrays a and b"""
+        reputation = self.agents["reputation"]
+
+        reputation_diminishment = self.policies["reputation"].batch(self.agents, a, b, self.rng)
+        a, b = a[reputation_diminishment], b[reputation_diminishment]
+        reputation[b] = np.maximum(reputation[b] - 1, -5)
+        a = a[self.rng.uniforms(len(a)) < self.config.probability_of_repercussion_for_reputation_diminishment]
+        reputation[a] = np.maximum(reputation[a] - 1, -5)
+
     def _get_two_agents(self):
         """Select two agents randomly"""
-        self.last_agent_0_index, self.last_agent_1_index = np.random.choice(Settings.number_of_agents, 2, replace=False)
-        return self.agents[self.last_agent_0_index], self.agents[self.last_agent_0_index]
+        self.last_agent_0_index, self.last_agent_1_index = self.rng.pair(self.config.number_of_agents)
+        agents = self.rows() if self.agent_storage == "dicts" else self.agents
+        return agents[self.last_agent_0_index], agents[self.last_agent_1_index]
 
 
 
-class ValuePlot(Diagram):
+class ValuePlot(SeriesDiagram):
     key = "value"
     window_title = " Average payoffs"
+    color = "orange"
+    minimum_length = 2
 
-    def plot(self):
-        data = self.simulation.log[:self.simulation.current_generation]["value"]
-        if len(data)>1:
-            self.subplot.cla()
-            self.subplot.plot(data.mean(axis = 1), color = "orange", linewidth =1.0)
-
-class ReputationPlot(Diagram):
+class ReputationPlot(SeriesDiagram):
     key = "reputation"
     window_title = " Average reputation"
-
-    def plot(self):
-        data = self.simulation.log[:self.simulation.current_generation][self.key]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.plot(data.mean(axis=1), color="blue", linewidth=1.0)
+    color = "blue"
 
 
 
-class DeceptionPlot(Diagram):
+class DeceptionPlot(SeriesDiagram):
     key = "deception probability"
     window_title = " Average probability of deception"
+    color = "brown"
 
-    def plot(self):
-        data = self.simulation.log[:self.simulation.current_generation][self.key]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.plot(data.mean(axis=1), color="brown", linewidth=1.0)
 
-
-class ValueHistogram(Diagram):
+class ValueHistogram(HistogramDiagram):
     """A modified PlotWindow to display an updateable histogram"""
     key = "payoff distribution"
     window_title = "Distribution of Payoffs"
-
-    def plot(self):
-        data = self.simulation.log[self.simulation.current_generation - 1]["value"]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.hist(data, bins=10, color="blue")
+    field = "value"
+    color = "blue"
 
 
-class DeceptionHistogram(Diagram):
+class DeceptionHistogram(HistogramDiagram):
     """A modified PlotWindow to display an updateable histogram"""
     key = "deception distribution"
     window_title = "Distribution of Deception probability"
-
-    def plot(self):
-        data = self.simulation.log[self.simulation.current_generation-1]["deception probability"]
-        if len(data):
-            self.subplot.cla()
-            self.subplot.axis(xmin=0, xmax=1)
-            self.subplot.hist(data, bins=10, color="brown")
+    field = "deception probability"
+    color = "brown"
+    xlim = (0, 1)
 
 
 diagrams = [ValuePlot, ReputationPlot, DeceptionPlot, ValueHistogram, DeceptionHistogram]
-
-
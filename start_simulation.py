@@ -50,10 +50,11 @@ __date__ = '19.06.14'
 from configuration import APPTITLE, VERSION
 
 import argparse
-from widgets import GuiApp
 
 
 def main():
+    from widgets import GuiApp  # loads tkinter and matplotlib, which the simulation itself does not need
+
     app = GuiApp()
     app.title("%s v%s" % (APPTITLE, VERSION))
 
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+How simulation_numpy keeps the agents during the single steps of a generation.
+The steps read and write a few fields of two agents at a time, and a record of a structured array is several times
+slower to access than a python dict. With "dicts" storage, the agents are turned into a list of dicts (like the
+agents of simulation.py) at the first step of a generation, and written back into the structured array whenever it
+is needed as a whole: for selection and logging at the end of the generation, or when other code reads
+simulation.agents. Both storages give exactly the same results: fields of narrow types (config.compact_agents) keep
+their numpy types in the dicts, so the steps compute in float32 as they do on the array.
+config.agent_storage chooses the storage; "auto" takes dicts for the sequential engine if a generation has at least
+DICTS_STEPS_PER_AGENT steps for every agent, so that the time they save in the steps outweighs the conversion of the
+agents. The batched and compiled engines work on the array.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+
+STORAGES = ["array", "dicts"]
+WIDE_TYPES = [np.dtype(float), np.dtype(int)]  # fields of these types are read as python floats and ints
+DICTS_STEPS_PER_AGENT = 0.5  # converting an agent to a dict and back takes as long as dicts save in 0.16 to 0.43
+# steps, in all numpy simulations with 100 to 10^5 wide or compact agents (measured with benchmarks/suite.py --storage)
+
+
+def read_rows(agents):
+    """Returns the agents of a structured array as a list of dicts. Fields of narrow types are read as numpy
+    scalars, which keep the type in arithmetic"""
+    names = agents.dtype.names
+    columns = [agents[name].tolist() if agents.dtype[name] in WIDE_TYPES else list(agents[name]) for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def write_rows(agents, rows):
+    """Writes a list of dicts back into the structured array they were read from"""
+    for name in agents.dtype.names:
+        agents[name] = [row[name] for row in rows]
+
+
+def choose(config):
+    """Returns the storage for a simulation with the given config"""
+    if config.agent_storage != "auto":
+        return config.agent_storage
+    if config.engine != "sequential":
+        return "array"
+    if config.number_of_simulation_steps_in_a_generation >= DICTS_STEPS_PER_AGENT * config.number_of_agents:
+        return "dicts"
+    return "array"
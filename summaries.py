@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-generation summaries of the agent fields: mean, variance, minimum, maximum, quantiles and histograms.
+They are computed in O(agents) at the end of every generation and need memory only in proportion to
+generations x fields, so they can replace the full generation log.
+Readers that are updated repeatedly (like the diagrams) subscribe to the summaries, and read only the generations
+that were added since their last update. Readers in other threads than the simulation (the GUI) hold the lock of
+the summaries while they read, which record() and grow() also hold while they write.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import threading
+
+import numpy as np
+
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BINS = 10  # histogram bins for fields without a declared range
+
+
+class GenerationSummaries(object):
+    """Statistics for every field of the agent dtype, one entry per generation.
+    mean, variance, std, minimum, maximum: arrays of shape (generations, ) with a float field per agent field
+    quantile: like mean, every field holds the values at QUANTILES
+    histogram, edges: dicts from field name to arrays of shape (generations, bins) and (generations, bins + 1)
+    ranges: dict from field name to (low, high, bins) for fixed histogram bins; other fields get BINS bins
+        between the minimum and maximum of their generation
+    """
+
+    def __init__(self, dtype, generations, ranges=None):
+        self.fields = np.dtype(dtype).names
+        self.ranges = dict(ranges or {})
+        self.written = 0  # number of generations up to the last one recorded
+        self.lock = threading.RLock()  # held while a generation is written, and by readers in other threads
+        self._allocate(generations)
+
+    def _allocate(self, generations):
+        statistic = [(name, float) for name in self.fields]
+        self.mean = np.zeros(generations, dtype=statistic)
+        self.variance = np.zeros(generations, dtype=statistic)
+        self.std = np.zeros(generations, dtype=statistic)
+        self.minimum = np.zeros(generations, dtype=statistic)
+        self.maximum = np.zeros(generations, dtype=statistic)
+        self.quantile = np.zeros(generations, dtype=[(name, float, (len(QUANTILES), )) for name in self.fields])
+        self.histogram = {}
+        self.edges = {}
+        for name in self.fields:
+            bins = self.ranges[name][2] if name in self.ranges else BINS
+            self.histogram[name] = np.zeros((generations, bins), dtype=np.int64)
+            self.edges[name] = np.zeros((generations, bins + 1))
+
+    def __len__(self):
+        return len(self.mean)
+
+    def grow(self, generations):
+        """Makes room for at least the given number of generations"""
+        with self.lock:
+            old = self.arrays()
+            self._allocate(max(generations, 2 * len(self)))
+            for name, array in self.arrays().items():
+                array[:len(old[name])] = old[name]
+
+    def record(self, generation, agents, counts=None):
+        """Summarizes the agent array (of any shape) as the given generation.
+        counts: if given, agents[i] stands for counts[i] identical agents (as in the aggregate engine); quantiles
+            are then the lowest values at which the given fraction of agents is reached"""
+        with self.lock:
+            if generation >= len(self):
+                self.grow(generation + 1)
+            if counts is not None:
+                counts = np.asarray(counts).ravel()
+                agents = agents.ravel()[counts > 0]
+                counts = counts[counts > 0]
+            for name in self.fields:
+                values = agents[name].ravel()
+                if counts is None:  # compact fields are summed up in float64
+                    self.mean[name][generation] = mean = values.mean(dtype=np.float64)
+                    self.variance[name][generation] = variance = np.square(values - mean, dtype=np.float64).mean()
+                else:
+                    self.mean[name][generation] = mean = np.average(values, weights=counts)
+                    self.variance[name][generation] = variance = np.average(np.square(values - mean), weights=counts)
+                self.std[name][generation] = np.sqrt(variance)
+                self.minimum[name][generation] = low = values.min()
+                self.maximum[name][generation] = high = values.max()
+                if counts is None:
+                    self.quantile[name][generation] = np.quantile(values, QUANTILES)
+                else:
+                    order = np.argsort(values, kind="stable")
+                    cumulative = np.cumsum(counts[order])
+                    self.quantile[name][generation] = values[order][
+                        np.minimum(np.searchsorted(cumulative, np.array(QUANTILES) * cumulative[-1]), len(values) - 1)]
+                if name in self.ranges:
+                    low, high, bins = self.ranges[name]
+                else:
+                    bins = BINS
+                    if high <= low:
+                        low, high = low - 0.5, high + 0.5
+                self.histogram[name][generation], self.edges[name][generation] = \
+                    np.histogram(values, bins=bins, range=(low, high), weights=counts)
+            self.written = max(self.written, generation + 1)
+
+    def subscribe(self, from_start=True):
+        """Returns a SummaryCursor that reads the generations recorded from now on (and the earlier ones, if
+        from_start is True)"""
+        return SummaryCursor(self, 0 if from_start else self.written)
+
+    def series(self, statistic, name):
+        """Returns the recorded values of a statistic ("mean", "variance", "std", "minimum", "maximum") of a field"""
+        return getattr(self, statistic)[name][:self.written]
+
+    def last_histogram(self, name):
+        """Returns the last recorded generation (-1 if there is none) and copies of its histogram and bin edges of a
+        field, read under the lock"""
+        with self.lock:
+            generation = self.written - 1
+            if generation < 0:
+                return generation, None, None
+            return generation, self.histogram[name][generation].copy(), self.edges[name][generation].copy()
+
+    def arrays(self):
+        """Returns all summary arrays by name, e.g. to save them with numpy.savez"""
+        arrays = {"mean": self.mean, "variance": self.variance, "std": self.std, "minimum": self.minimum,
+                  "maximum": self.maximum, "quantile": self.quantile}
+        for name in self.fields:
+            arrays["histogram " + name] = self.histogram[name]
+            arrays["edges " + name] = self.edges[name]
+        return arrays
+
+
+class SummaryCursor(object):
+    """The position of a reader of GenerationSummaries: read() returns the generations that were recorded since
+    the last call, so a reader never processes a generation twice"""
+
+    def __init__(self, summaries, position=0):
+        self.summaries = summaries
+        self.position = position
+
+    def pending(self):
+        """Returns the number of generations that have not been read yet"""
+        return self.summaries.written - self.position
+
+    def read(self):
+        """Returns (start, stop), the range of generations recorded since the last read"""
+        start, self.position = self.position, self.summaries.written
+        return start, self.position
+
+    def read_series(self, statistic, name):
+        """Returns a copy of the values of a statistic of a field for the generations recorded since the last read"""
+        with self.summaries.lock:
+            start, stop = self.read()
+            return getattr(self.summaries, statistic)[name][start:stop].copy()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""
+Headless parameter sweeps: runs an experiment for many configurations on a process pool.
+Every run writes its own result set into the output directory:
+    run_0000/run.json       experiment, overrides, settings, seed, status and timing, and the time of every phase
+                            of the simulation if the timing setting is on (see timing.py)
+    run_0000/log.npy        the generation log of the simulation (unless config.log_interval is 0)
+    run_0000/summaries.npz  the per-generation summaries of the agent fields
+Files named in the overrides (RUN_FILES, e.g. log_file) are placed in the directory of each run, so that concurrent
+runs do not share them.
+
+With --mean-field, the deterministic mean-field model of the experiment (see mean_field.py) is run instead of the
+agents, e.g. for sweeps over very large populations.
+
+Example:
+    python sweep.py experiment_2 --grid mutation_rate=0.001,0.01,0.1 \
+        --grid influence_of_fitness_to_reproductive_success=0.5,0.9,0.99 --workers 64
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import argparse
+import ast
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from configuration import Config
+
+
+RUN_FILES = ["log_file", "checkpoint_file"]  # settings that name a file, which every run writes for itself
+
+
+def expand_grid(grid):
+    """Turns a dict of setting names and lists of values into a list of overrides, one for each combination"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def run_simulation(experiment, overrides, directory, seed=None, mean_field=False):
+    """Runs a single simulation of the experiment module with the given overrides, and writes its results.
+    If mean_field is True, the mean-field model of the experiment is run instead.
+    This is executed in a worker process. Returns the run description that is written to run.json"""
+    os.makedirs(directory, exist_ok=True)
+    run = {"experiment": experiment, "overrides": overrides, "seed": seed, "mean_field": mean_field,
+           "status": "running"}
+    start = time.perf_counter()
+    try:
+        if mean_field:
+            simulation_class = importlib.import_module("mean_field").MODELS[experiment]
+        else:
+            simulation_class = importlib.import_module(experiment).Simulation
+        overrides = dict(overrides)
+        for key in RUN_FILES:
+            if overrides.get(key):
+                overrides[key] = os.path.join(directory, os.path.basename(overrides[key]))
+        config = Config(simulation_class.settings, **overrides)
+        run["settings"] = dict(config.items())
+        simulation = simulation_class(config, seed=seed)
+        run["seed"] = simulation.seed
+        while simulation.current_generation < config.number_of_generations:
+            simulation.calculate_generation()
+        if simulation.log is not None:
+            np.save(os.path.join(directory, "log.npy"), simulation.log[:simulation.log.written])
+        np.savez(os.path.join(directory, "summaries.npz"), **simulation.summaries.arrays())
+        run["generations"] = simulation.current_generation
+        if simulation.timer is not None:
+            run["phases"] = simulation.timer.report()
+        run["status"] = "done"
+    except Exception:
+        run["status"] = "failed"
+        run["error"] = traceback.format_exc()
+    run["seconds"] = time.perf_counter() - start
+    with open(os.path.join(directory, "run.json"), "w") as f:
+        json.dump(run, f, indent=2, default=str)
+    return run
+
+
+def run_sweep(experiment, runs, output_directory, max_workers=None, seed=None, progress=sys.stderr,
+              mean_field=False):
+    """Runs the experiment module (by name) once for each dict of settings overrides in runs.
+    At most max_workers processes run at the same time (default: number of CPUs). If seed is given,
+    run i is seeded with seed + i. Failing runs are recorded and do not affect the others.
+    If mean_field is True, the mean-field model of the experiment is run instead of the simulation.
+    Returns the list of run descriptions, in the order of runs"""
+    os.makedirs(output_directory, exist_ok=True)
+    results = [None] * len(runs)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for index, overrides in enumerate(runs):
+            directory = os.path.join(output_directory, "run_%04d" % index)
+            run_seed = None if seed is None else seed + index
+            futures[pool.submit(run_simulation, experiment, overrides, directory, run_seed, mean_field)] = index
+        for completed, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as error:  # the worker process died
+                results[index] = {"experiment": experiment, "overrides": runs[index], "status": "failed",
+                                  "error": repr(error)}
+            if progress:
+                progress.write("[%d/%d] run_%04d %s %s\n" % (completed, len(runs), index, results[index]["status"],
+                                                             json.dumps(runs[index])))
+                progress.flush()
+    with open(os.path.join(output_directory, "sweep.json"), "w") as f:
+        json.dump({"experiment": experiment, "runs": results}, f, indent=2, default=str)
+    return results
+
+
+def parse_value(text):
+    """Reads a python literal, anything else is taken as a string"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_grid_entry(entry):
+    """'mutation_rate=0.01,0.1' -> ('mutation_rate', [0.01, 0.1])"""
+    key, values = entry.split("=", 1)
+    return key.strip(), [parse_value(value.strip()) for value in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless parameter sweep over an experiment.")
+    parser.add_argument("experiment", help="experiment module, e.g. experiment_2")
+    parser.add_argument("--grid", action="append", default=[], metavar="SETTING=V1,V2,...",
+                        help="values for a setting; all combinations of the grid are run")
+    parser.add_argument("--runs", metavar="FILE", help="json file with a list of overrides, instead of a grid")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs for every configuration")
+    parser.add_argument("--workers", type=int, default=None, help="maximum number of concurrent runs")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the first run, incremented per run")
+    parser.add_argument("--output", default="sweep_output", help="output directory")
+    parser.add_argument("--mean-field", action="store_true", help="run the mean-field model instead of the agents")
+    args = parser.parse_args()
+
+    if args.runs:
+        with open(args.runs) as f:
+            runs = json.load(f)
+    else:
+        runs = expand_grid(dict(parse_grid_entry(entry) for entry in args.grid))
+    runs = [overrides for overrides in runs for i in range(args.repeat)]
+    results = run_sweep(args.experiment, runs, args.output, max_workers=args.workers, seed=args.seed,
+                        mean_field=args.mean_field)
+    failed = [result for result in results if result["status"] != "done"]
+    print("%d runs, %d failed, results in %s" % (len(results), len(failed), args.output))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
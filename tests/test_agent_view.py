@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from agent_view import AgentView, DETAIL_LIMIT, SAMPLE_SIZE
+from configuration import Config
+import experiment_3
+import simulation
+import simulation_numpy
+
+
+class RecordingCanvas(object):
+    """Records the calls that a Tk canvas would receive"""
+
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+        self.configured = 0
+        self.idle = []
+
+    def _create(self, *coordinates, **options):
+        self.created += 1
+        self.items[self.created] = options
+        return self.created
+
+    create_oval = create_text = create_image = _create
+
+    def itemconfigure(self, item, **options):
+        self.configured += 1
+        self.items[item].update(options)
+
+    def delete(self, item):
+        del self.items[item]
+
+    def after_idle(self, function):
+        self.idle.append(function)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for function in idle:
+            function()
+
+
+class RecordingImage(object):
+    def __init__(self, master=None, width=0, height=0):
+        self.data = None
+
+    def configure(self, data):
+        self.data = data
+
+
+class TestAgentView(TestCase):
+    def test_changed_labels_only(self):
+        canvas = RecordingCanvas()
+        view = AgentView(canvas)
+        s = simulation_numpy.Simulation()
+        view.layout(len(s.agents))
+        view.show(s.agents)
+        canvas.run_idle()
+        label = view.labels[3]
+        assert [canvas.items[item]["text"] for item in label[:3]] == ["0.0", "0", "0.5"]
+        configured = canvas.configured
+
+        s.agents["value"][3] = 1.23456
+        view.show(s.agents)
+        view.show(s.agents, [3])  # coalesced into a single render
+        assert len(canvas.idle) == 1
+        canvas.run_idle()
+        assert canvas.configured == configured + 1
+        assert canvas.items[label[0]]["text"] == "1.235"
+
+    def test_reuse_items(self):
+        canvas = RecordingCanvas()
+        view = AgentView(canvas)
+        view.layout(10)
+        created = canvas.created
+        view.show([simulation.Simulation().create_agent() for i in range(10)])
+        canvas.run_idle()
+        view.layout(10)
+        assert canvas.created == created
+        assert all(canvas.items[item]["text"] == "" for item in view.labels.ravel())
+        view.layout(5)
+        assert len(canvas.items) == 5 * 5
+        assert len(view.shown) == 5
+        assert np.isnan(view.drawn).all()
+
+    def test_aggregated(self):
+        canvas = RecordingCanvas()
+        view = AgentView(canvas, ranges=experiment_3.Simulation.histogram_ranges, image_factory=RecordingImage)
+        s = experiment_3.Simulation(Config(experiment_3.Simulation.settings, number_of_agents=10 * DETAIL_LIMIT))
+        view.layout(len(s.agents))
+        assert view.aggregated
+        assert view.raster_fields == ("reputation", "strategy")
+        assert len(view.shown) == SAMPLE_SIZE
+        assert len(canvas.items) == SAMPLE_SIZE * 5 + 2  # ovals and labels of the sample, raster and caption
+        assert view.position([0, len(s.agents) // 2]).round().tolist() == [[650, 350], [50, 350]]
+        view.show(s.agents)
+        canvas.run_idle()
+        header = b"P6\n"
+        assert view.image.data.startswith(header)
+        width, height = map(int, view.image.data.split(b"\n")[1].split())
+        assert len(view.image.data) == len(header) + len(b"%d %d\n255\n" % (width, height)) + 3 * width * height
+
+        configured = canvas.configured
+        view.show(s.agents, [view.shown[1] + 1])  # not among the shown agents, only the raster changes
+        canvas.run_idle()
+        assert canvas.configured == configured
+        assert view.is_shown(view.shown[1]) and not view.is_shown(view.shown[1] + 1)
+        view.layout(DETAIL_LIMIT)
+        assert view.is_shown(DETAIL_LIMIT - 1)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import time
+
+import numpy as np
+
+from aggregate import AggregateSimulation, distinct_draws, draw_without_replacement
+from configuration import Config
+from random_streams import RandomStreams
+import experiment_2
+
+
+def ks_statistic(a, b):
+    """The two-sample Kolmogorov-Smirnov statistic"""
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(np.sort(a), values, side="right") / len(a)
+    cdf_b = np.searchsorted(np.sort(b), values, side="right") / len(b)
+    return np.abs(cdf_a - cdf_b).max()
+
+
+def run(simulation):
+    while simulation.step():
+        pass
+
+
+class TestAggregate(TestCase):
+    def config(self, **changes):
+        return Config(experiment_2.Settings, **dict(dict(number_of_generations=6), **changes))
+
+    def test_counts(self):
+        for number_of_agents in [100, 10 ** 6, 10 ** 10]:
+            s = AggregateSimulation(self.config(number_of_agents=number_of_agents), seed=1)
+            run(s)
+            assert s.counts.sum() == number_of_agents and s.counts.min() >= 0
+            assert s.current_generation == 6
+        with self.assertRaises(ValueError):
+            AggregateSimulation(self.config(selection="tournament"))
+
+    def test_draws(self):
+        rng = RandomStreams(2)
+        counts = np.array([5, 0, 20, 3])
+        drawn = draw_without_replacement(counts, 25, rng)
+        assert drawn.sum() == 25 and (drawn <= counts).all()
+        drawn = draw_without_replacement(np.array([10 ** 9, 10 ** 10]), 1000, rng)
+        assert drawn.sum() == 1000
+        distinct = [distinct_draws(10 ** 5, 10 ** 5, rng) for i in range(200)]
+        assert abs(np.mean(distinct) - 10 ** 5 * (1 - np.exp(-1))) < 50
+
+    def test_distribution(self):
+        """The mean strategy and value after a few generations have the same distribution as with the per-agent
+        engine"""
+        runs = 80
+        per_agent, aggregate = [], []
+        for seed in range(runs):
+            s = experiment_2.Simulation(self.config(engine="batched"), seed=seed)
+            run(s)
+            per_agent.append([s.summaries.mean["strategy"][5], s.summaries.mean["value"][5]])
+            s = AggregateSimulation(self.config(), seed=seed + runs)
+            run(s)
+            aggregate.append([s.summaries.mean["strategy"][5], s.summaries.mean["value"][5]])
+        per_agent, aggregate = np.array(per_agent), np.array(aggregate)
+        critical = 1.95 * np.sqrt(2. / runs)  # significance level 0.001
+        for column in range(2):
+            assert ks_statistic(per_agent[:, column], aggregate[:, column]) < critical
+
+    def test_cost(self):
+        """A generation takes about the same time for any number of agents"""
+        seconds = []
+        for number_of_agents in [1000, 10 ** 9]:
+            s = AggregateSimulation(self.config(number_of_agents=number_of_agents, number_of_generations=12), seed=3)
+            s.calculate_generation()
+            start = time.perf_counter()
+            run(s)
+            seconds.append(time.perf_counter() - start)
+        assert seconds[1] < 5 * seconds[0] + 0.05
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import copy
+import json
+
+from benchmarks import suite
+import kernels
+import simulation_numpy
+
+COMPILED = ["compiled"] if kernels.AVAILABLE else []  # the compiled engine is only measured if numba is installed
+
+
+class TestBenchmarks(TestCase):
+    def test_suite(self):
+        results = suite.run(["simulation", "experiment_1"], [20], generations=1, minimum_time=0.01)
+        results = json.loads(json.dumps(results))
+        assert [(result["case"], result["agents"]) for result in results["results"]] == [
+            ("simulation", 20), ("experiment_1/sequential", 20), ("experiment_1/batched", 20)] + [
+            ("experiment_1/" + engine, 20) for engine in COMPILED]
+        for result in results["results"]:
+            assert result["steps_per_second"] > 0 and result["log_bytes"] > 0
+        assert suite.compare(results, results) == []
+
+        baseline = copy.deepcopy(results)
+        baseline["results"][1]["steps_per_second"] *= 2
+        baseline["results"][2]["log_bytes"] /= 2
+        baseline["results"].pop(0)  # cases missing from the baseline are not compared
+        regressions = suite.compare(results, baseline)
+        assert [regression[:3] for regression in regressions] == [
+            ("experiment_1/sequential", 20, "steps_per_second"), ("experiment_1/batched", 20, "log_bytes")]
+
+    def test_compact(self):
+        results = suite.run(["experiment_1"], [20], generations=1, minimum_time=0.01, compact=True)
+        assert [result["case"] for result in results["results"]] == [
+            "experiment_1/sequential", "experiment_1/sequential/compact", "experiment_1/batched",
+            "experiment_1/batched/compact"] + [case for engine in COMPILED for case in [
+            "experiment_1/" + engine, "experiment_1/%s/compact" % engine]]
+
+    def test_calibrate(self):
+        seconds = suite.calibrate(simulation_numpy.Simulation, steps=50)
+        assert set(seconds) == {"array", "dicts", "conversion", "break_even"} and min(seconds.values()) > 0
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import importlib
+import os
+import tempfile
+
+import numpy as np
+
+from checkpoint import write_checkpoint, read_checkpoint
+from configuration import Config
+from generation_log import MemoryMappedLog
+from simulation_numpy import Simulation as module_simulation
+
+
+def run(simulation):
+    while simulation.current_generation < simulation.config.number_of_generations:
+        simulation.calculate_generation()
+    return simulation
+
+
+class TestCheckpoint(TestCase):
+    def test_file_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint")
+            agents = np.zeros(10, dtype=[("value", float), ("reputation", int)])
+            agents["value"] = np.arange(10)
+            write_checkpoint(path, {"a": [1, np.arange(3)], "b": None}, {"agents": agents, "empty": np.zeros(0)})
+            header, arrays = read_checkpoint(path)
+            assert header["b"] is None
+            assert header["a"][0] == 1 and (header["a"][1] == np.arange(3)).all()
+            assert (arrays["agents"] == agents).all() and arrays["agents"].dtype == agents.dtype
+            arrays["agents"]["value"] += 1  # copy on write, the file is not changed
+            assert (read_checkpoint(path)[1]["agents"] == agents).all()
+
+    def test_resume(self):
+        for name, changes in [("simulation_numpy", {}), ("simulation_numpy", {"engine": "batched"}),
+                              ("experiment_2", {"mutation_rate": 0.1}), ("experiment_3", {})]:
+            module = importlib.import_module(name)
+            config = Config(module.Simulation.settings, number_of_generations=8,
+                            number_of_simulation_steps_in_a_generation=50, **changes)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "checkpoint")
+                s = module.Simulation(config, seed=11)
+                for i in range(4):
+                    s.calculate_generation()
+                for i in range(17):  # in the middle of a generation, with partly used random blocks
+                    s.step()
+                s.save_checkpoint(path)
+                resumed = run(module.Simulation.load_checkpoint(path))
+                complete = run(s)
+            assert resumed.config == config
+            assert (resumed.agents == complete.agents).all()
+            assert resumed.log.written == complete.log.written
+            assert (resumed.log[:resumed.log.written] == complete.log[:complete.log.written]).all()
+            for statistic, array in complete.summaries.arrays().items():
+                assert (resumed.summaries.arrays()[statistic] == array).all(), statistic
+
+    def test_branch_with_log_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint")
+            config = Config(number_of_generations=6, number_of_simulation_steps_in_a_generation=20,
+                            log_file=os.path.join(directory, "log.bin"))
+            s = module_simulation(config)
+            for i in range(3):
+                s.calculate_generation()
+            s.save_checkpoint(path)
+            s.log.close()
+            branch = module_simulation.load_checkpoint(path, mutation_rate=0.5,
+                                                       log_file=os.path.join(directory, "branch.bin"))
+            continued = module_simulation.load_checkpoint(path)
+            assert branch.config.mutation_rate == 0.5
+            run(branch), run(continued)
+            for log in (branch.log, continued.log):
+                log.close()
+                reader = MemoryMappedLog.open(log.path)
+                assert reader.written == 6
+                assert (reader[:3] == MemoryMappedLog.open(config.log_file)[:3]).all()
+
+    def test_background(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint")
+            config = Config(number_of_generations=6, number_of_simulation_steps_in_a_generation=20,
+                            checkpoint_file=path, checkpoint_interval=2)
+            s = module_simulation(config, seed=3)
+            for i in range(4):
+                s.calculate_generation()
+            s.checkpoint_writer.flush()
+            assert s.checkpoint_writer.error is None
+            resumed = module_simulation.load_checkpoint(path)
+            assert resumed.current_generation == 4 and resumed.current_simstep == 0
+            assert (run(resumed).agents == run(s).agents).all()
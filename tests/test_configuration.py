@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+from configuration import Settings, Config
+
+
+class TestConfig(TestCase):
+    def test_defaults(self):
+        config = Config()
+        assert config.number_of_agents == Settings.number_of_agents
+        assert dict(config.items())["mutation_rate"] == Settings.mutation_rate
+
+    def test_immutable_and_hashable(self):
+        config = Config(mutation_rate=0.3)
+        with self.assertRaises(AttributeError):
+            config.mutation_rate = 0.1
+        assert config == Config(mutation_rate=0.3)
+        assert hash(config) == hash(Config(mutation_rate=0.3))
+        assert config != Config()
+        assert len({config, Config(mutation_rate=0.3), Config()}) == 2
+
+    def test_replace(self):
+        config = Config()
+        changed = config.replace(number_of_agents=3)
+        assert changed.number_of_agents == 3
+        assert config.number_of_agents == Settings.number_of_agents
+        with self.assertRaises(KeyError):
+            config.replace(no_such_setting=1)
+
+    def test_experiments_do_not_change_settings(self):
+        defaults = Config()
+        import experiment_2, experiment_3, experiment_4
+        assert Config() == defaults
+        assert experiment_2.Simulation(seed=1).config.mutation_rate == 0.01
+        assert experiment_3.Simulation(seed=1).config.mutation_rate == 0.1
+        assert experiment_4.Simulation(seed=1).config.number_of_agents == 50
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from decimation import MinMaxPyramid
+
+
+class TestDecimation(TestCase):
+    def test_buckets(self):
+        random = np.random.default_rng(3)
+        values = random.normal(size=1500)
+        values[700:720] = 0.  # ties keep the first position
+        pyramid = MinMaxPyramid(capacity=10)
+        start = 0
+        for size in random.integers(1, 200, size=30).tolist():
+            pyramid.append(values[start:start + size])
+            start = min(start + size, len(values))
+        assert len(pyramid) == start and (pyramid.values[:start] == values).all()
+        assert (start - 1) >> pyramid.levels == 0  # the top level is a single bucket
+        for level in range(1, pyramid.levels + 1):
+            size = 1 << level
+            for bucket in range(-(-start // size)):
+                part = values[bucket * size:(bucket + 1) * size]
+                assert pyramid.minima[level][bucket] == bucket * size + np.argmin(part)
+                assert pyramid.maxima[level][bucket] == bucket * size + np.argmax(part)
+
+    def test_points(self):
+        values = np.cos(np.arange(10000) / 50.)
+        values[1234] = -3.
+        pyramid = MinMaxPyramid()
+        pyramid.append(values)
+        assert (pyramid.points(100, 200, width=50) == np.arange(100, 200)).all()
+        for start, stop, width in [(0, 10000, 100), (0, 10000, 7), (1000, 5000, 300)]:
+            points = pyramid.points(start, stop, width)
+            assert len(points) <= 2 * width + 2
+            assert (np.diff(points) >= 0).all()
+            assert values[points].min() == values[start:stop].min()
+            assert values[points].max() == values[start:stop].max()
+        assert len(pyramid.points(20000, 30000)) == 0
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import importlib
+
+import numpy as np
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from configuration import Config
+from diagrams import DiagramRenderer
+from summaries import GenerationSummaries
+import experiment_2
+
+MODULES = ["simulation", "simulation_numpy", "experiment_1", "experiment_2", "experiment_3", "experiment_4"]
+
+
+class TestDiagrams(TestCase):
+    def test_plot(self):
+        for name in MODULES:
+            module = importlib.import_module(name)
+            s = module.Simulation(Config(module.Simulation.settings, number_of_simulation_steps_in_a_generation=20))
+            plots = [diagram(s, Figure().add_subplot(111)) for diagram in module.diagrams]
+            for generation in range(3):
+                for plot in plots:
+                    plot.plot()
+                s.calculate_generation()
+
+    def test_incremental_updates(self):
+        config = Config(experiment_2.Simulation.settings, number_of_generations=40,
+                        number_of_simulation_steps_in_a_generation=20)
+        s = experiment_2.Simulation(config, seed=2)
+        figures = [Figure(), Figure()]
+        renderers = [DiagramRenderer(diagram(s, figure.add_subplot(111)), FigureCanvasAgg(figure))
+                     for diagram, figure in zip([experiment_2.StrategyPlot, experiment_2.StrategyHistogram], figures)]
+        line, histogram = (renderer.diagram for renderer in renderers)
+        for generation in range(30):
+            for renderer in renderers:
+                renderer.update()
+                renderer.update()  # nothing new
+            s.calculate_generation()
+        for renderer in renderers:
+            renderer.update()
+        assert line.length == s.summaries.written
+        assert len(line.subplot.lines) == 1
+        assert (line.artists[0].get_ydata() == s.summaries.series("mean", "strategy")).all()
+        assert line.subplot.get_xlim()[1] >= s.summaries.written - 1
+        heights = [bar.get_height() for bar in histogram.bars]
+        assert heights == s.summaries.histogram["strategy"][s.summaries.written - 1].tolist()
+        assert len(histogram.subplot.patches) == len(heights)
+        for renderer in renderers:
+            assert renderer.blits > 0
+            assert renderer.full_draws < 10
+            assert renderer.full_draws + renderer.blits <= 31
+
+    def test_decimation(self):
+        s = experiment_2.Simulation(Config(experiment_2.Simulation.settings, number_of_generations=30,
+                                           number_of_simulation_steps_in_a_generation=10))
+        summaries = s.summaries = GenerationSummaries(s.agents.dtype, 100000)
+        summaries.mean["strategy"][:] = np.sin(np.arange(100000) / 100.)
+        summaries.mean["strategy"][54321] = 5.  # a single outlier
+        summaries.written = 99990
+        diagram = experiment_2.StrategyPlot(s, Figure().add_subplot(111))
+        diagram.plot()
+        width = diagram.subplot.bbox.width
+        x, y = diagram.line.get_data()
+        assert len(x) <= 2 * width + 2
+        assert y.max() == 5. and y.min() == summaries.mean["strategy"].min()
+        diagram.subplot.set_xlim(1000, 1100)  # zooming shows every generation
+        x, y = diagram.line.get_data()
+        assert (x == np.arange(1000, 1101)).all() and (y == summaries.mean["strategy"][1000:1101]).all()
+        summaries.written = 100000  # the zoomed view is kept when generations are added
+        assert diagram.plot() == "artists"
+        assert diagram.subplot.get_xlim() == (1000, 1100)
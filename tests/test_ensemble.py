@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from configuration import Settings, Config
+from ensemble import Ensemble, lockstep_levels
+from random_streams import RandomStreams
+import simulation_numpy
+
+
+class TestEnsemble(TestCase):
+    def test___init__(self):
+        e = Ensemble(replicas=4)
+        assert e.agents.shape == (4, Settings.number_of_agents)
+        assert e.log.shape == (Settings.number_of_generations, 4, Settings.number_of_agents)
+        assert np.shares_memory(e.simulation.agents, e.agents)
+        assert e.mean[0]["deception probability"] == 0.5
+
+    def test_lockstep_levels(self):
+        first, second = RandomStreams().pairs(10, (3, 200))
+        performed = RandomStreams().uniforms((3, 200)) < 0.7
+        levels = lockstep_levels(first, second, performed, 10)
+        assert (levels[~performed] == -1).all()
+        for replica in range(3):
+            last_level = {}
+            for a, b, level in zip(first[replica], second[replica], levels[replica]):
+                if level >= 0:
+                    assert last_level.get(a, -1) < level and last_level.get(b, -1) < level
+                    last_level[a] = last_level[b] = level
+
+    def test_calculate_generation(self):
+        e = Ensemble(replicas=5)
+        assert e.calculate_generation()
+        assert e.current_generation == 2
+        logged = e.log[1]
+        assert (logged["value"] != 0).any()
+        assert np.isclose(e.mean[1]["value"], logged["value"].mean())
+        replica_means = logged["reputation"].mean(axis=1)
+        assert np.isclose(e.band[1]["reputation"], 1.96 * replica_means.std(ddof=1) / np.sqrt(5))
+        assert (e.agents["value"] == 0).all()  # reset for the next generation
+
+    def test_replicas_are_independent(self):
+        e = Ensemble(replicas=3, config=Config(mutation_rate=0.))
+        e.agents["deception probability"] = np.array([0.1, 0.5, 0.9])[:, None]
+        e.calculate_generation()
+        assert (e.agents["deception probability"] == np.array([0.1, 0.5, 0.9])[:, None]).all()
+
+    def test_select_population_matches_select_agents(self):
+        s = simulation_numpy.Simulation(seed=3)
+        s.agents["value"] = s.rng.uniforms(len(s.agents))
+        population = np.stack([s.agents, s.agents])
+        s.rng = RandomStreams(5)
+        s.select_agents()
+        s.rng = RandomStreams(5)
+        s.select_population(population[:1])
+        assert (population[0] == s.agents).all()
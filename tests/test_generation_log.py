@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import os
+import tempfile
+
+import numpy as np
+
+from configuration import Config
+from generation_log import GenerationLog, MemoryMappedLog, ColumnLog
+import simulation
+from simulation_numpy import Simulation, AGENT
+
+
+class TestGenerationLog(TestCase):
+    def test_grow(self):
+        log = GenerationLog(AGENT, (5, ), 2)
+        snapshot = np.ones(5, dtype=AGENT)
+        log[0] = snapshot
+        log[6] = snapshot
+        assert len(log) >= 7
+        assert log.written == 7
+        assert (log[6] == snapshot).all()
+        assert (log[1:6]["value"] == 0).all()
+
+    def test_memory_mapped_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log.bin")
+            log = MemoryMappedLog(path, AGENT, (3, ), header={"seed": 5}, chunk=4)
+            reader = MemoryMappedLog.open(path)
+            assert reader.written == 0
+            assert reader.header["seed"] == 5
+            for generation in range(10):  # grows beyond the first chunk
+                snapshot = np.zeros(3, dtype=AGENT)
+                snapshot["value"] = generation
+                log[generation] = snapshot
+            reader.refresh()
+            assert reader.written == 10
+            assert reader.dtype == np.dtype(AGENT)
+            assert (reader[:reader.written]["value"][:, 0] == np.arange(10)).all()
+            with self.assertRaises(ValueError):
+                reader[0] = snapshot
+            log.close()
+
+    def test_simulation_with_log_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log.bin")
+            config = Config(log_file=path, number_of_generations=4, number_of_simulation_steps_in_a_generation=20)
+            s = Simulation(config, seed=9)
+            while s.current_generation < config.number_of_generations:
+                s.calculate_generation()
+            reader = MemoryMappedLog.open(path)
+            assert reader.written == 4
+            assert reader.header["seed"] == 9
+            assert reader.header["config"]["number_of_agents"] == config.number_of_agents
+            assert (reader[:4] == s.log[:4]).all()
+            s.log.close()
+
+    def test_column_log(self):
+        log = ColumnLog(["value", "reputation"], 3, 1)
+        for sample in range(5):  # grows beyond the preallocated sample
+            log.append([{"value": sample, "reputation": -agent} for agent in range(3)], generation=sample)
+        assert log.written == 5
+        assert log["value"].shape == (5, 3)
+        assert (log["value"][:, 1] == np.arange(5)).all()
+        assert (log["reputation"][3] == [0, -1, -2]).all()
+        assert (log.generations[:5] == np.arange(5)).all()
+
+    def test_dict_simulation_sampling(self):
+        steps, generations = 20, 4
+        for log_steps, log_interval, samples in [(0, 1, 3), (0, 2, 1), (0, 0, 0), (1, 1, 80), (5, 1, 16)]:
+            config = Config(number_of_generations=generations, number_of_simulation_steps_in_a_generation=steps,
+                            log_steps=log_steps, log_interval=log_interval)
+            s = simulation.Simulation(config)
+            while s.step():
+                pass
+            assert s.log.written == samples
+            assert s.log["deception_probability"].shape == (samples, config.number_of_agents)
+        assert (s.log.simsteps[:samples] % 5 == 0).all()
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+from benchmarks.import_time import ENGINE_MODULES, import_time
+
+
+class TestImports(TestCase):
+    def test_engines_do_not_load_the_gui(self):
+        for module in ENGINE_MODULES:
+            seconds, heavy = import_time(module, repeat=1)
+            assert heavy == [], (module, heavy)
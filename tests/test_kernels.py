@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase, skipUnless
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from configuration import Config
+from random_streams import RandomStreams
+import kernels
+import simulation_numpy
+import experiment_1
+import experiment_2
+import experiment_3
+import experiment_4
+
+MODULES = [simulation_numpy, experiment_1, experiment_2, experiment_3, experiment_4]
+
+
+def randomize(agents, rng):
+    agents["reputation"] = rng.generator.integers(-5, 6, size=len(agents))
+    if "strategy" in agents.dtype.names:
+        agents["strategy"] = rng.generator.integers(-5, 6, size=len(agents))
+
+
+def deterministic(module, **changes):
+    """A config of the game of module in which the policies do not depend on random numbers, and every reputation
+    exchange takes place"""
+    changes.update(probability_of_a_reputation_exchange=0., probability_of_repercussion_for_reputation_diminishment=1.,
+                   noise=0.)
+    settings = module.Simulation.settings
+    return Config(settings, **{key: value for key, value in changes.items() if hasattr(settings, key)})
+
+
+def prepare(simulation, rng):
+    randomize(simulation.agents, rng)
+    if "deception probability" in simulation.agents.dtype.names:
+        simulation.agents["deception probability"] = 1.
+
+
+def replay(simulation, kinds, first, second):
+    """Plays the interactions through cooperation_step and deception_step, the steps of the sequential engine"""
+    pairs = iter(zip(first.tolist(), second.tolist()))
+    simulation.rng.pair = lambda number_of_agents: next(pairs)
+    for kind in kinds.tolist():
+        if kind == kernels.COOPERATION:
+            simulation.cooperation_step()
+        else:
+            simulation.deception_step()
+    del simulation.rng.pair
+
+
+def kernel_against_batched():
+    """Plays a generation of every game with the kernel (calculate_steps_compiled) and with the batched engine, from
+    the same agents and draws. Returns the (module name, compact_agents) of the games in which the agents differ"""
+    rng = RandomStreams(8)
+    differ = []
+    for module in MODULES:
+        for compact_agents in (False, True):
+            config = deterministic(module, number_of_agents=40, compact_agents=compact_agents)
+            compiled = module.Simulation(config.replace(engine="compiled"), seed=9)
+            batched = module.Simulation(config.replace(engine="batched"), seed=9)
+            prepare(compiled, rng)
+            batched.agents[:] = compiled.agents
+            compiled.calculate_steps_compiled()
+            batched.calculate_steps_batched()
+            if not (compiled.agents == batched.agents).all():
+                differ.append((module.__name__, compact_agents))
+    return differ
+
+
+class TestKernels(TestCase):
+    def test_policies_agree_with_scalar_form(self):
+        rng = RandomStreams(1)
+        for module in MODULES:
+            s = module.Simulation(seed=2)
+            randomize(s.agents, rng)
+            columns = kernels.columns(s.agents)
+            a, b = rng.pairs(len(s.agents), 500)
+            for name, policy in s.policies.items():
+                for i, j, random in zip(a.tolist(), b.tolist(), rng.uniforms(500).tolist()):
+                    assert policy.kernel(*columns, i, j, random) == \
+                        policy.scalar(s.agents[i], s.agents[j], lambda: random), (module.__name__, name)
+
+    def test_play_matches_sequential_order(self):
+        """With deterministic policies, play() gives exactly the agents of the sequential steps"""
+        rng = RandomStreams(3)
+        for module in MODULES:
+            config = deterministic(module, number_of_agents=30)
+            compiled, sequential = module.Simulation(config, seed=4), module.Simulation(config, seed=4)
+            prepare(compiled, rng)
+            sequential.agents[:] = compiled.agents
+            kinds, first, second, performed = compiled.draw_interactions(400)
+            assert performed.all()
+            kinds, first, second = kinds[0], first[0], second[0]
+            policies = [compiled.policies[name].kernel if name in compiled.policies else kernels.no_policy
+                        for name in ("cooperation", "reputation")]
+            kernels.play(kinds, first, second, rng.uniforms((len(kinds), 2)), *kernels.columns(compiled.agents),
+                         *policies, np.array(compiled.payoffs), 1.)
+            replay(sequential, kinds, first, second)
+            assert (compiled.agents == sequential.agents).all(), module.__name__
+
+    @skipUnless(kernels.AVAILABLE, "numba is not installed")
+    def test_compiled_engine_matches_sequential_steps(self):
+        """The numba-compiled engine, with wide and compact agent fields, against the reference steps"""
+        rng = RandomStreams(6)
+        for module in MODULES:
+            for compact_agents in (False, True):
+                config = deterministic(module, number_of_agents=40, compact_agents=compact_agents,
+                                       engine="compiled")
+                compiled, sequential = module.Simulation(config, seed=7), module.Simulation(config, seed=7)
+                assert None not in [policy.kernel for policy in compiled.policies.values()]  # no fallback
+                prepare(compiled, rng)
+                sequential.agents[:] = compiled.agents
+                steps = config.number_of_simulation_steps_in_a_generation
+                kinds, first, second, performed = sequential.draw_interactions(steps)  # the draws of the engine
+                compiled.calculate_steps_compiled()
+                replay(sequential, kinds[0], first[0], second[0])
+                assert compiled.agents.dtype == sequential.agents.dtype
+                assert (compiled.agents == sequential.agents).all(), (module.__name__, compact_agents)
+
+    def test_kernel_matches_batched_engine(self):
+        """The kernel, run as plain python, against the batched engine. If numba is installed, this runs in a new
+        process with NUMBA_DISABLE_JIT=1, as the kernels are compiled when kernels is imported"""
+        if importlib.util.find_spec("numba") is None:
+            try:
+                kernels.AVAILABLE = True  # calculate_steps_compiled does not fall back to the batched engine
+                assert kernel_against_batched() == []
+            finally:
+                kernels.AVAILABLE = False
+            return
+        code = ("import json, kernels, numba\n"
+                "from tests.test_kernels import kernel_against_batched\n"
+                "assert kernels.AVAILABLE and numba.config.DISABLE_JIT\n"
+                "print(json.dumps(kernel_against_batched()))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True,
+                                env=dict(os.environ, NUMBA_DISABLE_JIT="1"))
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout) == []
+
+    def test_engine(self):
+        for module in MODULES:
+            config = Config(module.Simulation.settings, number_of_generations=3, engine="compiled")
+            s = module.Simulation(config, seed=5)
+            s.calculate_generation()
+            assert s.current_generation == 2 and s.current_simstep == 0
+            if not kernels.AVAILABLE:  # falls back to the batched engine
+                batched = module.Simulation(config.replace(engine="batched"), seed=5)
+                batched.calculate_generation()
+                assert (s.agents == batched.agents).all()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import math
+import time
+
+import numpy as np
+
+from configuration import Config
+from policies import Policy
+import mean_field
+import experiment_2
+
+
+class TestMeanField(TestCase):
+    def test_helpers(self):
+        x = np.linspace(-6, 6, 101)
+        assert np.allclose(mean_field.normal_cdf(x), [0.5 * (1 + math.erf(value / math.sqrt(2))) for value in x],
+                           atol=1e-7)
+        kernel = mean_field.uniform_kernel(mean_field.DECEPTION_LEVELS, 0.2)
+        assert np.allclose(kernel.sum(axis=1), 1)
+        assert np.isclose(kernel[50] @ mean_field.DECEPTION_LEVELS, 0.5)  # no drift away from the borders
+        assert kernel[0, 0] > 0.5  # clipped at the border
+
+    def test_decisions(self):
+        """The probabilities of the decisions come from the policies of the simulation classes"""
+        m = mean_field.Experiment3(Config(mean_field.Experiment3.settings, number_of_generations=2))
+        strategy, noise = m.types["strategy"][:, None], m.types["noise"][:, None]
+        threshold = mean_field.REPUTATIONS[None, :] - strategy
+        exact = np.where(noise > 0, np.clip(threshold / np.where(noise > 0, noise, 1.) + 0.5, 0., 1.), threshold >= 0)
+        assert np.abs(m.cooperation - exact).max() <= 1. / mean_field.DECISION_SAMPLES
+        assert mean_field.MeanField().deception is not None and m.deception is None
+
+        class Generous(experiment_2.Simulation):
+            policies = dict(experiment_2.Simulation.policies, cooperation=Policy(
+                lambda agent, other_agent, random: True, lambda agents, a, b, rng: np.ones(len(a), dtype=bool)))
+
+        class GenerousModel(mean_field.Experiment2):
+            rules = Generous
+
+        m = GenerousModel(Config(Generous.settings, number_of_generations=2))
+        assert (m.cooperation == 1).all()
+        m.calculate_generation()
+        settings = Generous.settings  # every agent gets the benefit of every interaction in which it is the partner
+        assert np.isclose(m.summaries.mean["value"][1], Generous.payoffs[1]
+                          * settings.number_of_simulation_steps_in_a_generation / settings.number_of_agents)
+
+    def test_transitions(self):
+        """A power of the step of a segment is the same as the steps one after the other"""
+        m = mean_field.MeanField(Config(mean_field.MeanField.settings, number_of_agents=5))
+        m.update(3)  # some agents with other reputations and values
+        state = m.occupation.copy(), m.value.copy(), m.square.copy()
+        transition = m.transition(m.occupation.sum(axis=0))
+        expected = state
+        for i in range(13):
+            expected = mean_field.advance(transition, 1, *expected)
+        for result, value in zip(mean_field.advance(transition, 13, *state), expected):
+            assert np.allclose(result, value)
+
+    def test_models(self):
+        for name, model in mean_field.MODELS.items():
+            for selection in ["truncation", "proportional", "tournament", "rank"]:
+                m = model(Config(model.settings, number_of_generations=4, selection=selection,
+                                 number_of_surviving_agents=2))
+                while m.step():
+                    pass
+                assert m.current_generation == 4
+                assert np.isclose(m.mass.sum(), 1) and m.mass.min() >= 0
+                assert np.isclose(m.occupation.sum(), 1) and m.occupation.min() >= -1e-12
+                for field in m.summaries.fields:
+                    assert np.isfinite(m.summaries.mean[field][:3]).all(), (name, selection)
+
+    def test_validate(self):
+        """The model follows the mean of agent-based runs: closely within the first generation, and roughly over
+        the following ones"""
+        config = Config(mean_field.Experiment2.settings, number_of_agents=1000, number_of_parents_in_a_generation=500,
+                        number_of_simulation_steps_in_a_generation=3000)
+        result = mean_field.validate(mean_field.Experiment2, config, [1, 3, 10], runs=6,
+                                     fields=("value", "reputation", "strategy"))
+        for name, (model, mean, error) in result.items():
+            assert abs(model[0] - mean[0]) < 4 * error[0] + 0.05, name
+        model, mean, error = result["strategy"]
+        assert np.all(np.abs(model - mean) < 0.6)
+
+        config = Config(mean_field.MeanField.settings, number_of_agents=200)
+        for name, (model, mean, error) in mean_field.validate(mean_field.MeanField, config, [1], runs=6).items():
+            assert abs(model[0] - mean[0]) < 4 * error[0] + 0.1, name
+
+    def test_long_runs(self):
+        """2000 generations take seconds, a hundred times more steps in a generation cost at most a few times as much,
+        and the model agrees with the agent-based runs"""
+        config = Config(mean_field.Experiment1.settings, number_of_agents=1000, number_of_parents_in_a_generation=500,
+                        number_of_simulation_steps_in_a_generation=1250, number_of_generations=2000)
+        seconds = {}
+        for steps, generations in [(1250, 2000), (125000, 200)]:
+            m = mean_field.Experiment1(config.replace(number_of_simulation_steps_in_a_generation=steps))
+            start = time.perf_counter()
+            while m.current_generation < generations:
+                m.calculate_generation()
+            seconds[steps] = (time.perf_counter() - start) / generations
+            assert np.isclose(m.mass.sum(), 1) and np.isfinite(m.summaries.mean["value"][:generations]).all()
+        assert seconds[1250] * 2000 < 30
+        assert seconds[125000] < 3 * seconds[1250]
+
+        result = mean_field.validate(mean_field.Experiment1, config, [1, 5, 10], runs=4,
+                                     fields=("value", "reputation", "strategy"))
+        for name, (model, mean, error) in result.items():
+            assert abs(model[0] - mean[0]) < 4 * error[0] + 0.05, name
+        model, mean, error = result["strategy"]
+        assert np.all(np.abs(model - mean) < 0.3)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from configuration import Config
+from random_streams import RandomStreams
+import simulation_numpy
+import experiment_1
+import experiment_2
+import experiment_3
+import experiment_4
+
+MODULES = [simulation_numpy, experiment_1, experiment_2, experiment_3, experiment_4]
+
+
+class TestPolicies(TestCase):
+    def test_resolution(self):
+        assert experiment_2.Simulation.policies["cooperation"].scalar is experiment_1.cooperation_policy
+        for module in [experiment_3, experiment_4]:
+            assert module.Simulation.policies["cooperation"].scalar is module.cooperation_policy
+            assert module.Simulation.policies["cooperation"].batch is module.cooperation_policy_batch
+            assert set(module.Simulation.policies) == {"cooperation"}
+
+    def test_noise_is_used(self):
+        for module in [experiment_3, experiment_4]:
+            s = module.Simulation(Config(module.Simulation.settings, noise=4.), seed=5)
+            s.agents["strategy"] = 0  # without noise, every agent would cooperate
+            cooperations = 0
+            for i in range(2000):
+                s.agents["reputation"] = 0
+                s.cooperation_step()
+                cooperations += s.last_relation == "cooperate"
+            assert 800 < cooperations < 1200
+
+    def test_scalar_and_batch_agree(self):
+        rng = RandomStreams(7)
+        for module in MODULES:
+            s = module.Simulation(seed=3)
+            agents = s.agents
+            agents["reputation"] = rng.generator.integers(-5, 6, size=len(agents))
+            if "strategy" in agents.dtype.names:
+                agents["strategy"] = rng.generator.integers(-5, 6, size=len(agents))
+            a, b = rng.pairs(len(agents), 20000)
+            for name, policy in s.policies.items():
+                scalar = np.array([policy.scalar(agents[i], agents[j], rng.random)
+                                   for i, j in zip(a.tolist(), b.tolist())])
+                batch = policy.batch(agents, a, b, rng)
+                assert batch.dtype == bool and batch.shape == a.shape
+                assert abs(scalar.mean() - batch.mean()) < 0.02, (module.__name__, name)
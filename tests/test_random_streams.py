@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from random_streams import RandomStreams
+
+
+class TestRandomStreams(TestCase):
+    def test_seed(self):
+        r1, r2 = RandomStreams(7), RandomStreams(7)
+        assert [r1.random() for i in range(5000)] == [r2.random() for i in range(5000)]
+        assert [r1.pair(10) for i in range(5000)] == [r2.pair(10) for i in range(5000)]
+        assert RandomStreams().seed != RandomStreams().seed
+
+    def test_random(self):
+        values = [RandomStreams().random() for i in range(10000)]
+        assert all(0. <= v < 1. for v in values)
+        assert isinstance(values[0], float)
+
+    def test_pair(self):
+        r = RandomStreams()
+        pairs = [r.pair(3) for i in range(10000)]
+        assert all(a != b and 0 <= a < 3 and 0 <= b < 3 for a, b in pairs)
+        assert len(set(pairs)) == 6  # every ordered pair occurs
+
+    def test_pairs(self):
+        first, second = RandomStreams().pairs(1000000, 100000)
+        assert (first != second).all()
+        assert first.min() >= 0 and second.max() < 1000000
+
+    def test_binomial(self):
+        r = RandomStreams()
+        samples = np.array([r.binomial(100, 0.1) for i in range(10000)])
+        assert samples.min() >= 0 and samples.max() <= 100
+        assert 9.5 < samples.mean() < 10.5
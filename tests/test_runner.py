@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import time
+
+from configuration import Config
+from runner import SimulationRunner, take_snapshot
+import simulation
+import simulation_numpy
+
+
+class TestSimulationRunner(TestCase):
+    def test_snapshot(self):
+        s = simulation_numpy.Simulation()
+        s.step()
+        snapshot = take_snapshot(s)
+        s.calculate_generation()
+        assert snapshot.current_simstep == 1
+        assert (snapshot.agents != s.agents).any()
+        with self.assertRaises(ValueError):
+            snapshot.agents["value"][0] = 1
+        snapshot = take_snapshot(simulation.Simulation())
+        assert snapshot.agents[0]["value"] == 0
+
+    def test_run_to_the_end(self):
+        config = Config(number_of_generations=5, number_of_simulation_steps_in_a_generation=200)
+        for generations in (False, True):
+            s = simulation_numpy.Simulation(config, seed=1)
+            runner = SimulationRunner(s, frames_per_second=1000, queue_size=2)
+            runner.start(generations=generations)
+            runner.thread.join()
+            assert runner.snapshots.qsize() <= 2
+            snapshot = runner.latest()
+            assert snapshot.finished
+            assert snapshot.current_generation == config.number_of_generations
+            assert (snapshot.agents == s.agents).all()
+            assert runner.latest() is None
+
+    def test_stop(self):
+        config = Config(number_of_generations=10 ** 6, number_of_simulation_steps_in_a_generation=100)
+        s = simulation_numpy.Simulation(config)
+        runner = SimulationRunner(s, frames_per_second=10 ** 6, queue_size=1)
+        runner.start()
+        time.sleep(0.05)
+        start = time.perf_counter()
+        runner.stop()
+        assert time.perf_counter() - start < 0.5
+        assert not runner.running
+        assert runner.error is None
+        assert runner.dropped > 0
+        snapshot = runner.latest()
+        assert not snapshot.finished
+        assert snapshot.current_simstep == s.current_simstep
+        assert snapshot.current_generation == s.current_generation
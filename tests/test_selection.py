@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import numpy as np
+
+from configuration import Config
+from random_streams import RandomStreams
+import selection
+import simulation_numpy
+
+
+class TestSelection(TestCase):
+    def test_fittest(self):
+        fitness = RandomStreams(1).uniforms((3, 50))
+        for k in [0, 1, 7, 50, 60]:
+            top = selection.fittest(fitness, k)
+            assert top.shape == (3, min(k, 50))
+            for row in range(3):
+                assert sorted(top[row]) == sorted(np.argsort(fitness[row])[::-1][:k])
+
+    def test_allocate(self):
+        rng = RandomStreams(2)
+        expected = rng.uniforms((4, 30))
+        expected *= 97 / expected.sum(axis=1, keepdims=True)
+        for offsets in [0.5, rng.uniforms(4)]:
+            counts = selection.allocate(expected, offsets)
+            assert (counts.sum(axis=1) == 97).all()
+            assert ((counts == np.floor(expected)) | (counts == np.ceil(expected))).all()
+
+    def test_operators(self):
+        rng = RandomStreams(3)
+        fitness = rng.uniforms((2, 1000))
+        config = Config(number_of_parents_in_a_generation=100, influence_of_fitness_to_reproductive_success=1.,
+                        tournament_size=3)
+        for name, operator in selection.OPERATORS.items():
+            parents = operator(fitness, 990, config, rng)
+            assert parents.shape == (2, 990) and parents.min() >= 0 and parents.max() < 1000
+            mean = np.take_along_axis(fitness, parents, axis=1).mean()
+            assert mean > 0.6, name  # fitter agents have more children
+        parents = selection.truncation(fitness, 990, config, rng)
+        for row in range(2):
+            assert set(parents[row]) <= set(selection.fittest(fitness, 100)[row])
+        # without influence of the fitness, every parent gets the same number of children
+        counts = np.bincount(selection.truncation(fitness, 1000, config.replace(
+            influence_of_fitness_to_reproductive_success=0.), rng)[0], minlength=1000)
+        assert sorted(set(counts[counts > 0])) == [10]
+
+    def test_simulation(self):
+        for name in selection.OPERATORS:
+            s = simulation_numpy.Simulation(Config(selection=name, number_of_surviving_agents=2,
+                                                   number_of_simulation_steps_in_a_generation=50), seed=4)
+            s.calculate_generation()
+            s.calculate_generation()
+            assert len(s.agents) == s.config.number_of_agents and (s.agents["value"] == 0).all()
+        with self.assertRaises(ValueError):
+            simulation_numpy.Simulation(Config(selection="roulette"))
@@ -8,7 +8,12 @@ from unittest import TestCase
 __author__ = 'joscha'
 __date__ = '14.07.14'
 
-from simulation_numpy import Simulation, Settings, FITNESS, AGENT
+import numpy as np
+
+from configuration import Config
+from simulation_numpy import Simulation, Settings, FITNESS, AGENT, COOPERATION, conflict_free_batches
+from random_streams import RandomStreams
+import experiment_3
 
 class TestSimulation(TestCase):
     def test___init__(self):
@@ -25,7 +30,7 @@ class TestSimulation(TestCase):
         assert len(s.log[0][0]) == len(AGENT)
 
     def test_step(self):
-        s = Simulation()
+        s = Simulation(seed=1)  # a deception with repercussion can lower two reputations, the seed avoids it
         current_step = s.current_simstep
         current_generation = s.current_generation
         s.step()
@@ -88,3 +93,87 @@ class TestSimulation(TestCase):
             assert number_of_negative_reputations == 2 or number_of_negative_reputations == 0 or \
                    number_of_negative_reputations == 1
 
+
+    def test_seed_determines_the_run(self):
+        s1, s2 = Simulation(seed=42), Simulation(seed=42)
+        for i in range(Settings.number_of_simulation_steps_in_a_generation + 10):
+            s1.step()
+            s2.step()
+        assert (s1.agents == s2.agents).all()
+        assert (s1.log[:] == s2.log[:]).all()
+
+    def test_conflict_free_batches(self):
+        first, second = RandomStreams().pairs(10, 500)
+        batches = conflict_free_batches(first, second)
+        assert sorted(np.concatenate(batches)) == list(range(500))
+        last_batch = {}
+        for batch_index, batch in enumerate(batches):
+            agents = np.concatenate([first[batch], second[batch]])
+            assert len(np.unique(agents)) == len(agents)  # no agent appears twice in a batch
+            for a, b in zip(first[batch], second[batch]):
+                assert last_batch.get(a, -1) < batch_index and last_batch.get(b, -1) < batch_index
+                last_batch[a] = last_batch[b] = batch_index
+
+    def test_batched_interactions_match_sequential_order(self):
+        # deterministic policies: every reputation exchange takes place, and every deception has repercussions
+        config = Config(probability_of_a_reputation_exchange=0.,
+                        probability_of_repercussion_for_reputation_diminishment=1.)
+        batched, sequential = Simulation(config), Simulation(config)
+        batched.agents["deception probability"] = sequential.agents["deception probability"] = 1.
+        kinds, first, second, performed = batched.draw_interactions(500)
+        kinds, first, second = kinds[performed], first[performed], second[performed]
+        for batch in conflict_free_batches(first, second):
+            batched.apply_interactions(kinds[batch], first[batch], second[batch])
+        # replay the same interactions through the steps of the sequential engine
+        pairs = iter(zip(first.tolist(), second.tolist()))
+        sequential.rng.pair = lambda number_of_agents: next(pairs)
+        for kind in kinds:
+            if kind == COOPERATION:
+                sequential.cooperation_step()
+            else:
+                sequential.deception_step()
+        assert (sequential.agents["reputation"] < 0).any()  # some agents defected
+        assert (batched.agents == sequential.agents).all()
+
+    def test_batched_generation(self):
+        s = Simulation(Config(engine="batched"))
+        s.agents["deception probability"] = 0.
+        s.calculate_steps_batched()
+        assert s.current_simstep == Settings.number_of_simulation_steps_in_a_generation
+        # without deception, every agent cooperates, and every step adds a payoff of 0.5
+        assert s.agents["value"].sum() == 0.5 * Settings.number_of_simulation_steps_in_a_generation
+        assert (s.agents["reputation"] >= 0).all()
+        s.calculate_generation()
+        assert s.current_simstep == 0
+        assert s.current_generation == 2
+
+    def test_config(self):
+        s = Simulation(Config(number_of_agents=7, number_of_generations=3))
+        assert len(s.agents) == 7
+        assert s.log.shape == (3, 7)
+        assert Simulation().config == Config(Settings)
+
+    def test_compact_agents(self):
+        for simulation_class in [Simulation, experiment_3.Simulation]:
+            config = Config(simulation_class.settings, number_of_generations=3, compact_agents=True)
+            s = simulation_class(config, seed=1)
+            assert s.agents.dtype["value"] == np.float32 and s.agents.dtype["reputation"] == np.int8
+            assert s.agents.dtype.names == simulation_class(config.replace(compact_agents=False)).agents.dtype.names
+            while s.step():
+                pass
+            assert s.log.dtype == s.agents.dtype
+            assert s.agents["reputation"].min() >= -5 and s.agents["reputation"].max() <= 5
+        # large float32 values: every parent gets its share of children, as computed from the values in float64
+        s = Simulation(Config(number_of_agents=4000, number_of_parents_in_a_generation=1000, mutation_rate=0.,
+                              influence_of_fitness_to_reproductive_success=1., compact_agents=True), seed=2)
+        s.agents["value"] = np.random.default_rng(3).uniform(10 ** 6, 10 ** 6 + 1000, size=4000)
+        s.agents["deception probability"] = np.arange(4000) / 4000  # tells the parent of a child
+        value = s.agents["value"].astype(float)
+        parents = np.argsort(value)[-1000:]
+        expected = np.zeros(4000)
+        expected[parents] = value[parents] - value.min()
+        expected *= 4000 / expected.sum()
+        s.select_agents()
+        children = np.bincount(np.round(s.agents["deception probability"] * 4000).astype(int), minlength=4000)
+        assert children.sum() == 4000 and (children[expected == 0] == 0).all()
+        assert np.abs(children - expected).max() < 1
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+from configuration import Config
+import storage
+import simulation_numpy
+import experiment_1
+import experiment_3
+
+
+class TestStorage(TestCase):
+    def test_storages_give_the_same_run(self):
+        for module in [simulation_numpy, experiment_1, experiment_3]:
+            for compact_agents in (False, True):  # compact values are rounded to float32 at every step in both
+                runs = []
+                for agent_storage in storage.STORAGES:
+                    config = Config(module.Simulation.settings, number_of_agents=50, number_of_generations=3,
+                                    number_of_simulation_steps_in_a_generation=200, agent_storage=agent_storage,
+                                    compact_agents=compact_agents)
+                    s = module.Simulation(config, seed=1)
+                    assert s.agent_storage == agent_storage
+                    while s.step():
+                        pass
+                    runs.append(s)
+                assert (runs[0].agents == runs[1].agents).all(), (module.__name__, compact_agents)
+                assert (runs[0].summaries.mean == runs[1].summaries.mean).all()
+
+    def test_agents_stay_consistent(self):
+        s = simulation_numpy.Simulation(Config(agent_storage="dicts"), seed=2)
+        s.agents["reputation"] = -1  # no agent cooperates
+        s.step()
+        assert (s.agents["reputation"] < -1).any()  # the step changed the agents of the array
+        assert s.agents["value"].sum() == 0
+        s.agents["reputation"] = 5
+        s.step()
+        assert s.agents["value"].sum() == 0.5
+
+    def test_choose(self):
+        config = Config(number_of_agents=100, number_of_simulation_steps_in_a_generation=1000)
+        assert storage.choose(config.replace(agent_storage="array")) == "array"
+        assert storage.choose(config.replace(engine="batched")) == "array"
+        assert storage.choose(config) == "dicts"
+        assert storage.choose(config.replace(number_of_agents=10 ** 4)) == "array"
+        assert simulation_numpy.Simulation(config.replace(number_of_agents=2000)).agent_storage == "dicts"
+        assert simulation_numpy.Simulation(config.replace(number_of_agents=2001)).agent_storage == "array"
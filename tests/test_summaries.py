@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import threading
+
+import numpy as np
+
+from configuration import Config
+from summaries import GenerationSummaries, QUANTILES
+from simulation_numpy import Simulation, AGENT
+
+
+class TestGenerationSummaries(TestCase):
+    def test_record(self):
+        agents = np.zeros(1000, dtype=AGENT)
+        agents["value"] = np.random.default_rng(1).normal(3., 2., size=1000)
+        agents["reputation"] = np.arange(1000) % 11 - 5
+        summaries = GenerationSummaries(AGENT, 2, {"reputation": (-5.5, 5.5, 11)})
+        summaries.record(0, agents)
+        assert summaries.written == 1
+        assert np.isclose(summaries.mean[0]["value"], agents["value"].mean())
+        assert np.isclose(summaries.variance[0]["value"], agents["value"].var())
+        assert summaries.minimum[0]["reputation"] == -5 and summaries.maximum[0]["reputation"] == 5
+        assert np.allclose(summaries.quantile[0]["value"], np.quantile(agents["value"], QUANTILES))
+        assert summaries.histogram["reputation"][0].tolist() == np.bincount(agents["reputation"] + 5).tolist()
+        assert summaries.histogram["value"][0].sum() == 1000
+        assert summaries.edges["value"][0][0] == agents["value"].min()
+
+    def test_grow(self):
+        summaries = GenerationSummaries(AGENT, 1)
+        agents = np.ones(5, dtype=AGENT)
+        summaries.record(0, agents)
+        summaries.record(4, agents)
+        assert len(summaries) >= 5
+        assert summaries.series("mean", "value").tolist() == [1., 0., 0., 0., 1.]
+
+    def test_log_interval(self):
+        config = Config(number_of_generations=7, number_of_simulation_steps_in_a_generation=10, log_interval=3)
+        s = Simulation(config)
+        while s.current_generation < config.number_of_generations:
+            s.calculate_generation()
+        assert len(s.log) == 3  # generations 0, 3 and 6
+        assert s.log.written == 3
+        assert s.summaries.written == 7
+        assert np.isclose(s.summaries.mean[6]["deception probability"], s.log[2]["deception probability"].mean())
+
+    def test_summaries_only(self):
+        s = Simulation(Config(log_interval=0, number_of_simulation_steps_in_a_generation=10))
+        s.calculate_generation()
+        assert s.log is None
+        assert s.summaries.written == 2
+
+    def test_subscription(self):
+        s = Simulation(Config(number_of_generations=6, number_of_simulation_steps_in_a_generation=10))
+        cursors = [s.summaries.subscribe(), s.summaries.subscribe(from_start=False)]
+        assert [cursor.pending() for cursor in cursors] == [1, 0]
+        assert len(cursors[0].read_series("mean", "value")) == 1
+        s.calculate_generation()
+        s.calculate_generation()
+        assert [cursor.read() for cursor in cursors] == [(1, 3), (1, 3)]
+        assert cursors[0].read() == (3, 3)
+        assert np.allclose(s.summaries.series("std", "deception probability") ** 2,
+                           s.summaries.series("variance", "deception probability"))
+
+    def test_compact_fields(self):
+        agents = np.zeros(10 ** 6, dtype=[("value", np.float32), ("reputation", np.int8)])
+        agents["value"] = 1000.1
+        agents["reputation"] = 5
+        summaries = GenerationSummaries(agents.dtype, 1)
+        summaries.record(0, agents)
+        assert abs(summaries.mean[0]["value"] - np.float64(np.float32(1000.1))) < 1e-9
+        assert summaries.mean[0]["reputation"] == 5 and summaries.variance[0]["reputation"] == 0
+
+    def test_concurrent_readers(self):
+        """A reader in another thread sees only complete generations, also while the arrays grow"""
+        agents = np.zeros(100, dtype=[("value", float)])
+        summaries = GenerationSummaries(agents.dtype, 1)
+        generations = 2000
+
+        def write():
+            for generation in range(generations):
+                agents["value"] = generation
+                summaries.record(generation, agents)
+
+        writer = threading.Thread(target=write)
+        cursor = summaries.subscribe()
+        means = []
+        writer.start()
+        while writer.is_alive() or cursor.pending():
+            means.append(cursor.read_series("mean", "value"))
+            generation, counts, edges = summaries.last_histogram("value")
+            if generation >= 0:
+                assert counts.sum() == 100 and edges[0] == generation - 0.5
+        writer.join()
+        assert (np.concatenate(means) == np.arange(generations)).all()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from generation_log import MemoryMappedLog
+from sweep import expand_grid, parse_grid_entry, run_sweep
+
+
+class TestSweep(TestCase):
+    def test_expand_grid(self):
+        runs = expand_grid({"mutation_rate": [0.1, 0.2], "number_of_agents": [10, 20, 30]})
+        assert len(runs) == 6
+        assert {"mutation_rate": 0.2, "number_of_agents": 30} in runs
+
+    def test_parse_grid_entry(self):
+        assert parse_grid_entry("mutation_rate=0.01, 0.1") == ("mutation_rate", [0.01, 0.1])
+        assert parse_grid_entry("engine=batched") == ("engine", ["batched"])
+
+    def test_run_sweep(self):
+        runs = [{"number_of_generations": 3, "number_of_simulation_steps_in_a_generation": 10},
+                {"number_of_generations": 3, "no_such_setting": 1}]
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_sweep("simulation_numpy", runs, directory, max_workers=2, seed=1, progress=None)
+            assert [result["status"] for result in results] == ["done", "failed"]
+            assert "no_such_setting" in results[1]["error"]
+            assert results[0]["seed"] == 1
+            with open(os.path.join(directory, "run_0000", "run.json")) as f:
+                assert json.load(f)["settings"]["number_of_simulation_steps_in_a_generation"] == 10
+            log = np.load(os.path.join(directory, "run_0000", "log.npy"))
+            assert len(log) == 3
+            assert os.path.exists(os.path.join(directory, "sweep.json"))
+
+    def test_run_files(self):
+        """Every run writes the files of the overrides into its own directory"""
+        runs = [{"number_of_generations": 3, "number_of_simulation_steps_in_a_generation": 50,
+                 "log_file": "log.bin"}] * 2
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_sweep("simulation_numpy", runs, directory, max_workers=2, seed=1, progress=None)
+            assert [result["status"] for result in results] == ["done", "done"]
+            logs = []
+            for index, result in enumerate(results):
+                path = os.path.join(directory, "run_%04d" % index, "log.bin")
+                assert result["settings"]["log_file"] == path
+                log = MemoryMappedLog.open(path)
+                assert log.written == 3 and log.header["seed"] == 1 + index
+                logs.append(log[:3])
+                assert (logs[-1] == np.load(os.path.join(directory, "run_%04d" % index, "log.npy"))).all()
+            assert (logs[0] != logs[1]).any()
+            assert not os.path.exists(os.path.join(directory, "log.bin"))
+
+    def test_mean_field(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_sweep("experiment_2", [{"number_of_generations": 4, "number_of_agents": 10 ** 6}], directory,
+                                max_workers=1, progress=None, mean_field=True)
+            assert results[0]["status"] == "done" and results[0]["mean_field"]
+            summaries = np.load(os.path.join(directory, "run_0000", "summaries.npz"))
+            assert abs(summaries["mean"]["strategy"][0]) < 1e-9
+            assert not os.path.exists(os.path.join(directory, "run_0000", "log.npy"))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+"""
+from unittest import TestCase
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import threading
+
+from configuration import Config
+import simulation
+import simulation_numpy
+from timing import PhaseTimer, RateMeter
+
+
+class TestTiming(TestCase):
+    def test_phases(self):
+        for module, engine in [(simulation, "sequential"), (simulation_numpy, "sequential"),
+                               (simulation_numpy, "batched")]:
+            config = Config(module.Simulation.settings, number_of_simulation_steps_in_a_generation=50,
+                            number_of_generations=4, engine=engine, timing=True)
+            s = module.Simulation(config)
+            for generation in range(2):
+                s.calculate_generation()
+            report = s.timer.report()
+            assert report["calculate_generation"]["calls"] == 2
+            assert report["select_agents"]["calls"] == 2
+            if engine == "batched":
+                assert report["calculate_steps_batched"]["calls"] == 2
+            else:
+                assert report["cooperation_step"]["calls"] == 100
+                assert report["step"]["calls"] == 102  # with the step that starts the next generation
+            assert report["calculate_generation"]["seconds"] >= report["select_agents"]["seconds"]
+
+            timer = s.disable_timing()
+            assert s.timer is None and not set(vars(s)) & set(module.Simulation.timed_phases)
+            s.calculate_generation()
+            assert timer.report()["calculate_generation"]["calls"] == 2
+
+        s = simulation_numpy.Simulation()
+        assert s.timer is None and "step" not in vars(s)  # no timing by default
+
+    def test_phase(self):
+        timer = PhaseTimer()
+        for i in range(3):
+            with timer.phase("draw"):
+                pass
+        assert timer.calls == {"draw": 3}
+        assert len(timer.format()) == 1
+
+    def test_concurrent_phases(self):
+        """Phases that are timed in two threads are all counted, and the report can be read meanwhile"""
+        timer = PhaseTimer()
+        step = timer.wrap("step", lambda: None)
+
+        def run():
+            for i in range(20000):
+                step()
+
+        worker = threading.Thread(target=run)
+        worker.start()
+        while worker.is_alive():
+            with timer.phase("draw"):
+                report = timer.report()
+                assert all(entry["calls"] > 0 for entry in report.values())
+        worker.join()
+        assert timer.calls["step"] == 20000
+
+    def test_rate_meter(self):
+        meter = RateMeter(steps_in_a_generation=100)
+        meter.start(1, 0)
+        assert meter.format(1, 0) == ""
+        meter.last = (meter.last[0] - 2., meter.last[1])  # two seconds ago
+        meter.update(3, 0)
+        assert abs(meter.steps_per_second - 100) < 1
+        assert abs(meter.generations_per_second - 1) < 0.01
+        assert abs(meter.eta(3, 0, 13) - 10) < 0.1
+        assert meter.format(3, 0, 13).endswith("0:10 remaining")
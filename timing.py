@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentation of the phases of a simulation: cumulative time and number of calls per phase.
+PhaseTimer.instrument wraps methods of a single object (not of its class) with timed versions, so an object that
+is not instrumented runs exactly the same code as before, and release() restores it. Other phases, e.g. drawing
+in the GUI, are timed with the phase() context manager.
+Times are inclusive: a phase that calls another one also contains its time.
+The totals are updated and read under a lock, since the GUI times its drawing with the same timer as the
+simulation, which runs in a worker thread (see runner.py).
+
+RateMeter turns the progress of a running simulation into steps/s, generations/s and the remaining time.
+"""
+
+__author__ = 'joscha'
+__date__ = '18.10.26'
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer(object):
+    """Records the time spent in named phases.
+    seconds: cumulative seconds per phase
+    calls: number of calls per phase
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, calls=1):
+        """Adds time to a phase"""
+        with self.lock:
+            self.seconds[name] = self.seconds.get(name, 0.) + seconds
+            self.calls[name] = self.calls.get(name, 0) + calls
+
+    @contextmanager
+    def phase(self, name):
+        """Times the body of a with statement as the named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name, function):
+        """Returns a version of function that is timed as the named phase"""
+        clock, seconds, calls, lock = time.perf_counter, self.seconds, self.calls, self.lock
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    seconds[name] = seconds.get(name, 0.) + elapsed
+                    calls[name] = calls.get(name, 0) + 1
+        timed.timer = self
+        return timed
+
+    def instrument(self, instance, names):
+        """Times the methods of instance with the given names (those it does not have are skipped), each one as a
+        phase of the same name"""
+        for name in names:
+            method = getattr(instance, name, None)
+            if method is not None and name not in vars(instance):
+                setattr(instance, name, self.wrap(name, method))
+
+    def release(self, instance):
+        """Removes the timing of this timer from the methods of instance"""
+        for name, value in list(vars(instance).items()):
+            if getattr(value, "timer", None) is self:
+                delattr(instance, name)
+
+    def reset(self):
+        with self.lock:
+            self.seconds.clear()
+            self.calls.clear()
+
+    def report(self):
+        """Returns {phase: {"seconds": .., "calls": .., "mean": ..}}, in the order of decreasing time"""
+        with self.lock:
+            totals = [(name, seconds, self.calls[name]) for name, seconds in self.seconds.items()]
+        return {name: {"seconds": seconds, "calls": calls, "mean": seconds / max(calls, 1)}
+                for name, seconds, calls in sorted(totals, key=lambda item: -item[1])}
+
+    def format(self, limit=None):
+        """Returns the report as lines of text"""
+        return ["%-28s %10.3f s %10d calls %10.2f us" % (name, entry["seconds"], entry["calls"], entry["mean"] * 1e6)
+                for name, entry in list(self.report().items())[:limit]]
+
+
+class RateMeter(object):
+    """Measures the speed of a running simulation from its progress.
+    steps_in_a_generation: the number of simulation steps in a generation
+    smoothing: weight of the previous rate against the latest measurement (exponential smoothing)
+    """
+
+    def __init__(self, steps_in_a_generation, smoothing=0.8):
+        self.steps_in_a_generation = steps_in_a_generation
+        self.smoothing = smoothing
+        self.last = None  # (time, total steps) of the previous update
+        self.steps_per_second = None
+
+    def start(self, generation, simstep):
+        """Starts measuring at the given progress"""
+        self.last = (time.perf_counter(), self.total_steps(generation, simstep))
+        self.steps_per_second = None
+
+    def total_steps(self, generation, simstep):
+        return generation * self.steps_in_a_generation + simstep
+
+    def update(self, generation, simstep):
+        """Records the progress of the simulation"""
+        now, steps = time.perf_counter(), self.total_steps(generation, simstep)
+        if self.last is None:
+            self.last = (now, steps)
+            return
+        elapsed = now - self.last[0]
+        if elapsed <= 0 or steps == self.last[1]:
+            return
+        rate = (steps - self.last[1]) / elapsed
+        if self.steps_per_second is None:
+            self.steps_per_second = rate
+        else:
+            self.steps_per_second = self.smoothing * self.steps_per_second + (1 - self.smoothing) * rate
+        self.last = (now, steps)
+
+    @property
+    def generations_per_second(self):
+        if self.steps_per_second is None:
+            return None
+        return self.steps_per_second / max(self.steps_in_a_generation, 1)
+
+    def eta(self, generation, simstep, last_generation):
+        """Returns the seconds until the simulation reaches last_generation, or None if the rate is not known yet"""
+        if not self.steps_per_second:
+            return None
+        remaining = self.total_steps(last_generation, 0) - self.total_steps(generation, simstep)
+        return max(remaining, 0) / self.steps_per_second
+
+    def format(self, generation, simstep, last_generation=None):
+        """Returns the rates as a line of text for the status bar, with the remaining time if last_generation is
+        given"""
+        if self.steps_per_second is None:
+            return ""
+        text = "%.0f steps/s, %.2f generations/s" % (self.steps_per_second, self.generations_per_second)
+        if last_generation is not None:
+            eta = self.eta(generation, simstep, last_generation)
+            minutes, seconds = divmod(int(round(eta)), 60)
+            text += ", %d:%02d remaining" % (minutes, seconds)
+        return text
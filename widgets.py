@@ -9,8 +9,6 @@ __date__ = '19.06.14'
 
 from tkinter import *
 from tkinter import ttk, filedialog, messagebox
-from configuration import Settings
-import math
 
 
 #import simulation_numpy as simulation
@@ -19,7 +17,10 @@ import experiment_3 as simulation
 
 
 
-from helper_widgets import MainMenu, SimFrame, ConfigDialog
+from helper_widgets import MainMenu, SimFrame, ConfigDialog, DiagramWindow
+from runner import SimulationRunner
+from agent_view import AgentView
+from timing import RateMeter
 
 class GuiApp(Tk):
 
@@ -51,6 +52,9 @@ class GuiApp(Tk):
 
         self.simulator = SimFrame(content_frame)
         self.simulator.grid(row=0, column=0, sticky=(W, E))
+        self.agent_view = AgentView(self.simulator.canvas,
+                                    ranges=getattr(simulation.Simulation, "histogram_ranges", None))
+        self.current_relation = None  # the line drawn between two agents
 
 
         spacer = ttk.Frame(content_frame)
@@ -68,7 +72,13 @@ class GuiApp(Tk):
         # simulation thread
         self.running = False
         self.gen_running = False
+        self.runner = None  # advances the simulation in the background, see run_simulation
+        self.poll_id = None  # the scheduled call of poll_snapshots
+        self.displayed_generation = None
+        self.rate_meter = None  # measures the speed of the runner, for the status bar
+        self.gui_phases = ["update_display", "update_after_generation", "update_plots"]  # timed with the simulation
 
+        self.simulation = None
         self.reset_simulation()
 
 
@@ -77,20 +87,9 @@ class GuiApp(Tk):
         if not key in self.open_diagrams:
             for Diagram in simulation.diagrams:
                 if Diagram.key == key:
-                    self.open_diagrams[key] = Diagram(self, self.simulation)
-
-
-    def calculate_agent_coordinates(self, agents):
-        """Arrange the agents in a circle on the canvas"""
-        self.agent_coordinates = []
-        origin = (350, 350)
-        r = 300
-        k = len(agents)
-        for n in range(0, k):
-            self.agent_coordinates.append(
-                (r * math.cos(2 * math.pi * n / k) + origin[0],
-                 r * math.sin(2 * math.pi * n / k) + origin[1])
-            )
+                    self.open_diagrams[key] = DiagramWindow(self, Diagram, self.simulation)
+                    if self.simulation.timer is not None:
+                        self.simulation.timer.instrument(self.open_diagrams[key], ["update_diagram"])
 
 
     def configure_simulation(self):
@@ -102,28 +101,65 @@ class GuiApp(Tk):
         self.status.set("running")
         self.running = True
         self.gen_running = False
-        while self.running:
-            self.simulation.step()
-            self.update_display_after_simstep()
-            self.update()
+        self.rate_meter.start(self.simulation.current_generation, self.simulation.current_simstep)
+        self.runner.start()
+        self.poll_snapshots()
 
     def stop_simulation(self):
         """Pauses the runner that triggers simulation steps"""
+        self.halt_runner()
+        self.gen_running = False
+        self.update_after_generation()  # frames may have been dropped, so all labels are refreshed
+        self.status.set("paused")
+        self.report_timing()
+
+    def halt_runner(self):
+        """Stops the background runner, after which the simulation may be used directly again"""
         self.running = False
-        if self.gen_running:
-            self.gen_running = False
-            self.update_after_generation()
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.runner is not None:
+            self.runner.stop()
+            self.runner.latest()  # discard the frames that have not been shown
+
+    def poll_snapshots(self):
+        """Shows the latest snapshot of the runner, and polls again after a frame while the runner is active.
+        Snapshots published in between are dropped, so drawing never slows down the simulation"""
+        snapshot = self.runner.latest()
+        if snapshot is not None:
+            self.update_display(snapshot)
+            self.rate_meter.update(snapshot.current_generation, snapshot.current_simstep)
+            self.status.set(("calculating: " if self.gen_running else "running: ") + self.rate_meter.format(
+                snapshot.current_generation, snapshot.current_simstep,
+                self.simulation.config.number_of_generations if self.gen_running else None))
+        if self.runner.running or not self.runner.snapshots.empty():
+            self.poll_id = self.after(max(1, int(1000 * self.runner.frame_interval)), self.poll_snapshots)
         else:
-            self.update_display_after_simstep()
-        self.status.set("paused")
+            self.poll_id = None
+            self.running = self.gen_running = False
+            self.update_after_generation()
+            self.status.set("finished" if snapshot is not None and snapshot.finished else "paused")
+            self.report_timing()
 
-    def reset_simulation(self):
-        """Initializes all values to original settings and sets up the canvas"""
+    def reset_simulation(self, config=None):
+        """Initializes all values to original settings and sets up the canvas.
+        config: the configuration of the new simulation, by default the one of the current simulation"""
 
-        self.running = False
+        self.halt_runner()
         self.gen_running = False
 
-        self.simulation = simulation.Simulation()  # the self parameter tells the sim where to find the gui
+        if config is None and self.simulation is not None:
+            config = self.simulation.config
+        if self.simulation is not None and self.simulation.timer is not None:
+            self.simulation.timer.release(self)
+            self.simulation.timer.release(self.agent_view)
+        self.simulation = simulation.Simulation(config)
+        self.runner = SimulationRunner(self.simulation, self.simulation.config.frames_per_second)
+        self.rate_meter = RateMeter(self.simulation.config.number_of_simulation_steps_in_a_generation)
+        if self.simulation.timer is not None:  # the drawing is timed together with the simulation
+            self.simulation.timer.instrument(self, self.gui_phases)
+            self.simulation.timer.instrument(self.agent_view, ["render"])
 
         diagrams = list(self.open_diagrams.values())
         for plot in diagrams:
@@ -137,7 +173,7 @@ class GuiApp(Tk):
 
     def step_simulation(self):
         """Advances the simulation by a single step"""
-        self.running = False
+        self.halt_runner()
         self.gen_running = False
         self.status.set("step")
         self.simulation.step()
@@ -146,7 +182,7 @@ class GuiApp(Tk):
 
     def advance_one_generation(self):
         """Advances the simulation by a full generation"""
-        self.running = False
+        self.halt_runner()
         self.gen_running = False
         self.status.set("calculating...")
         self.update()
@@ -156,16 +192,17 @@ class GuiApp(Tk):
 
     def calculate_all(self):
         """Perform the complete calculation"""
-        self.running = False
+        self.halt_runner()
         self.gen_running = True
         self.status.set("calculating...")
-        while self.simulation.current_generation < Settings.number_of_generations and self.gen_running:
-            self.simulation.calculate_generation()
-            if self.simulation.current_generation % Settings.update_rate_during_calculate_all == 0:
-                self.update()
-                self.update_after_generation()
-        self.update_after_generation()
-        self.status.set("paused")
+        self.rate_meter.start(self.simulation.current_generation, self.simulation.current_simstep)
+        self.runner.start(generations=True)
+        self.poll_snapshots()
+
+    def report_timing(self):
+        """Prints the time spent in each phase so far, if the timing setting is on"""
+        if self.simulation.timer is not None:
+            print("\n".join(self.simulation.timer.format()))
 
     def export_simulation_data(self):
         filename = filedialog.asksaveasfilename()
@@ -178,38 +215,15 @@ class GuiApp(Tk):
         messagebox.showinfo(title="Contact", message="Joscha Bach, 2014\njoscha@mit.edu")
 
     def setup_agent_drawings(self, agents):
-        """Draw agents and their reputation values"""
-        c = self.simulator.canvas
-        self.calculate_agent_coordinates(agents)
-        self.simulator.canvas.delete(ALL)
-        radius = 10
-        offset = 18
-        self.agent_drawings = []
-        self.agent_value_labels = []
-
-
-        for i, (x, y) in enumerate(self.agent_coordinates):
-            self.agent_drawings.append(c.create_oval(x-radius, y-radius, x+radius, y+radius,
-                                                                         outline="black", fill="lightblue", width=2))
-            self.agent_value_labels.append([
-                c.create_text(x, y + offset, text="", fill="orange"),
-                c.create_text(x, y + 2 * offset, text="", fill="blue"),
-                c.create_text(x, y - offset, text="", fill="brown"),
-                c.create_text(x, y - 2 * offset, text="", fill="green")])
-
-        self.current_relation = None  # no line is drawn between agent images
-
-    def update_agent_value_labels(self, agent_index, values):
-        """paints the updated values on the canvas"""
-        if isinstance(values, dict):
-            values = [values["value"], values["reputation"], values["deception_probability"]]
-        for index, value in enumerate(values):
-            self.simulator.canvas.itemconfig(self.agent_value_labels[agent_index][index], text= str(round(value, 3)))
+        """Draw agents and their reputation values. The drawings are reused if the number of agents is unchanged"""
+        self.delete_current_relation()
+        self.agent_view.layout(len(agents))
 
     def draw_relation(self, agent_index1, agent_index2, relation=None):
         """draws a visible link between two agents, of type "defect" or "cooperate".
         the line index is then stored in self.current_relation, so that it can be deleted later"""
-        if agent_index1 is None or agent_index2 is None:
+        if (agent_index1 is None or agent_index2 is None or not self.agent_view.is_shown(agent_index1)
+                or not self.agent_view.is_shown(agent_index2)):  # in the raster view, most agents are not drawn
             self.delete_current_relation()
             return
         if relation is "defect":
@@ -219,16 +233,12 @@ class GuiApp(Tk):
         else:
             color = "black"
 
+        coordinates = self.agent_view.position([agent_index1, agent_index2]).ravel().tolist()
         if self.current_relation:
-            self.simulator.canvas.coords(self.current_relation,
-                                         self.agent_coordinates[agent_index1][0],
-                                         self.agent_coordinates[agent_index1][1],
-                                         self.agent_coordinates[agent_index2][0],
-                                         self.agent_coordinates[agent_index2][1])
+            self.simulator.canvas.coords(self.current_relation, *coordinates)
             self.simulator.canvas.itemconfig(self.current_relation, fill=color, width=2)
         else:
-            self.current_relation = self.simulator.canvas.create_line(self.agent_coordinates[agent_index1],
-                                                 self.agent_coordinates[agent_index2],
+            self.current_relation = self.simulator.canvas.create_line(*coordinates,
                                                  arrow = "last", fill = color, width=2)
 
     def delete_current_relation(self):
@@ -248,29 +258,36 @@ class GuiApp(Tk):
         else:
             self.delete_current_relation()
         if self.simulation.last_agent_0_index is not None:
-            self.update_agent_value_labels(self.simulation.last_agent_0_index,
-                                           self.simulation.agents[self.simulation.last_agent_0_index])
-            self.update_agent_value_labels(self.simulation.last_agent_1_index,
-                                           self.simulation.agents[self.simulation.last_agent_1_index])
+            self.agent_view.show(self.simulation.agents,
+                                 [self.simulation.last_agent_0_index, self.simulation.last_agent_1_index])
         else:
-            for i, a in enumerate(self.simulation.agents):
-                self.update_agent_value_labels(i, a)
+            self.agent_view.show(self.simulation.agents)
+
 
+    def update_display(self, snapshot):
+        """Shows a snapshot published by the runner. Frames in between may have been dropped, so all labels are
+        refreshed, and the plots whenever the generation has changed"""
+        self.simulator.simstep.set(snapshot.current_simstep)
+        self.simulator.generation.set(snapshot.current_generation)
+        if snapshot.last_relation:
+            self.draw_relation(snapshot.last_agent_0_index, snapshot.last_agent_1_index, snapshot.last_relation)
+        else:
+            self.delete_current_relation()
+        self.agent_view.show(snapshot.agents)
+        if snapshot.current_generation != self.displayed_generation:
+            self.displayed_generation = snapshot.current_generation
+            self.update_plots()
 
     def update_after_generation(self):
         """Update gui display after a generation has passed"""
         self.delete_current_relation()
         self.simulator.simstep.set(self.simulation.current_simstep)
         self.simulator.generation.set(self.simulation.current_generation)
-        for i, a in enumerate(self.simulation.agents):
-            self.update_agent_value_labels(i, a)
+        self.agent_view.show(self.simulation.agents)
         self.update_plots()
 
 
     def update_plots(self):
-        try:
-            for plot in self.open_diagrams.values():
-                plot.update_diagram()
-        except RuntimeError:  # thread hates it when we add new diagrams while running
-            pass
+        for plot in list(self.open_diagrams.values()):  # a diagram may be opened or closed while we draw
+            plot.update_diagram()
 